@@ -0,0 +1,99 @@
+"""Recall@k vs. queries per second for the IVF index against exact search on synthetic vectors.
+
+    python -m benchmarks.bench_ann --vectors 200000 --dim 384 --nprobe 1 2 4 8 16 32
+
+Vectors are drawn around random topic centres (like embeddings of many similar listings), and
+queries are perturbed catalog vectors. Recall@k is the share of the exact top k that the IVF
+index also returns.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.search.ann import IVFIndex
+from src.search.dense import DenseIndex
+
+
+def synthetic_vectors(n: int, dim: int, n_topics: int, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors: a random topic centre plus Gaussian noise per row.
+
+    Args:
+        n (int): Number of vectors.
+        dim (int): Dimensionality.
+        n_topics (int): Number of topic centres.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: (n, dim) float32 vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_topics, dim), dtype = np.float32)
+    vectors = rng.standard_normal((n, dim), dtype = np.float32)
+    vectors += centres[rng.integers(0, n_topics, n)]
+    return vectors
+
+
+def _run_queries(search, queries: np.ndarray, k: int) -> tuple[list[np.ndarray], float]:
+    start = time.perf_counter()
+    results = [search(query, k)[0] for query in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--vectors", type = int, default = 200_000)
+    parser.add_argument("--dim", type = int, default = 384)
+    parser.add_argument("--topics", type = int, default = 2_000)
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("-k", type = int, default = 10)
+    parser.add_argument("--nlist", type = int, default = None)
+    parser.add_argument("--nprobe", type = int, nargs = "+", default = [1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace = False)]
+    queries = queries + rng.standard_normal(queries.shape, dtype = np.float32) * 0.5
+
+    exact = DenseIndex(vectors)
+    truth, exact_qps = _run_queries(exact.search, queries, args.k)
+    del exact
+
+    start = time.perf_counter()
+    built = IVFIndex.build(vectors, nlist = args.nlist)
+    build_seconds = time.perf_counter() - start
+    del vectors
+
+    results = {
+        "vectors": args.vectors,
+        "dim": args.dim,
+        "nlist": built.nlist,
+        "build_seconds": round(build_seconds, 2),
+        "exact_qps": round(exact_qps, 1),
+        "ivf": [],
+    }
+    with tempfile.TemporaryDirectory() as index_dir:
+        built.save(index_dir)
+        del built
+        start = time.perf_counter()
+        index = IVFIndex.load(index_dir)
+        results["load_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        results["index_mb"] = round(sum(
+            os.path.getsize(os.path.join(index_dir, name)) for name in os.listdir(index_dir)
+        ) / 2**20, 1)
+
+        for nprobe in args.nprobe:
+            found, qps = _run_queries(lambda q, k: index.search(q, k, nprobe = nprobe), queries, args.k)
+            recall = np.mean([len(np.intersect1d(a, b)) / args.k for a, b in zip(found, truth)])
+            results["ivf"].append({"nprobe": nprobe, f"recall@{args.k}": round(float(recall), 4), "qps": round(qps, 1)})
+        del index
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Queries per second for one-off vs batched search, at the index and at the service level.
+
+    python -m benchmarks.bench_batch_search --vectors 100000 --rows 20000 --queries 2000
+
+The index part scores pre-encoded synthetic queries with a loop of DenseIndex.search (one
+matrix-vector product each) and with DenseIndex.search_batch (chunked matrix-matrix products).
+The service part runs quiz-style queries through SearchService.search one at a time and through
+search_batch, with benchmarks.encoder.HashingEncoder charging a per-call and per-text cost like a
+model on CPU, so it also shows the saving from embedding many queries per encoder call.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import synthetic_vectors
+from benchmarks.bench_query_cache import QUIZ_QUERIES
+from benchmarks.encoder import HashingEncoder
+from benchmarks.load_test_search import QUERIES
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.search.dense import DenseIndex
+from src.search.lexical import BM25Index
+from src.search.service import SearchService, ServingConfig
+
+
+def _qps(n: int, run) -> float:
+    start = time.perf_counter()
+    run()
+    return round(n / (time.perf_counter() - start), 1)
+
+
+def bench_index(n_vectors: int, dim: int, n_queries: int, k: int, batch_sizes: list[int]) -> dict:
+    vectors = synthetic_vectors(n_vectors, dim, n_topics = 1_000)
+    queries = synthetic_vectors(n_queries, dim, n_topics = 1_000, seed = 1)
+    index = DenseIndex(vectors)
+
+    results = {"vectors": n_vectors, "queries": n_queries, "one_at_a_time_qps": _qps(
+        n_queries, lambda: [index.search(query, k) for query in queries]
+    )}
+    for batch_size in batch_sizes:
+        results[f"batch_{batch_size}_qps"] = _qps(n_queries, lambda: [
+            index.search_batch(queries[start:start + batch_size], k) for start in range(0, n_queries, batch_size)
+        ])
+
+    return results
+
+
+def bench_service(n_rows: int, n_queries: int, k: int, batch_sizes: list[int], call_ms: float, text_ms: float) -> dict:
+    df = preprocess_raw_data(synthetic_raw_catalog(n_rows), low_memory = True)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    encoder = HashingEncoder()
+    embeddings = encoder(texts)
+    encoder.seconds_per_call, encoder.seconds_per_text = call_ms / 1000, text_ms / 1000
+    config = ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1)
+    service = SearchService.from_frame(df, embeddings, encoder, BM25Index.build(texts), config = config)
+
+    pool = QUIZ_QUERIES + QUERIES
+    queries = [f"{pool[i % len(pool)]} {i}" for i in range(n_queries)]
+    results = {"racquets": len(df), "queries": n_queries}
+    for mode in ("dense", "hybrid"):
+        results[mode] = {"one_at_a_time_qps": _qps(n_queries, lambda: [service.search(query, k, mode = mode) for query in queries])}
+        for batch_size in batch_sizes:
+            results[mode][f"batch_{batch_size}_qps"] = _qps(n_queries, lambda: [
+                service.search_batch(queries[start:start + batch_size], k, mode = mode)
+                for start in range(0, n_queries, batch_size)
+            ])
+    service.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--vectors", type = int, default = 100_000)
+    parser.add_argument("--dim", type = int, default = 384)
+    parser.add_argument("--rows", type = int, default = 20_000)
+    parser.add_argument("--queries", type = int, default = 2_000)
+    parser.add_argument("--k", type = int, default = 10)
+    parser.add_argument("--batch-sizes", type = int, nargs = "+", default = [16, 128, 1024])
+    parser.add_argument("--call-ms", type = float, default = 10.0, help = "Simulated encoder cost per call")
+    parser.add_argument("--text-ms", type = float, default = 0.5, help = "Simulated encoder cost per text")
+    args = parser.parse_args()
+
+    results = {
+        "index": bench_index(args.vectors, args.dim, args.queries, args.k, args.batch_sizes),
+        "service": bench_service(args.rows, args.queries, args.k, args.batch_sizes, args.call_ms, args.text_ms),
+    }
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
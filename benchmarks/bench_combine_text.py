@@ -0,0 +1,53 @@
+"""Compare the row-wise and batch natural-text builders on a synthetic cleaned catalog.
+
+    python -m benchmarks.bench_combine_text --rows 100000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import (
+    create_natural_combined_text,
+    create_natural_combined_text_batch,
+    create_natural_combined_text_v2,
+    create_natural_combined_text_v2_batch,
+    structured_combine_text,
+)
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, round(time.perf_counter() - start, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, default = 100_000)
+    args = parser.parse_args()
+
+    df = preprocess_raw_data(synthetic_raw_catalog(args.rows), low_memory = True)
+    object_cols = [col for col in df.select_dtypes(include = ["object"]).columns if col != "racquet_img"]
+
+    results = {"rows": len(df)}
+    for name, row_func, batch_func in [
+        ("natural", create_natural_combined_text, create_natural_combined_text_batch),
+        ("natural_v2", create_natural_combined_text_v2, create_natural_combined_text_v2_batch),
+    ]:
+        row_texts, row_seconds = _timed(lambda: df.apply(row_func, axis = 1))
+        batch_texts, batch_seconds = _timed(lambda: batch_func(df))
+        results[name] = {
+            "apply_seconds": row_seconds,
+            "batch_seconds": batch_seconds,
+            "identical": bool(row_texts.equals(batch_texts)),
+        }
+    _, structured_seconds = _timed(lambda: structured_combine_text(df, object_cols))
+    results["structured_seconds"] = structured_seconds
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Time and accuracy of MinHash/LSH variant grouping against an all-pairs comparison.
+
+    python -m benchmarks.bench_dedup --rows 10000 100000 1000000 --variant-share 0.3
+
+A synthetic catalog is preprocessed and a share of its listings get one or two variants: a copy
+with a colorway added to the name, other colors and price, and one description sentence swapped
+for a cosmetic note, as the real scrape's "... Pink" and "... Pre-strung" listings look. Pair
+precision and recall are measured against those injected families; "groupable_pair_recall" only
+counts listings with at least MIN_SPECS spec values, the others are never grouped. "all_pairs_seconds" times
+exact bigram Jaccard between every pair of a --brute-force-rows sample and extrapolates it
+quadratically to the catalog size, as the cost without LSH.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.dedup import MIN_SPECS, SPEC_COLUMNS, variant_families
+from src.data.preprocess import preprocess_raw_data
+
+_COLORWAYS = ["Pink", "Sand Beige", "Aqua Night Black", "Neon Series", "Roland Garros", "US Open", "Pre-strung"]
+
+
+def with_variants(df: pd.DataFrame, share: float, seed: int = 0) -> tuple[pd.DataFrame, np.ndarray]:
+    """Append colorway variants of a share of the listings.
+
+    Args:
+        df (pd.DataFrame): Cleaned synthetic catalog.
+        share (float): Share of listings that get variants.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        tuple[pd.DataFrame, np.ndarray]: Catalog with the variants appended, and the true family
+        (original row position) of every row.
+    """
+    rng = random.Random(seed)
+    sources = rng.sample(range(len(df)), int(len(df) * share))
+    copies = [source for source in sources for _ in range(rng.choice([1, 1, 2]))]
+    variants = df.iloc[copies].copy()
+    variants["racquet_name"] = [f"{name} {rng.choice(_COLORWAYS)}" for name in variants["racquet_name"]]
+    variants["racquet_price"] = variants["racquet_price"] + [rng.choice([0, 0, 20, -30]) for _ in copies]
+    variants["racquet_desc"] = [
+        re.sub(r"^ ?[^.!]+[.!]", " Featuring the same specs as the standard version in a new cosmetic.", desc)
+        for desc in variants["racquet_desc"]
+    ]
+    return pd.concat([df, variants], ignore_index = True), np.concatenate([np.arange(len(df)), copies])
+
+
+# Helper function to list the pairs of rows that share a family label
+def _family_pairs(labels: np.ndarray) -> set:
+    grouped = pd.Series(np.arange(len(labels))).groupby(labels).agg(list)
+    return {pair for rows in grouped if len(rows) > 1 for pair in itertools.combinations(rows, 2)}
+
+
+# Helper function to time exact Jaccard over every pair of a sample of descriptions
+def _all_pairs_seconds(texts: list[str]) -> float:
+    shingle_sets = []
+    for text in texts:
+        words = re.findall(r"[a-z0-9]+", str(text).lower())
+        shingle_sets.append(set(zip(words, words[1:])))
+    start = time.perf_counter()
+    for left, right in itertools.combinations(shingle_sets, 2):
+        len(left & right) / max(1, len(left | right))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, nargs = "+", default = [10_000, 100_000])
+    parser.add_argument("--variant-share", type = float, default = 0.3)
+    parser.add_argument("--brute-force-rows", type = int, default = 2_000)
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.rows:
+        df, truth = with_variants(preprocess_raw_data(synthetic_raw_catalog(n_rows), low_memory = True), args.variant_share)
+        start = time.perf_counter()
+        found = variant_families(df)
+        seconds = time.perf_counter() - start
+        found_pairs, true_pairs = _family_pairs(found), _family_pairs(truth)
+        groupable = df[SPEC_COLUMNS].notna().sum(axis = 1).to_numpy() >= MIN_SPECS
+        groupable_pairs = {pair for pair in true_pairs if groupable[pair[0]]}
+        sample = min(args.brute_force_rows, len(df))
+        results.append({
+            "listings": len(df),
+            "true_families": int(len(np.unique(truth))),
+            "found_families": int(len(np.unique(found))),
+            "seconds": round(seconds, 2),
+            "pair_precision": round(len(found_pairs & true_pairs) / max(1, len(found_pairs)), 4),
+            "pair_recall": round(len(found_pairs & true_pairs) / max(1, len(true_pairs)), 4),
+            "groupable_pair_recall": round(len(found_pairs & groupable_pairs) / max(1, len(groupable_pairs)), 4),
+            "all_pairs_seconds": round(_all_pairs_seconds(df["racquet_desc"].head(sample).tolist()) * (len(df) / sample) ** 2, 1),
+        })
+        print(json.dumps(results[-1]))
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Time cold, warm and partial refreshes of the on-disk embedding store.
+
+    python -m benchmarks.bench_embedding_store --rows 20000 --changed 0.01
+
+Uses benchmarks.encoder.HashingEncoder with a per-text delay in place of a real model, so the
+numbers show how many texts each refresh has to embed rather than real model throughput.
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.encoder import HashingEncoder
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import NATURAL_V2_TEMPLATE_VERSION, create_natural_combined_text_v2_batch
+from src.features.embedding_store import EmbeddingStore
+
+
+def _refresh(store: EmbeddingStore, encoder: HashingEncoder, texts: list[str]) -> tuple[np.ndarray, dict]:
+    before = encoder.texts_encoded
+    start = time.perf_counter()
+    vectors = store.refresh(texts, encoder, model_name = "hashing-384", template_version = NATURAL_V2_TEMPLATE_VERSION)
+    return vectors, {
+        "seconds": round(time.perf_counter() - start, 3),
+        "texts_embedded": encoder.texts_encoded - before,
+        "store_rows": len(store),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, default = 20_000)
+    parser.add_argument("--changed", type = float, default = 0.01, help = "Fraction of racquets whose text changes")
+    parser.add_argument("--seconds-per-text", type = float, default = 0.0005)
+    args = parser.parse_args()
+
+    df = preprocess_raw_data(synthetic_raw_catalog(args.rows), low_memory = True)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    encoder = HashingEncoder(seconds_per_text = args.seconds_per_text)
+
+    n_changed = max(1, int(len(texts) * args.changed))
+    changed = [text + " Now in a new colorway." if i < n_changed else text for i, text in enumerate(texts)]
+    shrunk = texts[n_changed:]
+
+    results = {"texts": len(texts)}
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = EmbeddingStore(store_dir)
+        _, results["cold"] = _refresh(store, encoder, texts)
+        _, results["warm"] = _refresh(EmbeddingStore(store_dir), encoder, texts)
+        vectors, results["changed"] = _refresh(EmbeddingStore(store_dir), encoder, changed)
+        results["changed"]["matches_full_encode"] = bool(np.allclose(vectors, encoder(changed)))
+        _, results["removed"] = _refresh(EmbeddingStore(store_dir), encoder, shrunk)
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compare filtered vs unfiltered dense query cost at growing catalog sizes.
+
+    python -m benchmarks.bench_filters --sizes 1000 10000 100000 1000000
+
+Spec columns are resampled from a preprocessed synthetic catalog and embeddings are random unit
+vectors, since only the amount of scoring work matters here. "filtered" includes building the
+boolean mask and scoring only the rows that pass it.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.search.dense import DenseIndex
+from src.search.filters import FilterEngine, parse_query_filters
+
+QUERIES = [
+    "under $200",
+    "head light under $200",
+    "98 sq in 16x19 head light",
+    "over $250 over 11 oz swingweight under 320",
+]
+
+
+def _median_ms(func, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(float(np.median(timings)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type = int, default = 384)
+    parser.add_argument("--repeats", type = int, default = 20)
+    args = parser.parse_args()
+
+    specs = preprocess_raw_data(synthetic_raw_catalog(20_000), low_memory = True)
+    rng = np.random.default_rng(0)
+    results = []
+    for size in args.sizes:
+        df = specs.sample(n = size, replace = True, random_state = 0).reset_index(drop = True)
+        embeddings = rng.standard_normal((size, args.dim), dtype = np.float32)
+        index = DenseIndex(embeddings)
+        del embeddings
+        engine = FilterEngine.from_frame(df)
+        query_vector = rng.standard_normal(args.dim, dtype = np.float32)
+
+        row = {"racquets": size, "unfiltered_ms": _median_ms(lambda: index.search(query_vector, 10), args.repeats)}
+        for query in QUERIES:
+            constraints, _ = parse_query_filters(query)
+            candidates = engine.candidates(constraints)
+            row[query] = {
+                "selectivity": round(len(candidates) / size, 4),
+                "mask_ms": _median_ms(lambda: engine.candidates(constraints), args.repeats),
+                "filtered_ms": _median_ms(
+                    lambda: index.search(query_vector, 10, engine.candidates(constraints)), args.repeats
+                ),
+            }
+        results.append(row)
+        del index
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare dense, lexical and hybrid query latency, and BM25 build vs load time.
+
+    python -m benchmarks.bench_hybrid --rows 20000
+
+Queries are embedded with benchmarks.encoder.HashingEncoder; seconds_per_text mimics model cost so
+the overlap of BM25 with query encoding in hybrid mode shows up in the timings.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.encoder import HashingEncoder
+from benchmarks.load_test_search import QUERIES
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.search.lexical import BM25Index, load_or_build_bm25
+from src.search.service import SearchService, ServingConfig
+
+
+def _timed_ms(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, default = 20_000)
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("--query-encode-ms", type = float, default = 5.0)
+    args = parser.parse_args()
+
+    df = preprocess_raw_data(synthetic_raw_catalog(args.rows), low_memory = True)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    encoder = HashingEncoder()
+    embeddings = encoder(texts)
+    encoder.seconds_per_text = args.query_encode_ms / 1000
+
+    results = {"racquets": len(texts)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bm25.npz")
+        results["bm25_build_ms"] = round(_timed_ms(lambda: BM25Index.build(texts).save(path)), 1)
+        results["bm25_load_ms"] = round(_timed_ms(lambda: load_or_build_bm25(texts, path)), 1)
+        lexical = load_or_build_bm25(texts, path)
+
+    # QUERIES repeats, so the query and result caches would turn every query after the first pass into a hit
+    config = ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1)
+    service = SearchService.from_frame(df, embeddings, encoder, lexical, config = config)
+    for mode in ("dense", "lexical", "hybrid"):
+        latencies = [
+            _timed_ms(lambda: service.search(QUERIES[i % len(QUERIES)], 10, mode = mode))
+            for i in range(args.queries)
+        ]
+        p50, p99 = np.percentile(latencies, [50, 99])
+        results[mode] = {"p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3)}
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Incremental index updates vs. a full rebuild: update latency by changed rows, query cost with a
+delta segment, and compaction time.
+
+    python -m benchmarks.bench_incremental --rows 10000 100000 --changes 10 100 1000
+
+For each catalog size a synthetic catalog is preprocessed and served from an exact index with
+BM25, with clustered random vectors (bench_ann.synthetic_vectors) standing in for embeddings.
+"full_rebuild_seconds" is what a refresh costs without incremental updates: the dense matrix, BM25
+postings, filter columns and result records over the whole catalog. For each change count,
+that many existing racquets get a new price and vector (upserts) and a tenth as many are deleted,
+through IncrementalIndex; "update_ms" is the time until the new snapshot is live. Hybrid queries
+per second are measured before the update, with the delta segment and tombstones, and after
+compact().
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import synthetic_vectors
+from benchmarks.bench_query_cache import QUIZ_QUERIES
+from benchmarks.encoder import HashingEncoder
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.search.dense import DenseIndex
+from src.search.filters import FilterEngine
+from src.search.incremental import IncrementalIndex, racquet_id
+from src.search.lexical import BM25Index
+from src.search.service import SearchService, ServingConfig, result_records
+
+
+def _seconds(run) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = run()
+    return result, time.perf_counter() - start
+
+
+def _hybrid_qps(service: SearchService, queries: list[str], k: int) -> float:
+    _, seconds = _seconds(lambda: [service.search(query, k) for query in queries])
+    return round(len(queries) / seconds, 1)
+
+
+def bench_catalog(n_rows: int, changes: list[int], dim: int, n_queries: int, k: int) -> dict:
+    df = preprocess_raw_data(synthetic_raw_catalog(n_rows), low_memory = True).reset_index(drop = True)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    vectors = synthetic_vectors(len(df), dim, n_topics = 1_000)
+
+    start = time.perf_counter()
+    index = DenseIndex(vectors)
+    lexical = BM25Index.build(texts)
+    filters = FilterEngine.from_frame(df)
+    records = result_records(df)
+    results = {"racquets": len(df), "full_rebuild_seconds": round(time.perf_counter() - start, 3), "changes": []}
+
+    # The stand-in encoder only embeds queries; catalog vectors are passed to upsert() directly
+    config = ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1)
+    encoder = HashingEncoder(dim = dim)
+    queries = [QUIZ_QUERIES[i % len(QUIZ_QUERIES)] for i in range(n_queries)]
+    rng = np.random.default_rng(0)
+    for n_changes in changes:
+        service = SearchService(records, filters, index, encoder, lexical, config)
+        incremental = IncrementalIndex(service, background = False)
+        before_qps = _hybrid_qps(service, queries, k)
+
+        rows = df.iloc[rng.choice(len(df), min(n_changes, len(df)), replace = False)].copy()
+        rows["racquet_price"] = rows["racquet_price"] * 0.9
+        new_vectors = synthetic_vectors(len(rows), dim, n_topics = 1_000, seed = n_changes)
+        _, upsert_seconds = _seconds(lambda: incremental.upsert(rows, new_vectors))
+        gone = [racquet_id(name, image) for name, image in
+                df.iloc[rng.choice(len(df), max(1, n_changes // 10), replace = False)][["racquet_name", "racquet_img"]].values]
+        _, delete_seconds = _seconds(lambda: incremental.delete(gone))
+        delta_qps = _hybrid_qps(service, queries, k)
+        _, compact_seconds = _seconds(incremental.compact)
+
+        results["changes"].append({
+            "upserts": len(rows),
+            "deletes": len(gone),
+            "upsert_ms": round(upsert_seconds * 1000, 2),
+            "delete_ms": round(delete_seconds * 1000, 2),
+            "update_ms": round((upsert_seconds + delete_seconds) * 1000, 2),
+            "speedup_vs_rebuild": round(results["full_rebuild_seconds"] / (upsert_seconds + delete_seconds), 1),
+            "qps_before": before_qps,
+            "qps_with_delta": delta_qps,
+            "qps_after_compaction": _hybrid_qps(service, queries, k),
+            "compact_seconds": round(compact_seconds, 3),
+        })
+        service.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, nargs = "+", default = [10_000, 100_000])
+    parser.add_argument("--changes", type = int, nargs = "+", default = [10, 100, 1_000])
+    parser.add_argument("--dim", type = int, default = 384)
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("--k", type = int, default = 10)
+    args = parser.parse_args()
+
+    results = [bench_catalog(n_rows, args.changes, args.dim, args.queries, args.k) for n_rows in args.rows]
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
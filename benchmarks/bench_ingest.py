@@ -0,0 +1,122 @@
+"""Time to a searchable catalog: batch steps one after another vs. the streaming ingest pipeline.
+
+    python -m benchmarks.bench_ingest --products 300 --requests-per-second 5 --seconds-per-text 0.02
+
+Both runs crawl the same synthetic fixture site, served on localhost from a separate process, under
+the same FetchConfig, so the request rate limit plays the part of the polite crawl against the
+real site (run_scraper.py uses 5 requests per second). Both parse with --parser, on
+--parse-workers processes if set. Embedding uses the hashing stand-in encoder with
+--seconds-per-text of simulated model time per text. The batch run
+is today's workflow: the whole crawl, then preprocess_raw_data, text building, embedding and
+building the indexes, each over the whole catalog. The streaming run is IngestPipeline, which
+overlaps them; "first_searchable_seconds" is when its first batch was queryable. Both must end
+with the same racquets.
+"""
+import argparse
+import json
+import multiprocessing
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import numpy as np
+
+from benchmarks.encoder import HashingEncoder
+from benchmarks.fixture_site import FixtureSite, serve_fixture_site
+from src.data.fetch import FetchConfig
+from src.data.preprocess import preprocess_raw_data
+from src.data.scrape import _scrape_concurrently
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.ingest import IngestConfig, IngestPipeline
+from src.search.dense import DenseIndex
+from src.search.filters import FilterEngine
+from src.search.lexical import BM25Index
+from src.search.service import SearchService, result_records
+
+
+def _serve(n_products: int, connection):
+    with serve_fixture_site(FixtureSite(n_products = n_products)) as shop_all_URL:
+        connection.send(shop_all_URL)
+        connection.recv()
+
+
+@contextmanager
+def _fixture_site_process(n_products: int) -> Iterator[str]:
+    # Serve the site from its own process: the real site does not compete with the pipeline for the GIL
+    connection, child_connection = multiprocessing.Pipe()
+    server = multiprocessing.Process(target = _serve, args = (n_products, child_connection), daemon = True)
+    server.start()
+    try:
+        yield connection.recv()
+    finally:
+        connection.send("stop")
+        server.join()
+
+
+def run_batch(shop_all_URL: str, fetch_config: FetchConfig, encoder: HashingEncoder, config: IngestConfig) -> dict:
+    stages = {}
+
+    def stage(name, run):
+        start = time.perf_counter()
+        result = run()
+        stages[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    raw_df = stage("scrape", lambda: _scrape_concurrently(shop_all_URL, fetch_config = fetch_config, parser = config.parser,
+                                                          parse_workers = config.parse_workers))
+    df = stage("preprocess", lambda: preprocess_raw_data(raw_df).reset_index(drop = True))
+    texts = stage("combine_text", lambda: create_natural_combined_text_v2_batch(df).tolist())
+    embeddings = stage("embed", lambda: np.concatenate([encoder(texts[i:i + config.embed_batch_size])
+                                                        for i in range(0, len(texts), config.embed_batch_size)]))
+    service = stage("index", lambda: SearchService(result_records(df), FilterEngine.from_frame(df), DenseIndex(embeddings),
+                                                   encoder, BM25Index.build(texts)))
+    service.close()
+    return {"racquets": len(df), "searchable_seconds": round(sum(stages.values()), 3), "stages": stages,
+            "names": sorted(df["racquet_name"])}
+
+
+def run_streaming(shop_all_URL: str, fetch_config: FetchConfig, encoder: HashingEncoder, config: IngestConfig) -> dict:
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        pipeline = IngestPipeline(encoder, snapshot_dir = snapshot_dir, config = config, fetch_config = fetch_config)
+        result = pipeline.run(shop_all_URL)
+    hits = pipeline.service.search("control racquet for intermediate players", 10)["results"]
+    pipeline.service.close()
+    return {"racquets": len(result.df), "searchable_seconds": result.stats["searchable_seconds"],
+            "first_searchable_seconds": result.stats["first_searchable_seconds"], "query_hits": len(hits),
+            "names": sorted(result.df["racquet_name"])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--products", type = int, default = 300)
+    parser.add_argument("--workers", type = int, default = 8)
+    parser.add_argument("--requests-per-second", type = float, default = 5.0)
+    parser.add_argument("--seconds-per-text", type = float, default = 0.02)
+    parser.add_argument("--parser", default = "html.parser")
+    parser.add_argument("--parse-workers", type = int, default = 0)
+    parser.add_argument("--queue-size", type = int, default = 64)
+    parser.add_argument("--embed-batch-size", type = int, default = 64)
+    args = parser.parse_args()
+
+    fetch_config = FetchConfig(max_workers = args.workers, per_host_concurrency = args.workers,
+                               requests_per_second = args.requests_per_second)
+    config = IngestConfig(queue_size = args.queue_size, parse_workers = args.parse_workers,
+                          embed_batch_size = args.embed_batch_size, parser = args.parser)
+
+    with _fixture_site_process(args.products) as shop_all_URL:
+        batch = run_batch(shop_all_URL, fetch_config, HashingEncoder(seconds_per_text = args.seconds_per_text), config)
+        streaming = run_streaming(shop_all_URL, fetch_config, HashingEncoder(seconds_per_text = args.seconds_per_text), config)
+    if batch.pop("names") != streaming.pop("names"):
+        raise SystemExit("Batch and streaming runs ingested different racquets.")
+
+    print(json.dumps({
+        "products": args.products,
+        "batch": batch,
+        "streaming": streaming,
+        "speedup": round(batch["searchable_seconds"] / streaming["searchable_seconds"], 2),
+    }, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
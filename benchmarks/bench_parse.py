@@ -0,0 +1,45 @@
+"""Time each product page parser backend and check it reproduces the html.parser records.
+
+    python -m benchmarks.bench_parse --pages 2000
+"""
+import argparse
+import importlib.util
+import json
+import time
+
+from benchmarks.fixture_site import FixtureSite
+from src.data.parse import PARSER_BACKENDS
+from src.data.scrape import _parse_racquet_features, _records_equal
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--pages", type = int, default = 2000)
+    args = parser.parse_args()
+
+    site = FixtureSite(n_products = args.pages)
+    pages = [site.product_page(i).encode("utf-8") for i in range(args.pages)]
+
+    golden = [_parse_racquet_features(page, parser = "html.parser") for page in pages]
+
+    results = {}
+    for backend, (builder, _) in PARSER_BACKENDS.items():
+        if builder == "lxml" and importlib.util.find_spec("lxml") is None:
+            results[backend] = "skipped (lxml not installed)"
+            continue
+        start = time.perf_counter()
+        records = [_parse_racquet_features(page, parser = backend) for page in pages]
+        seconds = time.perf_counter() - start
+        mismatches = sum(not _records_equal(a, b) for a, b in zip(records, golden))
+        results[backend] = {
+            "ms_per_page": round(1000 * seconds / len(pages), 3),
+            "mismatches": mismatches,
+        }
+
+    print(json.dumps({"pages": len(pages), "backends": results}, indent = 2))
+    if any(isinstance(r, dict) and r["mismatches"] for r in results.values()):
+        raise SystemExit("A parser backend produced different racquet records than html.parser.")
+
+
+if __name__ == "__main__":
+    main()
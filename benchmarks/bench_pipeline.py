@@ -0,0 +1,243 @@
+"""Time and memory-profile every pipeline stage end to end on synthetic catalogs, saving JSON per commit.
+
+    python -m benchmarks.bench_pipeline --scales 1000 100000 1000000
+    python -m benchmarks.bench_pipeline --scales 1000 100000 --compare benchmarks/results/<commit>.json
+
+For each scale a raw catalog is generated with benchmarks.synthetic (the messy "Head Size",
+"Balance", "String Pattern" ... spec strings of the raw scrape) and pushed through:
+
+- parse: product pages rendered by benchmarks.fixture_site and parsed by the scraper with --parser,
+  at most --parse-pages per scale (reported per page and extrapolated to the full scale)
+- preprocess.<stage>: every preprocess_raw_data stage, low_memory pipeline
+- combine.*: the natural v2 text builder and structured_combine_text
+- embed: benchmarks.encoder.HashingEncoder as a tiny stand-in model, on at most --embed-rows texts
+  (extrapolated like parse; the vectors are tiled up to the full catalog for the index stages)
+- index.*: the exact dense matrix, BM25 postings, filter columns and result records
+- query.*: --queries quiz-style searches per mode with the serving caches off, and one search_batch
+
+Peak memory is the tracemalloc peak of new allocations during the stage. Timings then include
+tracemalloc's overhead (several times slower for Python-heavy stages such as parse and embed), so
+only compare runs made with the same setting; --no-memory times the stages untraced. Results go to
+--output (benchmarks/results/<commit>.json by default). With --compare, per-stage time ratios
+against an earlier results file are printed, and the run exits with status 1 if any stage that took
+at least --min-seconds got more than --max-slowdown times slower.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_query_cache import QUIZ_QUERIES
+from benchmarks.encoder import HashingEncoder
+from benchmarks.fixture_site import render_product_page
+from benchmarks.load_test_search import QUERIES
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.parse import PARSER_BACKENDS
+from src.data.preprocess import _preprocess_stages
+from src.data.scrape import _parse_racquet_features
+from src.features.combine_text import create_natural_combined_text_v2_batch, structured_combine_text
+from src.search.dense import DenseIndex
+from src.search.filters import FilterEngine
+from src.search.lexical import BM25Index
+from src.search.service import SEARCH_MODES, SearchService, ServingConfig, result_records
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+class _Stages:
+    """Runs named stages, recording seconds and (when tracing) the peak memory of each."""
+
+    def __init__(self, trace: bool):
+        self.trace = trace
+        self.report = []
+
+    def run(self, name: str, func, **extra):
+        if self.trace:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        result = func()
+        stats = {"stage": name, "seconds": round(time.perf_counter() - start, 4)}
+        if self.trace:
+            _, peak = tracemalloc.get_traced_memory()
+            stats["peak_mb"] = round((peak - baseline) / 2**20, 1)
+        self.report.append({**stats, **extra})
+        return result
+
+
+# Helper function to identify the commit a run measured; "unknown" outside a git checkout
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], check = True, capture_output = True, text = True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], check = True,
+                               capture_output = True, text = True)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+
+def bench_scale(n_rows: int, parse_pages: int, parser: str, embed_rows: int, n_queries: int, k: int,
+                trace: bool) -> dict:
+    stages = _Stages(trace)
+    raw_df = stages.run("generate", lambda: synthetic_raw_catalog(n_rows))
+
+    n_pages = min(parse_pages, n_rows)
+    records = raw_df.head(n_pages).to_dict("records")
+    # Rows without a spec table come back with NaN spec columns; the fixture renders only present specs
+    records = [{key: value for key, value in record.items() if not (isinstance(value, float) and value != value)
+                or key == "racquet_rating"} for record in records]
+    pages = [render_product_page(record).encode("utf-8") for record in records]
+    stages.run("parse", lambda: [_parse_racquet_features(page, parser = parser) for page in pages], sampled = n_pages)
+    del records, pages
+
+    df = raw_df
+    for name, stage in _preprocess_stages(low_memory = True):
+        df = stages.run(f"preprocess.{name}", lambda: stage(df), rows = len(df))
+    del raw_df
+
+    texts = stages.run("combine.natural_v2", lambda: create_natural_combined_text_v2_batch(df).tolist())
+    object_cols = [col for col in df.select_dtypes(include = ["object"]).columns if col != "racquet_img"]
+    stages.run("combine.structured", lambda: structured_combine_text(df, object_cols))
+
+    encoder = HashingEncoder()
+    n_embed = min(embed_rows, len(texts))
+    sample = stages.run("embed", lambda: encoder(texts[:n_embed]), sampled = n_embed)
+    # Indexing and query costs depend on the matrix shape only, so the sample is tiled up to the catalog
+    embeddings = np.resize(sample, (len(texts), sample.shape[1]))
+    del sample
+    dense = stages.run("index.dense", lambda: DenseIndex(embeddings))
+    del embeddings
+    lexical = stages.run("index.bm25", lambda: BM25Index.build(texts))
+    filters = stages.run("index.filters", lambda: FilterEngine.from_frame(df))
+    records = stages.run("index.records", lambda: result_records(df.reset_index(drop = True)))
+
+    config = ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1)
+    service = SearchService(records = records, filters = filters, index = dense, encode = encoder,
+                            lexical = lexical, config = config)
+    pool = QUIZ_QUERIES + QUERIES
+    queries = [pool[i % len(pool)] for i in range(n_queries)]
+    for mode in SEARCH_MODES:
+        stages.run(f"query.{mode}", lambda: [service.search(query, k, mode = mode) for query in queries],
+                   queries = n_queries)
+    stages.run("query.hybrid_batch", lambda: service.search_batch(queries, k), queries = n_queries)
+    service.close()
+
+    report = stages.report
+    for stats in report:
+        if "sampled" in stats:
+            full = n_rows if stats["stage"] == "parse" else len(texts)
+            stats["ms_per_item"] = round(1000 * stats["seconds"] / max(1, stats["sampled"]), 3)
+            stats["extrapolated_seconds"] = round(stats["seconds"] * full / max(1, stats["sampled"]), 2)
+        elif stats["stage"].startswith("query."):
+            stats["qps"] = round(n_queries / stats["seconds"], 1) if stats["seconds"] else None
+
+    return {
+        "rows_in": n_rows,
+        "rows_out": len(df),
+        "stages": report,
+        "total_seconds": round(sum(stats["seconds"] for stats in report), 3),
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10), 1),
+    }
+
+
+def compare(results: dict, baseline: dict, min_seconds: float) -> list[dict]:
+    """Per-stage time ratios of results against an earlier run.
+
+    Args:
+        results (dict): Output of this benchmark.
+        baseline (dict): Earlier output of this benchmark.
+        min_seconds (float): Stages faster than this in both runs are left out as too noisy.
+
+    Returns:
+        list[dict]: scale, stage, both timings and ratio (> 1 is slower), for stages in both runs.
+    """
+    rows = []
+    for scale, run in results["scales"].items():
+        before = {stats["stage"]: stats["seconds"] for stats in baseline["scales"].get(scale, {}).get("stages", [])}
+        for stats in run["stages"]:
+            if stats["stage"] not in before or max(stats["seconds"], before[stats["stage"]]) < min_seconds:
+                continue
+            rows.append({
+                "scale": int(scale),
+                "stage": stats["stage"],
+                "baseline_seconds": before[stats["stage"]],
+                "seconds": stats["seconds"],
+                "ratio": round(stats["seconds"] / max(before[stats["stage"]], 1e-9), 2),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--scales", type = int, nargs = "+", default = [1_000, 100_000, 1_000_000])
+    parser.add_argument("--parse-pages", type = int, default = 100, help = "Product pages parsed per scale")
+    parser.add_argument("--parser", choices = list(PARSER_BACKENDS), default = "html.parser",
+                        help = "Product page parser backend, as passed to scrape_tw_rackets")
+    parser.add_argument("--embed-rows", type = int, default = 20_000, help = "Texts embedded per scale")
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("--k", type = int, default = 10)
+    parser.add_argument("--no-memory", action = "store_true", help = "Time stages without tracemalloc")
+    parser.add_argument("--output", default = None, help = "Results file. Defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", default = None, help = "Earlier results file to compare against")
+    parser.add_argument("--max-slowdown", type = float, default = 1.5)
+    parser.add_argument("--min-seconds", type = float, default = 0.05)
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "memory_traced": not args.no_memory,
+        "settings": {"parse_pages": args.parse_pages, "parser": args.parser, "embed_rows": args.embed_rows,
+                     "queries": args.queries, "k": args.k},
+        "scales": {},
+    }
+    if not args.no_memory:
+        tracemalloc.start()
+    try:
+        for n_rows in args.scales:
+            run = bench_scale(n_rows, args.parse_pages, args.parser, args.embed_rows, args.queries, args.k,
+                              trace = not args.no_memory)
+            results["scales"][str(n_rows)] = run
+            print(f"{n_rows} racquets: {run['total_seconds']} s", file = sys.stderr)
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok = True)
+    with open(output, "w", encoding = "utf-8") as f:
+        json.dump(results, f, indent = 2)
+    print(json.dumps(results, indent = 2))
+    print(f"Saved results to {output}.", file = sys.stderr)
+
+    if args.compare is not None:
+        with open(args.compare, "r", encoding = "utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("memory_traced") != results["memory_traced"] or baseline.get("settings") != results["settings"]:
+            print(f"{args.compare} was run with different settings; timings are not comparable.", file = sys.stderr)
+        rows = compare(results, baseline, args.min_seconds)
+        print(json.dumps({"baseline_commit": baseline.get("commit"), "stages": rows}, indent = 2))
+        slower = [row for row in rows if row["ratio"] > args.max_slowdown]
+        if slower:
+            for row in slower:
+                print(f"{row['stage']} at {row['scale']} racquets is {row['ratio']}x slower than {baseline.get('commit')}.",
+                      file = sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
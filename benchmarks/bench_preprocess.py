@@ -0,0 +1,38 @@
+"""Time and memory-profile each preprocess_raw_data stage on a synthetically scaled raw catalog.
+
+Runs the default (copying) pipeline and the low_memory pipeline and checks they agree.
+
+    python -m benchmarks.bench_preprocess --rows 100000
+"""
+import argparse
+import json
+
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import profile_preprocess
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, default = 100_000)
+    args = parser.parse_args()
+
+    raw_df = synthetic_raw_catalog(args.rows)
+
+    results = {"rows_in": len(raw_df)}
+    outputs = {}
+    for mode, low_memory in [("default", False), ("low_memory", True)]:
+        outputs[mode], stage_report = profile_preprocess(raw_df, low_memory = low_memory)
+        results[mode] = {
+            "stages": {stats["stage"]: {"seconds": round(stats["seconds"], 3), "peak_mb": round(stats["peak_mb"], 1)}
+                       for stats in stage_report},
+            "total_seconds": round(sum(stats["seconds"] for stats in stage_report), 3),
+            "max_peak_mb": round(max(stats["peak_mb"] for stats in stage_report), 1),
+        }
+    results["rows_out"] = len(outputs["default"])
+    results["outputs_equal"] = outputs["default"].equals(outputs["low_memory"])
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Recall@k, queries per second and memory of int8 / float16 quantized search against exact float32.
+
+    python -m benchmarks.bench_quantized --vectors 200000 --dim 384 --rerank 0 50 100 200
+
+Vectors and queries are generated as in bench_ann. For each precision the coarse pass scores every
+row against the quantized codes; rerank is the shortlist then re-scored against the float32 matrix
+(0 returns coarse scores as is). "coarse_mb" is the memory the coarse pass reads per query, against
+"float32_mb" for exact search; with a bundle the float32 matrix stays memory-mapped and only the
+shortlisted rows are touched. "batch_qps" scores --batch-size queries per pass over the codes.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_ann import synthetic_vectors
+from src.search.dense import DenseIndex
+from src.search.quantized import PRECISIONS, QuantizedIndex
+
+
+def _timed(search, queries: np.ndarray, k: int) -> tuple[list[np.ndarray], float]:
+    start = time.perf_counter()
+    results = [search(query, k)[0] for query in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def _batch_qps(index, queries: np.ndarray, k: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(queries), batch_size):
+        index.search_batch(queries[offset:offset + batch_size], k)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--vectors", type = int, default = 200_000)
+    parser.add_argument("--dim", type = int, default = 384)
+    parser.add_argument("--topics", type = int, default = 2_000)
+    parser.add_argument("--queries", type = int, default = 200)
+    parser.add_argument("-k", type = int, default = 10)
+    parser.add_argument("--rerank", type = int, nargs = "+", default = [0, 50, 100, 200])
+    parser.add_argument("--batch-size", type = int, default = 64)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace = False)]
+    queries = queries + rng.standard_normal(queries.shape, dtype = np.float32) * 0.5
+
+    exact = DenseIndex(vectors)
+    del vectors
+    truth, exact_qps = _timed(exact.search, queries, args.k)
+    results = {
+        "vectors": args.vectors,
+        "dim": args.dim,
+        "float32_mb": round(exact.matrix.nbytes / 2**20, 1),
+        "exact_qps": round(exact_qps, 1),
+        "exact_batch_qps": round(_batch_qps(exact, queries, args.k, args.batch_size), 1),
+    }
+
+    for precision in PRECISIONS:
+        start = time.perf_counter()
+        index = QuantizedIndex.build(exact.matrix, precision, normalized = True)
+        runs = {
+            "build_seconds": round(time.perf_counter() - start, 2),
+            "coarse_mb": round((index.codes.nbytes + (index.scales.nbytes if index.scales is not None else 0)) / 2**20, 1),
+            "runs": [],
+        }
+        for rerank in args.rerank:
+            index.rerank = rerank
+            found, qps = _timed(index.search, queries, args.k)
+            recall = np.mean([len(np.intersect1d(a, b)) / args.k for a, b in zip(found, truth)])
+            runs["runs"].append({
+                "rerank": rerank,
+                f"recall@{args.k}": round(float(recall), 4),
+                "qps": round(qps, 1),
+                "batch_qps": round(_batch_qps(index, queries, args.k, args.batch_size), 1),
+            })
+        results[precision] = runs
+        del index
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
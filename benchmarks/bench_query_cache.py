@@ -0,0 +1,93 @@
+"""Measure query caching and micro-batched encoding under concurrent quiz-style traffic.
+
+    python -m benchmarks.bench_query_cache --rows 5000 --clients 16 --requests 2000
+
+Queries combine the three answers of webapp/frontend/quiz.html (27 distinct queries) plus a share
+of unique free-text queries. The encoder is benchmarks.encoder.HashingEncoder with a fixed cost
+per call and per text, standing in for a sentence-transformers forward pass.
+"""
+import argparse
+import itertools
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.encoder import HashingEncoder
+from benchmarks.load_test_search import QUERIES
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.search.lexical import BM25Index
+from src.search.service import SearchService, ServingConfig
+
+QUIZ_QUERIES = [
+    f"{level} player with a {swing.lower()} swing who wants {preference.lower()}"
+    for level, swing, preference in itertools.product(
+        ["Beginner", "Intermediate", "Advanced"], ["Short", "Medium", "Long"], ["Power", "Control", "Balanced"]
+    )
+]
+
+CONFIGS = {
+    "no_cache_no_batching": ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1),
+    "batching_only": ServingConfig(query_cache_size = 0, result_cache_size = 0),
+    "query_cache_and_batching": ServingConfig(result_cache_size = 0),
+    "all": ServingConfig(),
+}
+
+
+def make_queries(n: int, unique_share: float, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(QUERIES)} {i}" if rng.random() < unique_share else rng.choice(QUIZ_QUERIES)
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, default = 5_000)
+    parser.add_argument("--clients", type = int, default = 16)
+    parser.add_argument("--requests", type = int, default = 2_000)
+    parser.add_argument("--unique-share", type = float, default = 0.2, help = "Share of never-repeated queries")
+    parser.add_argument("--call-ms", type = float, default = 15.0, help = "Simulated encoder cost per call")
+    parser.add_argument("--text-ms", type = float, default = 1.0, help = "Simulated encoder cost per text")
+    args = parser.parse_args()
+
+    df = preprocess_raw_data(synthetic_raw_catalog(args.rows), low_memory = True)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    embeddings = HashingEncoder()(texts)
+    lexical = BM25Index.build(texts)
+    queries = make_queries(args.requests, args.unique_share)
+
+    results = {"racquets": len(df), "clients": args.clients, "requests": args.requests}
+    for name, config in CONFIGS.items():
+        encoder = HashingEncoder(seconds_per_call = args.call_ms / 1000, seconds_per_text = args.text_ms / 1000)
+        service = SearchService.from_frame(df, embeddings, encoder, lexical, config = config)
+
+        def one_query(query: str) -> float:
+            start = time.perf_counter()
+            service.search(query, 10)
+            return (time.perf_counter() - start) * 1000
+
+        with ThreadPoolExecutor(max_workers = args.clients) as executor:
+            start = time.perf_counter()
+            latencies = list(executor.map(one_query, queries))
+            wall = time.perf_counter() - start
+        p50, p99 = np.percentile(latencies, [50, 99])
+        results[name] = {
+            "throughput_qps": round(args.requests / wall, 1),
+            "p50_ms": round(float(p50), 2),
+            "p99_ms": round(float(p99), 2),
+            "encoder_calls": encoder.calls,
+            "metrics": service.metrics(),
+        }
+        service.close()
+
+    print(json.dumps(results, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
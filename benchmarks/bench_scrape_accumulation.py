@@ -0,0 +1,78 @@
+"""Compare building the scraped DataFrame with pd.concat in the loop vs. once from records.
+
+Crawls a synthetic fixture site served on localhost, then replays the collected racquets through
+both accumulation strategies and reports wall time and tracemalloc peak memory for each.
+
+    python -m benchmarks.bench_scrape_accumulation --products 10000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.fixture_site import FixtureSite, serve_fixture_site
+from src.data.fetch import Fetcher, FetchConfig
+from src.data.scrape import _get_brand_URLs, _get_product_page_URLs, _get_racquet_features
+
+
+def _crawl_records(shop_all_URL: str, fetch_config: FetchConfig) -> list[dict]:
+    with Fetcher(fetch_config) as fetcher:
+        brand_URLs = _get_brand_URLs(shop_all_URL, fetcher = fetcher)
+        product_URLs = [URL for URL_list in fetcher.map(lambda URL: _get_product_page_URLs(URL, fetcher = fetcher), brand_URLs)
+                        for URL in URL_list]
+        return list(fetcher.map(lambda URL: _get_racquet_features(URL, fetcher = fetcher, parser = "strainer"), product_URLs))
+
+
+def _concat_in_loop(records: list[dict]) -> pd.DataFrame:
+    # The pre-refactor pattern: one single-row DataFrame per racquet, concatenated onto everything so far
+    df = pd.DataFrame()
+    for record in records:
+        df = pd.concat([df, pd.DataFrame(record, index = [0])])
+    return df
+
+
+def _from_records(records: list[dict]) -> pd.DataFrame:
+    return pd.DataFrame.from_records(records)
+
+
+def _measure(func, records: list[dict]) -> tuple[pd.DataFrame, dict]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = func(records)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, {"seconds": round(seconds, 3), "peak_mb": round(peak / 2**20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--products", type = int, default = 10_000)
+    parser.add_argument("--workers", type = int, default = 16)
+    args = parser.parse_args()
+
+    site = FixtureSite(n_products = args.products)
+    fetch_config = FetchConfig(max_workers = args.workers, per_host_concurrency = args.workers, requests_per_second = 0)
+
+    with serve_fixture_site(site) as shop_all_URL:
+        start = time.perf_counter()
+        records = _crawl_records(shop_all_URL, fetch_config)
+        crawl_seconds = time.perf_counter() - start
+
+    legacy_df, legacy = _measure(_concat_in_loop, records)
+    records_df, from_records = _measure(_from_records, records)
+    assert legacy_df.reset_index(drop = True).equals(records_df), "accumulation strategies disagree"
+
+    print(json.dumps({
+        "products": len(records),
+        "crawl_seconds": round(crawl_seconds, 3),
+        "concat_in_loop": legacy,
+        "from_records": from_records,
+        "speedup": round(legacy["seconds"] / max(from_records["seconds"], 1e-9), 1),
+    }, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
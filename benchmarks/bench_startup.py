@@ -0,0 +1,131 @@
+"""Time backend cold starts: serving from a prebuilt bundle vs from the dataset.
+
+    python -m benchmarks.bench_startup --rows 20000 --max-ready-ms 1000
+
+Each start runs in a fresh interpreter, imports webapp.backend.app, loads the service and binds the
+HTTP server. "ready_ms" is measured inside the child from interpreter start; "process_ms" is the
+parent's wall time including interpreter startup and exit. The dataset path is given a
+HashingEncoder and a warm EmbeddingStore, so it leaves out the model load a real start would add.
+The bundle path uses the lazy model encoder without warm-up. Exits with status 1 if the median
+bundle ready time is over --max-ready-ms.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.encoder import HashingEncoder
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.data.storage import save_dataset
+from src.features.combine_text import NATURAL_V2_TEMPLATE_VERSION, create_natural_combined_text_v2_batch
+from src.features.embedding_store import EmbeddingStore
+from src.search.bundle import build_bundle
+
+MODEL_NAME = "hashing-384"
+# Modules a fast start should not import
+HEAVY_MODULES = ("pandas", "sentence_transformers", "torch", "matplotlib", "seaborn", "marimo")
+
+_CHILD = """
+import sys, time, json, os
+ready_start = time.perf_counter()
+from webapp.backend.app import SearchServer
+{load}
+server = SearchServer(("127.0.0.1", 0), service)
+ready = time.perf_counter()
+service.search("lightweight racquet for spin under $200", 10, mode = "lexical")
+first_query = time.perf_counter()
+print(json.dumps({{
+    "ready_ms": (ready - ready_start) * 1000 + {interpreter_ms},
+    "first_lexical_query_ms": (first_query - ready) * 1000,
+    "heavy_imports": [name for name in {heavy} if name in sys.modules],
+}}))
+server.server_close()
+service.close()
+"""
+_LOAD_BUNDLE = """
+from src.search.bundle import load_bundle_service
+service = load_bundle_service({bundle!r}, warm_up = False)
+"""
+_LOAD_DATASET = """
+from benchmarks.encoder import HashingEncoder
+from src.search.service import load_search_service
+service = load_search_service({data!r}, {store!r}, model_name = {model!r}, encode = HashingEncoder())
+"""
+
+
+# Helper function to time the bare interpreter, which the child's own clock cannot see
+def _interpreter_ms() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check = True)
+    return (time.perf_counter() - start) * 1000
+
+
+def _cold_starts(load: str, runs: int, interpreter_ms: float) -> dict:
+    code = _CHILD.format(load = load, interpreter_ms = interpreter_ms, heavy = HEAVY_MODULES)
+    reports, wall = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], check = True, capture_output = True, text = True).stdout
+        wall.append((time.perf_counter() - start) * 1000)
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        "ready_ms_median": round(float(np.median([report["ready_ms"] for report in reports])), 1),
+        "process_ms_median": round(float(np.median(wall)), 1),
+        "first_lexical_query_ms_median": round(float(np.median([report["first_lexical_query_ms"] for report in reports])), 2),
+        "heavy_imports": reports[-1]["heavy_imports"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--rows", type = int, default = 20_000)
+    parser.add_argument("--runs", type = int, default = 5)
+    parser.add_argument("--max-ready-ms", type = float, default = 1000.0)
+    args = parser.parse_args()
+
+    df = preprocess_raw_data(synthetic_raw_catalog(args.rows), low_memory = True)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    encoder = HashingEncoder()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = os.path.join(tmp_dir, "racquets.csv")
+        store_dir = os.path.join(tmp_dir, "store")
+        bundle_dir = os.path.join(tmp_dir, "bundle")
+        save_dataset(df, data_path)
+        embeddings = EmbeddingStore(store_dir).refresh(texts, encoder, MODEL_NAME, NATURAL_V2_TEMPLATE_VERSION)
+        start = time.perf_counter()
+        build_bundle(df, texts, embeddings, bundle_dir, MODEL_NAME, NATURAL_V2_TEMPLATE_VERSION)
+        build_seconds = time.perf_counter() - start
+
+        interpreter_ms = _interpreter_ms()
+        dataset_load = _LOAD_DATASET.format(data = data_path, store = store_dir, model = MODEL_NAME)
+        # One untimed start builds the BM25 cache the dataset path reuses afterwards
+        _cold_starts(dataset_load, 1, interpreter_ms)
+        results = {
+            "racquets": len(df),
+            "bundle_build_seconds": round(build_seconds, 2),
+            "bundle_mb": round(sum(
+                os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(os.path.realpath(bundle_dir))
+                for name in names
+            ) / 2**20, 1),
+            "interpreter_ms": round(interpreter_ms, 1),
+            "bundle": _cold_starts(_LOAD_BUNDLE.format(bundle = bundle_dir), args.runs, interpreter_ms),
+            "dataset": _cold_starts(dataset_load, args.runs, interpreter_ms),
+        }
+
+    print(json.dumps(results, indent = 2))
+    if results["bundle"]["ready_ms_median"] > args.max_ready_ms:
+        print(f"Bundle startup {results['bundle']['ready_ms_median']} ms is over the {args.max_ready_ms} ms budget.",
+              file = sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
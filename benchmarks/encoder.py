@@ -0,0 +1,48 @@
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words stand-in for a sentence-transformers model.
+
+    Each token is hashed into one of dim buckets with a +/-1 sign and the counts are L2-normalized,
+    so texts sharing words get similar vectors. seconds_per_call and seconds_per_text add a sleep per
+    call and per encoded text to mimic a model forward pass on CPU; like a model that already uses
+    every core, only one simulated forward pass runs at a time. texts_encoded and calls count the
+    work done.
+    """
+
+    def __init__(self, dim: int = 384, seconds_per_text: float = 0.0, seconds_per_call: float = 0.0):
+        self.dim = dim
+        self.seconds_per_text = seconds_per_text
+        self.seconds_per_call = seconds_per_call
+        self.texts_encoded = 0
+        self.calls = 0
+        self._model_lock = threading.Lock()
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        h = zlib.crc32(token.encode("utf-8"))
+        return h % self.dim, 1.0 if (h >> 16) & 1 else -1.0
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.texts_encoded += len(texts)
+        self.calls += 1
+        if self.seconds_per_call or self.seconds_per_text:
+            with self._model_lock:
+                time.sleep(self.seconds_per_call + self.seconds_per_text * len(texts))
+
+        matrix = np.zeros((len(texts), self.dim), dtype = np.float32)
+        for i, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                bucket, sign = self._bucket(token)
+                matrix[i, bucket] += sign
+        norms = np.linalg.norm(matrix, axis = 1, keepdims = True)
+        norms[norms == 0] = 1.0
+
+        return matrix / norms
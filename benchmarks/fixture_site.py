@@ -0,0 +1,149 @@
+import hashlib
+import html
+import random
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+from benchmarks.synthetic import synthetic_racquet
+
+_TOP_LEVEL_FIELDS = ("racquet_img", "racquet_name", "racquet_rating", "racquet_price", "racquet_desc")
+
+# Navigation, related-product and script markup that real product pages carry around the fields we parse
+_MENU_HTML = "".join(
+    f'<li class="menu-item"><a class="menu-link" href="/cat{i}.html"><span>Category {i}</span></a></li>'
+    for i in range(400)
+)
+_RELATED_HTML = "".join(
+    f'<div class="related-card"><a href="/related{i}.html"><img src="/r{i}.jpg" alt="Related {i}">'
+    f'<p class="related-name">Related racquet {i}</p><p class="related-price">${100 + i}.00</p></a></div>'
+    for i in range(40)
+)
+_SCRIPT_HTML = "<script>" + "window.dataLayer=window.dataLayer||[];" * 200 + "</script>"
+
+
+def render_product_page(record: dict) -> str:
+    """Render a raw racquet record as a Tennis Warehouse style product page.
+
+    Args:
+        record (dict): Raw racquet record from synthetic_racquet.
+
+    Returns:
+        str: Product page HTML with the elements the scraper looks for.
+    """
+    rating = record["racquet_rating"]
+    rating_html = f'<div class="review_agg">{rating}</div>' if rating == rating else ""
+    specs = [(label, value) for label, value in record.items() if label not in _TOP_LEVEL_FIELDS]
+    if specs:
+        cells = "".join(
+            f'<td class="Specs_{i % 2}"><strong>{html.escape(label)}:</strong> {html.escape(str(value))}</td>'
+            for i, (label, value) in enumerate(specs)
+        )
+        spec_table = f'<table class="spec_table"><tbody><tr>{cells}</tr></tbody></table>'
+    else:
+        spec_table = ""
+
+    return (
+        f"<html><head><title>Tennis Warehouse</title>{_SCRIPT_HTML}</head><body>"
+        f'<nav><ul class="nav">{_MENU_HTML}</ul></nav>'
+        f'<img class="main_image is-zoomable" src="{html.escape(record["racquet_img"])}">'
+        f'<h1 class="h2 desc_top-head-title">{html.escape(record["racquet_name"])}</h1>'
+        f"{rating_html}"
+        f'<span class="afterpay-full_price">{record["racquet_price"]}</span>'
+        f'<div class="check_read"><div class="check_read-inner">{html.escape(record["racquet_desc"])}</div></div>'
+        f"{spec_table}"
+        f'<section class="related">{_RELATED_HTML}</section>'
+        "<footer><p>Tennis Warehouse fixture page</p></footer></body></html>"
+    )
+
+
+class FixtureSite:
+    """Synthetic Tennis Warehouse catalog: a shop-all page, brand pages and product pages."""
+
+    def __init__(self, n_products: int, n_brands: int = 10, seed: int = 0):
+        rng = random.Random(seed)
+        self.records = [synthetic_racquet(i, rng) for i in range(n_products)]
+        self.n_brands = n_brands
+        self.requests_served = 0
+        self.bytes_served = 0
+
+    def shop_all_page(self) -> str:
+        brand_links = "".join(f'<li><a href="/brand{b}.html">Brand {b}</a></li>' for b in range(self.n_brands))
+        return (
+            '<html><body><ul class="left_menu-section"><li><a href="/">Racquets</a></li></ul>'
+            f'<ul class="left_menu-section">{brand_links}</ul></body></html>'
+        )
+
+    def brand_page(self, base_URL: str, brand: int) -> str:
+        product_links = "".join(
+            f'<a class="cattable-wrap-cell-info" href="{base_URL}/product{i}.html">{i}</a>'
+            for i in range(brand, len(self.records), self.n_brands)
+        )
+        return f"<html><body>{product_links}</body></html>"
+
+    def product_page(self, i: int) -> str:
+        return render_product_page(self.records[i])
+
+
+def _make_handler(site: FixtureSite):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            base_URL = f"http://{self.headers['Host']}"
+            path = self.path.split("?")[0]
+            try:
+                if path == "/TennisRacquets.html":
+                    body = site.shop_all_page()
+                elif path.startswith("/brand"):
+                    body = site.brand_page(base_URL, int(path[len("/brand"):-len(".html")]))
+                elif path.startswith("/product"):
+                    body = site.product_page(int(path[len("/product"):-len(".html")]))
+                else:
+                    raise ValueError(path)
+            except (ValueError, IndexError):
+                self.send_error(404)
+                return
+            payload = body.encode("utf-8")
+            etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+            site.requests_served += 1
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            site.bytes_served += len(payload)
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return _Handler
+
+
+@contextmanager
+def serve_fixture_site(site: FixtureSite) -> Iterator[str]:
+    """Serve a fixture site on a local port for the duration of the context.
+
+    Args:
+        site (FixtureSite): Site to serve.
+
+    Yields:
+        str: Shop-all URL to pass to scrape_tw_rackets.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(site))
+    server.daemon_threads = True
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/TennisRacquets.html"
+    finally:
+        server.shutdown()
+        server.server_close()
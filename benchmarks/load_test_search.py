@@ -0,0 +1,124 @@
+"""Load-test the /search endpoint with concurrent clients and report throughput and latency.
+
+    python -m benchmarks.load_test_search --rows 100000 --clients 8 --requests 4000
+    python -m benchmarks.load_test_search --url http://127.0.0.1:8000 --clients 8
+
+Without --url, a local server is started on a synthetic catalog with benchmarks.encoder.HashingEncoder
+standing in for the embedding model, and with the query/result caches and micro-batching off so
+the numbers stay comparable across commits. "search" percentiles are the server-side index time (excluding
+query encoding); "round_trip" percentiles are what each client saw.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import numpy as np
+import requests
+
+from benchmarks.encoder import HashingEncoder
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.search.service import SearchService, ServingConfig
+from webapp.backend.app import SearchServer
+
+QUERIES = [
+    "black and pink racquet with low power under $200",
+    "head light control racquet for fast swings",
+    "powerful oversize racquet for beginners",
+    "98 square inch head with a dense string pattern",
+    "lightweight Babolat with an open string pattern",
+    "stiff racquet with a thin beam for full strokes",
+    "Wilson Blade with a 16 by 19 pattern",
+    "arm friendly flexible graphite frame",
+]
+
+
+def _percentiles(values: list[float]) -> dict:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+
+def run_load_test(base_url: str, clients: int, n_requests: int, k: int) -> dict:
+    """Send n_requests /search queries from clients concurrent sessions.
+
+    Args:
+        base_url (str): Server root, e.g. http://127.0.0.1:8000.
+        clients (int): Number of concurrent clients.
+        n_requests (int): Total number of requests.
+        k (int): Results per query.
+
+    Returns:
+        dict: Throughput, error count and latency percentiles in milliseconds.
+    """
+    local = threading.local()
+
+    def one_request(i: int) -> tuple[float, float | None]:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        url = f"{base_url}/search?{urlencode({'q': QUERIES[i % len(QUERIES)], 'k': k})}"
+        start = time.perf_counter()
+        response = local.session.get(url, timeout = 30)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code != 200:
+            return elapsed, None
+        return elapsed, response.json()["timings_ms"]["search"]
+
+    # Warm up connections and caches before timing
+    with ThreadPoolExecutor(max_workers = clients) as executor:
+        list(executor.map(one_request, range(clients * 2)))
+
+        start = time.perf_counter()
+        outcomes = list(executor.map(one_request, range(n_requests)))
+        wall = time.perf_counter() - start
+
+    round_trips = [elapsed for elapsed, _ in outcomes]
+    search_times = [search for _, search in outcomes if search is not None]
+
+    return {
+        "clients": clients,
+        "requests": n_requests,
+        "errors": n_requests - len(search_times),
+        "throughput_qps": round(n_requests / wall, 1),
+        "round_trip_ms": _percentiles(round_trips),
+        "search_ms": _percentiles(search_times) if search_times else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--url", default = None, help = "Running server to test. Defaults to a local synthetic one.")
+    parser.add_argument("--rows", type = int, default = 100_000, help = "Synthetic catalog size for the local server.")
+    parser.add_argument("--clients", type = int, default = 8)
+    parser.add_argument("--requests", type = int, default = 2000)
+    parser.add_argument("-k", type = int, default = 10)
+    args = parser.parse_args()
+
+    if args.url:
+        print(json.dumps(run_load_test(args.url.rstrip("/"), args.clients, args.requests, args.k), indent = 2))
+        return
+
+    df = preprocess_raw_data(synthetic_raw_catalog(args.rows), low_memory = True)
+    encoder = HashingEncoder()
+    # QUERIES repeats, so the query and result caches would turn every request after the first pass into a hit
+    config = ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1)
+    service = SearchService.from_frame(df, encoder(create_natural_combined_text_v2_batch(df).tolist()), encoder,
+                                       config = config)
+
+    server = SearchServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    try:
+        results = run_load_test(f"http://127.0.0.1:{server.server_port}", args.clients, args.requests, args.k)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(json.dumps({"racquets": len(service), **results}, indent = 2))
+
+
+if __name__ == "__main__":
+    main()
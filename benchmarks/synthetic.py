@@ -0,0 +1,95 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+# Value pools mirror the formats seen in .datashelf/racquets/scraped_racquet_data_raw.csv
+_BRANDS = ["Babolat", "Wilson", "Head", "Yonex", "Prince", "Tecnifibre", "Dunlop", "Volkl", "Solinco", "ProKennex"]
+_MODELS = ["Pure Drive", "Pure Aero", "Blade", "Pro Staff", "Clash", "Speed", "Radical", "Ezone", "Vcore", "Percept",
+           "Tour", "TF40", "CX 200", "V-Cell", "Whiteout", "Ki Q+", "Boost Aero", "Ultra", "Phantom", "Extreme"]
+_SUFFIXES = ["", " 98", " 100", " MP", " Pro", " Tour", " Lite", " 2025", " Pink", " Black", " Junior 25"]
+_HEAD_SIZES = ["{h} in² / {cm:.2f} cm²", "{h}in² / {cm:.0f}cm²"]
+_LENGTHS = ["27in / 68.58cm", "27.5in / 69.85cm", "25 in / 63.50 cm", "26 in / 66.04 cm", "27.25in / 69.22cm"]
+_COMPOSITIONS = ["Graphite", "Auxetic 2/Graphene Inside/Graphite", "Red Cell/Graphite", "Carbon Fiber Graphite",
+                 "40T Carbon/Graphite", "Sonic Core Infinergy/Graphite"]
+_POWER = ["Low-Medium", "Low", "Medium", "Medium-High", "High"]
+_STROKE = ["Medium-Full", "Full", "Medium", "Compact-Medium", "Compact", "Long"]
+_SPEED = ["Medium-Fast", "Fast", "Medium", "Slow-Moderate", "Slow", "Moderate-Fast"]
+_COLORS = ["Blue", "White", "Red", "Black", "Green", "Orange", "Black/Pink", "White/Blue"]
+_GRIPS = ["Wilson Pro Performance", "Head Hydrosorb Pro", "Yonex Synthetic", "ProKennex Synthetic", "Volkl VSENSE Grip"]
+_PATTERN_TAILS = ["Mains skip", "\n\n\nMains skip", ""]
+_DESC_SENTENCES = [
+    "This racquet comes pre-strung for added convenience and value!",
+    "Boasting an appeal that cuts across ability levels, this modern player's racquet offers an easy learning curve.",
+    "From the baseline it swings easy and delivers a very precise and reliable response.",
+    "With its open string pattern it is easier to load the ball with spin.",
+    "On service returns and at net this racquet comes around wonderfully fast.",
+    "The crisp feel and excellent control help with targeting on big swings.",
+    "It reserves its greatest charm for the baseliner who likes dictating action with heavy pace.",
+]
+
+
+def synthetic_racquet(i: int, rng: random.Random) -> dict:
+    """Generate one raw racquet record shaped like a row of the raw scrape.
+
+    About a fifth of rows are missing the spec table, like listings in the real scrape.
+
+    Args:
+        i (int): Row number, used to make names and image paths unique.
+        rng (random.Random): Random number generator.
+
+    Returns:
+        dict: Raw racquet record keyed by the scraped column/spec labels.
+    """
+    brand = rng.choice(_BRANDS)
+    record = {
+        "racquet_img": f"https://img.tennis-warehouse.com/watermark/rs.php?path=SYN{i}-1.jpg&nw=455",
+        "racquet_name": f"{brand} {rng.choice(_MODELS)}{rng.choice(_SUFFIXES)} {i}",
+        "racquet_rating": round(rng.uniform(3.5, 5.0), 1) if rng.random() < 0.7 else np.nan,
+        "racquet_price": float(rng.randrange(39, 329)),
+        "racquet_desc": " " + " ".join(rng.sample(_DESC_SENTENCES, rng.randint(2, len(_DESC_SENTENCES)))),
+    }
+    if rng.random() < 0.2:
+        return record
+
+    head_size = rng.choice([95, 97, 98, 100, 102, 104, 105, 107, 110])
+    balance_pts = rng.randint(0, 9)
+    balance_label = "EB" if balance_pts == 0 else rng.choice(["HL", "HL", "HL", "HH"])
+    balance_in = round(13.5 + (balance_pts if balance_label == "HH" else -balance_pts) / 8, 2)
+    beam = [round(rng.uniform(19, 28) * 2) / 2 for _ in range(3)]
+    tension_lower = rng.randint(40, 55)
+    record.update({
+        "Head Size": rng.choice(_HEAD_SIZES).format(h = head_size, cm = head_size * 6.4516),
+        "Length": rng.choice(_LENGTHS),
+        "Strung Weight": f"{round(rng.uniform(9.5, 12.5), 1)}oz / {rng.randint(270, 355)}g",
+        "Balance": f"{balance_in}in / {balance_in * 2.54:.2f}cm / {balance_pts} pts {balance_label}",
+        "Swingweight": float(rng.randint(280, 340)),
+        "Stiffness": "N/A (very low)" if rng.random() < 0.01 else str(rng.randint(54, 75)),
+        "Beam Width": (f"{beam[0]}mm Straight Beam" if rng.random() < 0.02
+                       else " / ".join(f"{b:g}mm" for b in beam)),
+        "Composition": rng.choice(_COMPOSITIONS),
+        "Power Level": rng.choice(_POWER),
+        "Stroke Style": rng.choice(_STROKE),
+        "Swing Speed": rng.choice(_SPEED),
+        "Racquet Colors": rng.choice(_COLORS),
+        "Grip Type": rng.choice(_GRIPS),
+        "String Pattern": f"{rng.choice([16, 18])} Mains / {rng.randint(16, 20)} Crosses{rng.choice(_PATTERN_TAILS)}",
+        "String Tension": f"{tension_lower}-{tension_lower + rng.randint(4, 15)} pounds",
+    })
+
+    return record
+
+
+def synthetic_raw_catalog(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Generate a raw catalog DataFrame with the same columns and messy formats as the raw scrape.
+
+    Args:
+        n_rows (int): Number of racquets.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: Raw catalog, one row per racquet.
+    """
+    rng = random.Random(seed)
+
+    return pd.DataFrame.from_records([synthetic_racquet(i, rng) for i in range(n_rows)])
@@ -0,0 +1,90 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from src.instrumentation import add_cli_args, cli_run
+from src.search.bundle import load_bundle_service
+from src.search.service import DEFAULT_MODEL, FUSIONS, SEARCH_MODES, ServingConfig, load_search_service, parse_batch_item
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Score a JSONL file of queries (e.g. saved quiz preferences) against the catalog in large batches.",
+        epilog='Input lines are a query string or {"id": ..., "q": ..., "max_price": ...}. Output lines are '
+               '{"id": ..., "query": ..., "filters": [...], "results": [...]}, in input order.',
+    )
+    parser.add_argument("--input", required=True, help="JSONL file of queries, or - for stdin.")
+    parser.add_argument("--output", default="-", help="JSONL file to write results to, or - for stdout.")
+    parser.add_argument("--bundle", default=None, help="Prebuilt bundle from run_build_index.py.")
+    parser.add_argument("--data", default=".datashelf/racquets/basic_preprocessed_data_cleaned.csv",
+                        help="Cleaned racquet dataset, used when --bundle is not given.")
+    parser.add_argument("--embeddings", default=None,
+                        help="EmbeddingStore directory. Defaults to .embedding_cache/<model>.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--mode", choices=SEARCH_MODES, default="hybrid")
+    parser.add_argument("--fusion", choices=FUSIONS, default="rrf")
+    parser.add_argument("--no-parse-filters", action="store_true",
+                        help="Do not parse filters such as 'under $200' out of the query text.")
+    parser.add_argument("--batch-size", type=int, default=1024,
+                        help="Queries read, embedded and scored together. Bounds memory use.")
+    add_cli_args(parser)
+    args = parser.parse_args()
+
+    with cli_run(args):
+        # Batch jobs call the encoder directly, so the serving caches and micro-batcher are turned off
+        config = ServingConfig(query_cache_size=0, result_cache_size=0, max_batch_size=1)
+        if args.bundle is not None:
+            service = load_bundle_service(args.bundle, config=config, warm_up=False)
+        else:
+            service = load_search_service(
+                data_path=args.data,
+                store_dir=args.embeddings or os.path.join(".embedding_cache", args.model),
+                model_name=args.model,
+                config=config,
+            )
+
+        source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+        sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        lines = ((line_no, line) for line_no, line in enumerate(source, start=1) if line.strip())
+        n_queries = 0
+        started = time.perf_counter()
+        try:
+            while batch := list(itertools.islice(lines, args.batch_size)):
+                ids, queries, constraints = [], [], []
+                for line_no, line in batch:
+                    try:
+                        item = json.loads(line)
+                        query, item_constraints = parse_batch_item(item)
+                    except ValueError as e:
+                        parser.error(f"{args.input} line {line_no}: {e}")
+                    ids.append(item.get("id", line_no) if isinstance(item, dict) else line_no)
+                    queries.append(query)
+                    constraints.append(item_constraints)
+
+                pages = service.search_batch(queries, args.k, mode=args.mode, fusion=args.fusion,
+                                             constraints=constraints, parse_filters=not args.no_parse_filters)
+                for query_id, page in zip(ids, pages):
+                    sink.write(json.dumps({"id": query_id, **page}) + "\n")
+                sink.flush()
+                n_queries += len(pages)
+                elapsed = time.perf_counter() - started
+                logger.info(f"Scored {n_queries} queries ({n_queries / elapsed:.1f} queries/s).")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if sink is not sys.stdout:
+                sink.close()
+            service.close()
+
+        elapsed = time.perf_counter() - started
+        print(json.dumps({
+            "queries": n_queries,
+            "seconds": round(elapsed, 3),
+            "queries_per_second": round(n_queries / elapsed, 1) if elapsed else None,
+        }), file=sys.stderr)
@@ -0,0 +1,43 @@
+import argparse
+import os
+from src.data.storage import load_dataset
+from src.features.combine_text import NATURAL_V2_TEMPLATE_VERSION, create_natural_combined_text_v2_batch
+from src.features.embedding_store import EmbeddingStore, LazyEncoder
+from src.instrumentation import add_cli_args, cli_run
+from src.search.bundle import build_bundle
+from src.search.service import DEFAULT_MODEL, INDEX_BACKENDS
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Build the prebuilt search bundle the backend serves with --bundle.")
+    parser.add_argument("--data", default=".datashelf/racquets/basic_preprocessed_data_cleaned.csv",
+                        help="Cleaned racquet dataset (.csv, .parquet or .arrow).")
+    parser.add_argument("--output", default="search_bundle",
+                        help="Bundle directory to write (replaced atomically if it exists).")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--embeddings", default=None,
+                        help="EmbeddingStore directory to reuse cached embeddings from. Defaults to .embedding_cache/<model>.")
+    parser.add_argument("--index", choices=INDEX_BACKENDS, default="exact",
+                        help="Also build an IVF index or int8/float16 quantized codes for large catalogs.")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF inverted lists. Defaults to about sqrt(n).")
+    parser.add_argument("--nprobe", type=int, default=8, help="Default IVF lists scored per query.")
+    add_cli_args(parser)
+    args = parser.parse_args()
+
+    with cli_run(args):
+        df = load_dataset(args.data)
+        texts = create_natural_combined_text_v2_batch(df).tolist()
+        store = EmbeddingStore(args.embeddings or os.path.join(".embedding_cache", args.model))
+        embeddings = store.refresh(texts, LazyEncoder(args.model), args.model, NATURAL_V2_TEMPLATE_VERSION)
+
+        build_bundle(
+            df = df,
+            texts = texts,
+            embeddings = embeddings,
+            bundle_dir = args.output,
+            model_name = args.model,
+            template_version = NATURAL_V2_TEMPLATE_VERSION,
+            index_backend = args.index,
+            nlist = args.nlist,
+            nprobe = args.nprobe,
+        )
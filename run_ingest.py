@@ -0,0 +1,58 @@
+import argparse
+from src.data.fetch import FetchConfig
+from src.features.combine_text import NATURAL_V2_TEMPLATE_VERSION
+from src.features.embedding_store import LazyEncoder
+from src.ingest import IngestConfig, IngestPipeline
+from src.instrumentation import add_cli_args, cli_run
+from src.search.bundle import build_bundle
+from src.search.service import DEFAULT_MODEL, INDEX_BACKENDS
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Scrape, preprocess, embed and index the catalog as one streaming pipeline.")
+    parser.add_argument("--shop-all-url", default="https://www.tennis-warehouse.com/TennisRacquets.html")
+    parser.add_argument("--snapshot", default=".ingest_snapshot",
+                        help="Directory the cleaned rows and embeddings are appended to as they arrive.")
+    parser.add_argument("--bundle", default=None,
+                        help="Also write a search bundle (see run_build_index.py) once the crawl is done.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--index", choices=INDEX_BACKENDS, default="exact", help="Index backend of the --bundle.")
+    parser.add_argument("--parser", default="html.parser", help="BeautifulSoup parser, e.g. lxml if installed.")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Parse pages in this many processes. 0 parses on threads.")
+    parser.add_argument("--queue-size", type=int, default=64, help="Items each stage may queue before it blocks.")
+    parser.add_argument("--batch-size", type=int, default=32, help="Rows per preprocessing micro-batch.")
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    add_cli_args(parser)
+    args = parser.parse_args()
+
+    with cli_run(args):
+        # Load the model while the first pages are being fetched
+        encoder = LazyEncoder(args.model)
+        encoder.warm_up()
+
+        pipeline = IngestPipeline(
+            encode = encoder,
+            snapshot_dir = args.snapshot,
+            config = IngestConfig(
+                queue_size = args.queue_size,
+                parse_workers = args.parse_workers,
+                batch_size = args.batch_size,
+                embed_batch_size = args.embed_batch_size,
+                parser = args.parser,
+            ),
+            fetch_config = FetchConfig(max_workers = 8, per_host_concurrency = 4, requests_per_second = 5.0),
+            model_name = args.model,
+        )
+        result = pipeline.run(args.shop_all_url)
+
+        if args.bundle:
+            build_bundle(
+                df = result.df,
+                texts = result.texts,
+                embeddings = result.embeddings,
+                bundle_dir = args.bundle,
+                model_name = args.model,
+                template_version = NATURAL_V2_TEMPLATE_VERSION,
+                index_backend = args.index,
+            )
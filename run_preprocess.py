@@ -1,21 +1,50 @@
-from src.data.preprocess import preprocess_raw_data
+import argparse
+from src.data.dedup import dedup_variants
+from src.data.preprocess import preprocess_raw_data, preprocess_raw_csv_in_chunks
+from src.data.storage import save_dataset
+from src.instrumentation import add_cli_args, cli_run
 import datashelf.core as ds
 
 if __name__ == "__main__":
     
-    raw_df = ds.load(
-        collection_name="racquets",
-        hash_value="55dabe54d8b602a3c993460db0bf085737dc2c78a148e6d9fe5ea09f75b0e8ef"
-    )
+    parser = argparse.ArgumentParser(description="Preprocess the raw scraped racquet data.")
+    parser.add_argument("--output", default=None,
+                        help="Also write the cleaned dataset to this .csv, .parquet or .arrow file.")
+    parser.add_argument("--raw-csv", default=None,
+                        help="Stream this raw CSV in chunks straight to --output instead of using the datashelf snapshot.")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--dedup", action="store_true",
+                        help="Collapse colorway/pre-strung variants of a racquet into one row with a racquet_variants column.")
+    add_cli_args(parser)
+    args = parser.parse_args()
+
+    with cli_run(args):
+        if args.raw_csv is not None:
+            if args.output is None:
+                parser.error("--raw-csv needs --output")
+            if args.dedup:
+                parser.error("--dedup needs the whole catalog in memory and cannot be combined with --raw-csv")
+            preprocess_raw_csv_in_chunks(raw_csv_path=args.raw_csv, output_path=args.output, chunksize=args.chunksize)
+            raise SystemExit(0)
+    
+        raw_df = ds.load(
+            collection_name="racquets",
+            hash_value="55dabe54d8b602a3c993460db0bf085737dc2c78a148e6d9fe5ea09f75b0e8ef"
+        )
+    
+        intermediate_df = preprocess_raw_data(raw_df=raw_df)
+        if args.dedup:
+            intermediate_df = dedup_variants(intermediate_df)
     
-    intermediate_df = preprocess_raw_data(raw_df=raw_df)
+        ds.save(
+            df = intermediate_df,
+            collection_name = "racquets",
+            name="Basic Cleaned Data",
+            tag="cleaned",
+            message=("Removed all junior racquets. Removed duplicate columns. Used regex to extract"
+                     "values for specially formatted columns. Standardized column naming. Dropped all"
+                     "non-preprocessed columns.")
+            )
     
-    ds.save(
-        df = intermediate_df,
-        collection_name = "racquets",
-        name="Basic Cleaned Data",
-        tag="cleaned",
-        message=("Removed all junior racquets. Removed duplicate columns. Used regex to extract"
-                 "values for specially formatted columns. Standardized column naming. Dropped all"
-                 "non-preprocessed columns.")
-        )
\ No newline at end of file
+        if args.output is not None:
+            save_dataset(intermediate_df, args.output)
@@ -1,11 +1,22 @@
+import argparse
 from src.data.scrape import scrape_tw_rackets
+from src.data.fetch import FetchConfig
+from src.instrumentation import add_cli_args, cli_run
 
 if __name__ == "__main__":
-    scrape_tw_rackets(
-        shop_all_URL = "https://www.tennis-warehouse.com/TennisRacquets.html",
-        file_name = "Scraped Racquet Data",
-        datashelf = True,
-        collection_name = "racquets",
-        tag = "raw",
-        message = "Raw racquet information scraped from each brand's page on tenniswarehouse.com."
-    )
+    parser = argparse.ArgumentParser(description="Scrape the racquet catalog from tennis-warehouse.com.")
+    add_cli_args(parser)
+    args = parser.parse_args()
+
+    with cli_run(args):
+        scrape_tw_rackets(
+            shop_all_URL = "https://www.tennis-warehouse.com/TennisRacquets.html",
+            file_name = "Scraped Racquet Data",
+            datashelf = True,
+            collection_name = "racquets",
+            tag = "raw",
+            message = "Raw racquet information scraped from each brand's page on tenniswarehouse.com.",
+            concurrent = True,
+            cache_dir = ".scrape_cache",
+            fetch_config = FetchConfig(max_workers = 8, per_host_concurrency = 4, requests_per_second = 5.0)
+        )
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PageCache:
+    """On-disk cache of page bodies keyed by URL.
+
+    Each entry keeps the validators needed for a conditional GET (ETag / Last-Modified), a sha256 hash
+    of the body and, for product pages, the racquet record parsed from that body. Bodies are stored as
+    individual files under pages/ and the index is a single JSON file written atomically on save().
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._pages_dir = os.path.join(cache_dir, "pages")
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(self._pages_dir, exist_ok = True)
+
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "r", encoding = "utf-8") as f:
+                index = json.load(f)
+        else:
+            index = {}
+        self._entries = index.get("entries", {})
+        self.product_URLs = index.get("product_URLs", [])
+
+    def _body_path(self, URL: str) -> str:
+        return os.path.join(self._pages_dir, hashlib.sha1(URL.encode("utf-8")).hexdigest() + ".html")
+
+    def __contains__(self, URL: str) -> bool:
+        return URL in self._entries
+
+    def conditional_headers(self, URL: str) -> dict:
+        """Build If-None-Match / If-Modified-Since headers for a cached URL.
+
+        Args:
+            URL (str): Page URL.
+
+        Returns:
+            dict: Request headers (empty if the URL is not cached).
+        """
+        entry = self._entries.get(URL)
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        return headers
+
+    def body(self, URL: str) -> bytes:
+        with open(self._body_path(URL), "rb") as f:
+            return f.read()
+
+    def store(self, URL: str, response: requests.Response) -> bool:
+        """Store a 200 response, returning whether its body differs from the cached one.
+
+        Args:
+            URL (str): Page URL.
+            response (requests.Response): Successful response for URL.
+
+        Returns:
+            bool: True if the URL is new or its content hash changed.
+        """
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        with self._lock:
+            entry = self._entries.get(URL, {})
+            changed = entry.get("sha256") != content_hash
+            entry.update({
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256": content_hash,
+                "fetched_at": time.time(),
+            })
+            if changed:
+                entry.pop("record", None)
+            self._entries[URL] = entry
+        if changed:
+            with open(self._body_path(URL), "wb") as f:
+                f.write(response.content)
+
+        return changed
+
+    def touch(self, URL: str):
+        with self._lock:
+            self._entries[URL]["fetched_at"] = time.time()
+
+    def record(self, URL: str) -> dict | None:
+        entry = self._entries.get(URL)
+        return None if entry is None else entry.get("record")
+
+    def set_record(self, URL: str, record: dict):
+        with self._lock:
+            self._entries[URL]["record"] = record
+
+    def evict(self, URL: str):
+        with self._lock:
+            self._entries.pop(URL, None)
+        if os.path.exists(self._body_path(URL)):
+            os.remove(self._body_path(URL))
+
+    def save(self):
+        """Write the index to disk atomically."""
+        tmp_path = self._index_path + ".tmp"
+        with self._lock:
+            index = {"entries": self._entries, "product_URLs": self.product_URLs}
+            with open(tmp_path, "w", encoding = "utf-8") as f:
+                json.dump(index, f)
+        os.replace(tmp_path, self._index_path)
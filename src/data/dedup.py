@@ -0,0 +1,270 @@
+import json
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import log_event, timed
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Numeric spec columns that must match exactly (NaN matching NaN) for two listings to be variants.
+# Price and rating are left out: a pre-strung or limited colorway is often priced differently.
+SPEC_COLUMNS = [
+    "racquet_head_size_sq_in", "racquet_length_in", "racquet_strung_weight_oz", "racquet_balance_in",
+    "racquet_balance_HH_HL", "racquet_swingweight", "racquet_stiffness", "racquet_avg_beam_width",
+    "racquet_mains", "racquet_crosses", "racquet_tension_lower", "racquet_tension_upper",
+]
+# Listings with fewer spec values than this are never grouped: all-missing specs match trivially
+MIN_SPECS = 3
+
+NUM_PERM = 128
+# 64 bands of 2 rows: listings sharing a spec key and any band become candidates. Pairs at the
+# default threshold collide in at least one band ~98% of the time
+LSH_BANDS = 64
+SHINGLE_SIZE = 2
+# Estimated Jaccard similarity of word-bigram sets at which two descriptions are variants. On the
+# cleaned scrape, listings with equal specs either share under 0.1 of their bigrams or over 0.24
+SIMILARITY_THRESHOLD = 0.2
+# Rows in LSH buckets larger than this are paired with their next MAX_BUCKET - 1 bucket members only
+MAX_BUCKET = 64
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_FNV_PRIME = np.uint64(0x100000001B3)
+_MASK_32 = np.uint64(0xFFFFFFFF)
+# Documents hashed per pass, to bound the (permutations x shingles) hash block
+_DOCS_PER_PASS = 5_000
+_PERMS_PER_PASS = 16
+
+
+# Helper function to turn documents into 32-bit word shingle hashes, flattened with per-document offsets.
+# Tokens are hashed once per distinct token (crc32, so signatures are reproducible across runs) and
+# shingles are combined from token hashes with vectorized FNV-style mixing
+def _shingle_hashes(texts: pd.Series, shingle_size: int) -> tuple[np.ndarray, np.ndarray]:
+    tokens = texts.fillna("").astype(str).str.lower().str.findall(_TOKEN)
+    lengths = tokens.str.len().to_numpy(dtype = np.int64)
+    flat = tokens.explode().dropna()
+    codes, uniques = pd.factorize(flat)
+    token_hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in uniques), dtype = np.uint64,
+                               count = len(uniques))
+    hashes = token_hashes[codes]
+
+    # A shingle starts at every position with shingle_size - 1 tokens after it in the same document
+    n_shingles = np.maximum(lengths - shingle_size + 1, 0)
+    token_offsets = np.concatenate([[0], np.cumsum(lengths)])
+    starts = np.repeat(token_offsets[:-1], n_shingles) + (
+        np.arange(n_shingles.sum()) - np.repeat(np.cumsum(n_shingles) - n_shingles, n_shingles)
+    )
+    shingles = hashes[starts]
+    for offset in range(1, shingle_size):
+        shingles = (shingles * _FNV_PRIME) ^ hashes[starts + offset]
+
+    return shingles & _MASK_32, np.concatenate([[0], np.cumsum(n_shingles)])
+
+
+def minhash_signatures(texts: pd.Series, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE,
+                       seed: int = 0) -> np.ndarray:
+    """MinHash signatures of each text's set of word shingles.
+
+    The share of equal signature entries between two texts estimates the Jaccard similarity of
+    their shingle sets. Texts with fewer than shingle_size words get an all-0xFFFFFFFF signature.
+
+    Args:
+        texts (pd.Series): Documents, e.g. racquet_desc.
+        num_perm (int, optional): Signature length. Defaults to NUM_PERM.
+        shingle_size (int, optional): Words per shingle. Defaults to SHINGLE_SIZE.
+        seed (int, optional): Seed of the hash permutations. Defaults to 0.
+
+    Returns:
+        np.ndarray: (len(texts), num_perm) uint32 signatures.
+    """
+    rng = np.random.default_rng(seed)
+    # Coefficients below 2^32 keep a * x + b for 32-bit x inside uint64
+    a = rng.integers(1, 1 << 32, num_perm, dtype = np.uint64)
+    b = rng.integers(0, 1 << 32, num_perm, dtype = np.uint64)
+    texts = texts.reset_index(drop = True)
+    signatures = np.full((len(texts), num_perm), 0xFFFFFFFF, dtype = np.uint32)
+
+    for start in range(0, len(texts), _DOCS_PER_PASS):
+        shingles, offsets = _shingle_hashes(texts.iloc[start:start + _DOCS_PER_PASS], shingle_size)
+        nonempty = np.flatnonzero(np.diff(offsets) > 0)
+        if not len(nonempty):
+            continue
+        for perm in range(0, num_perm, _PERMS_PER_PASS):
+            permuted = (a[perm:perm + _PERMS_PER_PASS, None] * shingles + b[perm:perm + _PERMS_PER_PASS, None]) % _MERSENNE_PRIME
+            minima = np.minimum.reduceat(permuted & _MASK_32, offsets[nonempty], axis = 1)
+            signatures[start + nonempty, perm:perm + _PERMS_PER_PASS] = minima.T
+
+    return signatures
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, bands: int = LSH_BANDS, keys: np.ndarray = None,
+                        max_bucket: int = MAX_BUCKET) -> np.ndarray:
+    """Pairs of rows whose signatures agree on at least one band (and whose keys are equal).
+
+    Each band of rows is hashed together with the row's key into one bucket id per row, so only
+    rows in the same bucket are paired and the work grows with the number of rows, not pairs.
+
+    Args:
+        signatures (np.ndarray): (n, num_perm) MinHash signatures. num_perm must be divisible by bands.
+        bands (int, optional): Number of bands. Defaults to LSH_BANDS.
+        keys (np.ndarray, optional): (n,) uint64 blocking key per row, e.g. a hash of exact-match
+            columns. Defaults to None (no blocking).
+        max_bucket (int, optional): Rows in buckets larger than this are paired with their next
+            max_bucket - 1 bucket members instead of all of them. Defaults to MAX_BUCKET.
+
+    Raises:
+        ValueError: If num_perm is not divisible by bands.
+
+    Returns:
+        np.ndarray: (p, 2) unique row id pairs with the smaller id first.
+    """
+    n, num_perm = signatures.shape
+    if num_perm % bands:
+        raise ValueError(f"Signature length {num_perm} is not divisible into {bands} bands.")
+    rows_per_band = num_perm // bands
+    keys = np.zeros(n, dtype = np.uint64) if keys is None else np.asarray(keys, dtype = np.uint64)
+
+    pairs = []
+    for band in range(bands):
+        buckets = keys.copy()
+        for column in signatures[:, band * rows_per_band:(band + 1) * rows_per_band].T.astype(np.uint64):
+            buckets = (buckets * _FNV_PRIME) ^ column
+        order = np.argsort(buckets, kind = "stable")
+        ordered = buckets[order]
+        # Pair each row with the rows 1..max_bucket - 1 places after it in bucket order that share its bucket
+        for offset in range(1, max_bucket):
+            same = np.flatnonzero(ordered[offset:] == ordered[:-offset])
+            if not len(same):
+                break
+            pairs.append(np.stack([order[same], order[same + offset]], axis = 1))
+
+    if not pairs:
+        return np.empty((0, 2), dtype = np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis = 1)
+    codes = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.stack([codes // n, codes % n], axis = 1)
+
+
+# Helper function to label connected components of a pair graph: every row ends up labeled with the
+# smallest row id of its component (min-label propagation with pointer jumping, no Python loop over pairs)
+def _components(n: int, pairs: np.ndarray) -> np.ndarray:
+    labels = np.arange(n)
+    while True:
+        smaller = np.minimum(labels[pairs[:, 0]], labels[pairs[:, 1]])
+        updated = labels.copy()
+        np.minimum.at(updated, pairs[:, 0], smaller)
+        np.minimum.at(updated, pairs[:, 1], smaller)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+@timed("dedup_families")
+def variant_families(df: pd.DataFrame, threshold: float = SIMILARITY_THRESHOLD, num_perm: int = NUM_PERM,
+                     bands: int = LSH_BANDS, min_specs: int = MIN_SPECS) -> np.ndarray:
+    """Cluster listings that are variants of one racquet (colorways, pre-strung versions).
+
+    Two listings are variants when every SPEC_COLUMNS value matches exactly and the MinHash
+    estimate of their racquet_desc word-bigram Jaccard similarity is at least threshold.
+    Candidates come from LSH buckets keyed by the spec values, so the cost is roughly linear in
+    the number of listings. Families are the connected components of the variant pairs.
+
+    Args:
+        df (pd.DataFrame): Cleaned racquet data (preprocess_raw_data output).
+        threshold (float, optional): Minimum estimated description similarity. Defaults to
+            SIMILARITY_THRESHOLD.
+        num_perm (int, optional): MinHash signature length. Defaults to NUM_PERM.
+        bands (int, optional): LSH bands. Defaults to LSH_BANDS.
+        min_specs (int, optional): Spec values a listing needs to be grouped at all. Defaults to
+            MIN_SPECS.
+
+    Returns:
+        np.ndarray: (len(df),) family label per row: the position of the family's first row.
+    """
+    spec_cols = [col for col in SPEC_COLUMNS if col in df.columns]
+    groupable = np.flatnonzero(df[spec_cols].notna().sum(axis = 1).to_numpy() >= min_specs)
+    labels = np.arange(len(df))
+    if len(groupable) < 2:
+        return labels
+
+    subset = df.iloc[groupable]
+    keys = pd.util.hash_pandas_object(subset[spec_cols], index = False).to_numpy()
+    signatures = minhash_signatures(subset["racquet_desc"], num_perm)
+    pairs = lsh_candidate_pairs(signatures, bands, keys)
+
+    # Verify candidates: equal keys (bucket ids can collide) and estimated similarity above threshold
+    similar = np.zeros(len(pairs), dtype = bool)
+    for start in range(0, len(pairs), 100_000):
+        left, right = pairs[start:start + 100_000, 0], pairs[start:start + 100_000, 1]
+        similarity = (signatures[left] == signatures[right]).mean(axis = 1)
+        similar[start:start + 100_000] = (keys[left] == keys[right]) & (similarity >= threshold)
+    labels[groupable] = groupable[_components(len(groupable), pairs[similar])]
+
+    log_event("dedup_families", listings = len(df), groupable = len(groupable), candidate_pairs = len(pairs),
+              variant_pairs = int(similar.sum()), families = int(len(np.unique(labels))))
+    return labels
+
+
+def collapse_variants(df: pd.DataFrame, families: np.ndarray) -> pd.DataFrame:
+    """Keep one listing per family and attach the others as metadata.
+
+    The representative is the listing with the shortest name (the base model rather than
+    "... Pink" or "... Pre-strung"), then the lowest price. It keeps its own columns and gets
+    racquet_family_size and racquet_variants, a JSON list of the other listings' name, price,
+    colors and image.
+
+    Args:
+        df (pd.DataFrame): Cleaned racquet data.
+        families (np.ndarray): Family label per row, from variant_families().
+
+    Returns:
+        pd.DataFrame: One row per family, in the order of the representatives in df.
+    """
+    df = df.reset_index(drop = True)
+    if not len(df):
+        return df.assign(racquet_family_size = pd.Series(dtype = np.int64), racquet_variants = pd.Series(dtype = object))
+    families = np.asarray(families)
+    # Sort by family, then name length, then price; the first row of each family represents it
+    order = np.lexsort((df["racquet_price"].to_numpy(), df["racquet_name"].str.len().to_numpy(), families))
+    first = np.concatenate([[True], families[order][1:] != families[order][:-1]])
+    is_representative = np.zeros(len(df), dtype = bool)
+    is_representative[order[first]] = True
+    representative_of = pd.Series(order[first], index = families[order[first]])
+
+    variant_cols = {"name": "racquet_name", "price": "racquet_price", "colors": "racquet_colors", "image": "racquet_img"}
+    variants = df.loc[~is_representative, [col for col in variant_cols.values() if col in df.columns]]
+    variants = variants.astype(object).where(variants.notna(), None)
+    variants.columns = [field for field, col in variant_cols.items() if col in df.columns]
+    attached = {}
+    for row, record in zip(representative_of[families[~is_representative]].to_numpy(), variants.to_dict("records")):
+        attached.setdefault(row, []).append(record)
+
+    collapsed = df[is_representative].copy()
+    collapsed["racquet_family_size"] = [len(attached.get(row, ())) + 1 for row in collapsed.index]
+    collapsed["racquet_variants"] = [json.dumps(attached.get(row, [])) for row in collapsed.index]
+
+    return collapsed.reset_index(drop = True)
+
+
+def dedup_variants(df: pd.DataFrame, threshold: float = SIMILARITY_THRESHOLD) -> pd.DataFrame:
+    """Group near-identical listings and keep one row per racquet family, so each family is
+    embedded and indexed once. Runs after preprocess_raw_data().
+
+    Args:
+        df (pd.DataFrame): Cleaned racquet data.
+        threshold (float, optional): Minimum estimated description similarity of variants.
+            Defaults to SIMILARITY_THRESHOLD.
+
+    Returns:
+        pd.DataFrame: Collapsed data with racquet_family_size and racquet_variants columns.
+    """
+    df = df.reset_index(drop = True)
+    collapsed = collapse_variants(df, variant_families(df, threshold))
+    logger.info(f"Collapsed {len(df)} listings into {len(collapsed)} racquet families.")
+
+    return collapsed
@@ -0,0 +1,251 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, TypeVar
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.data.cache import PageCache
+from src.instrumentation import count, timed
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Status codes worth another attempt, and the longest backoff between two attempts
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_MAX_BACKOFF = 120.0
+
+
+@dataclass
+class FetchConfig:
+    """Settings for the pooled, concurrent page fetcher.
+
+    Attributes:
+        max_workers (int): Number of worker threads shared across all hosts.
+        per_host_concurrency (int): Max number of in-flight requests to a single host.
+        requests_per_second (float): Max request starts per second to a single host. 0 disables the limit.
+        retries (int): Retries for connection errors and retryable status codes.
+        backoff_factor (float): Exponential backoff factor between retries (0.5 -> 0.5s, 1s, 2s, ...).
+        timeout (float): Per-request connect and read timeout in seconds.
+    """
+    max_workers: int = 8
+    per_host_concurrency: int = 4
+    requests_per_second: float = 5.0
+    retries: int = 3
+    backoff_factor: float = 0.5
+    timeout: float = 20.0
+
+
+# Build one keep-alive session whose connection pool is shared by all workers
+def make_session(config: FetchConfig) -> requests.Session:
+    """Create a pooled requests session.
+
+    The adapter does not retry: Fetcher retries itself, so every attempt goes through the host
+    limits and no concurrency slot is held while backing off.
+
+    Args:
+        config (FetchConfig): Fetcher settings.
+
+    Returns:
+        requests.Session: Session with a pooled HTTPAdapter mounted for http and https.
+    """
+    adapter = HTTPAdapter(
+        pool_connections = config.max_workers,
+        pool_maxsize = config.max_workers,
+        max_retries = 0,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+# Helper function to read a Retry-After header (seconds or an HTTP date) as a delay in seconds
+def _retry_after(response: requests.Response) -> float:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class HostLimiter:
+    """Per-host concurrency cap and request-rate limit shared by worker threads."""
+
+    def __init__(self, per_host_concurrency: int, requests_per_second: float):
+        self._per_host_concurrency = per_host_concurrency
+        self._min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _semaphore(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self._per_host_concurrency)
+            return self._semaphores[host]
+
+    def _wait_for_slot(self, host: str):
+        if not self._min_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self._min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        """Hold a concurrency slot for the URL's host, waiting for the rate limit first.
+
+        Args:
+            url (str): URL about to be requested.
+        """
+        host = urlparse(url).netloc
+        semaphore = self._semaphore(host)
+        with semaphore:
+            self._wait_for_slot(host)
+            yield
+
+
+class Fetcher:
+    """Pooled HTTP fetcher that runs page requests on a bounded thread pool."""
+
+    def __init__(self, config: FetchConfig = None):
+        self.config = config or FetchConfig()
+        self.session = make_session(self.config)
+        self.limiter = HostLimiter(
+            per_host_concurrency = self.config.per_host_concurrency,
+            requests_per_second = self.config.requests_per_second,
+        )
+
+    def _request(self, url: str, headers: dict = None) -> requests.Response:
+        """GET a URL, retrying connection errors and RETRY_STATUSES with exponential backoff.
+
+        Every attempt waits for the host's concurrency slot and rate limit, and the slot is released
+        while backing off, so a failing host cannot hold all of its slots or burst retries past the
+        limit. A Retry-After header longer than the backoff is honored.
+
+        Args:
+            url (str): URL to fetch.
+            headers (dict, optional): Request headers. Defaults to None.
+
+        Raises:
+            requests.RequestException: If the last attempt fails to connect or times out.
+
+        Returns:
+            requests.Response: The first non-retryable response, or the last one.
+        """
+        for attempt in range(self.config.retries + 1):
+            final = attempt == self.config.retries
+            backoff = self.config.backoff_factor * 2 ** attempt
+            try:
+                with self.limiter.limit(url):
+                    response = self.session.get(url, headers = headers, timeout = self.config.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if final:
+                    raise
+                logger.warning(f"Retrying {url} after {type(error).__name__}.")
+            else:
+                if final or response.status_code not in RETRY_STATUSES:
+                    return response
+                logger.warning(f"Retrying {url} after status {response.status_code}.")
+                backoff = max(backoff, _retry_after(response))
+                response.close()
+            count("scrape_fetch_retries")
+            time.sleep(min(backoff, _MAX_BACKOFF))
+
+    def get(self, url: str) -> requests.Response:
+        """GET a URL through the shared session, honoring host limits and the timeout.
+
+        Args:
+            url (str): URL to fetch.
+
+        Raises:
+            requests.HTTPError: If the final response (after retries) is an error status.
+
+        Returns:
+            requests.Response: The response.
+        """
+        response = self._request(url)
+        response.raise_for_status()
+
+        return response
+
+    def get_conditional(self, url: str, cache: PageCache) -> tuple[bytes, bool]:
+        """GET a URL with a conditional request against the page cache.
+
+        A 304 Not Modified response serves the cached body. If the URL is not cached (anymore), the
+        page is requested again without validators rather than storing an empty body. A 200 response
+        is stored in the cache and compared to the previous body by content hash.
+
+        Args:
+            url (str): URL to fetch.
+            cache (PageCache): Cache holding previous bodies and validators.
+
+        Raises:
+            requests.HTTPError: If the final response (after retries) is an error status, or the server
+                answers the unconditional request with 304.
+
+        Returns:
+            tuple[bytes, bool]: Page body and whether it changed since it was cached.
+        """
+        response = self._counted_request(url, headers = cache.conditional_headers(url))
+        if response.status_code == 304:
+            if url in cache:
+                cache.touch(url)
+                return cache.body(url), False
+            logger.warning(f"Got 304 for {url}, which is not cached; fetching it in full.")
+            response = self._counted_request(url)
+            if response.status_code == 304:
+                raise requests.HTTPError(f"304 Not Modified for an unconditional request to {url}", response = response)
+        response.raise_for_status()
+
+        return response.content, cache.store(url, response)
+
+    # Helper function to time and count a request in the scrape metrics
+    def _counted_request(self, url: str, headers: dict = None) -> requests.Response:
+        with timed("scrape_fetch"):
+            response = self._request(url, headers = headers)
+        count("scrape_pages_fetched", status = response.status_code)
+        count("scrape_bytes_downloaded", len(response.content))
+
+        return response
+
+    def map(self, func: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        """Apply func to every item on the thread pool, yielding results in input order.
+
+        Args:
+            func (Callable[[T], R]): Function to run, typically one that calls self.get.
+            items (Iterable[T]): Inputs, usually URLs.
+
+        Returns:
+            Iterator[R]: Results in the same order as items.
+        """
+        with ThreadPoolExecutor(max_workers = self.config.max_workers) as executor:
+            yield from executor.map(func, items)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
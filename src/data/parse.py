@@ -0,0 +1,65 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Parser backend name -> (BeautifulSoup tree builder, only build the product page subtrees?)
+PARSER_BACKENDS = {
+    "html.parser": ("html.parser", False),
+    "lxml": ("lxml", False),
+    "strainer": ("html.parser", True),
+    "lxml-strainer": ("lxml", True),
+}
+
+# Tags (and the class each must carry) that _parse_racquet_features reads from a product page
+_PRODUCT_PAGE_ELEMENTS = {
+    "img": {"main_image is-zoomable"},
+    "h1": {"h2 desc_top-head-title"},
+    "div": {"review_agg", "check_read-inner"},
+    "span": {"afterpay-full_price"},
+}
+
+
+class _ProductPageStrainer(SoupStrainer):
+    """Only build the header, rating, price, description and spec table subtrees of a product page.
+
+    Matches the same elements as the find() calls in _parse_racquet_features: a class matches if it
+    equals one of the tag's classes or the full class attribute. Every tbody is kept so that
+    soup.find("tbody") still returns the first table body in the document.
+    """
+
+    def __init__(self):
+        super().__init__(name = list(_PRODUCT_PAGE_ELEMENTS) + ["tbody"])
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        if name == "tbody":
+            return True
+        wanted = _PRODUCT_PAGE_ELEMENTS.get(name)
+        if not wanted or not attrs or not attrs.get("class"):
+            return False
+        classes = attrs["class"]
+        if isinstance(classes, str):
+            classes = classes.split()
+
+        return " ".join(classes) in wanted or any(c in wanted for c in classes)
+
+
+_PRODUCT_PAGE_STRAINER = _ProductPageStrainer()
+
+
+def make_product_soup(content: bytes, parser: str = "html.parser") -> BeautifulSoup:
+    """Build the soup for a product page with the chosen parser backend.
+
+    Args:
+        content (bytes): Product page HTML.
+        parser (str, optional): One of PARSER_BACKENDS. The lxml backends need the optional lxml
+            package. Defaults to "html.parser".
+
+    Raises:
+        ValueError: If parser is not a known backend.
+
+    Returns:
+        BeautifulSoup: Full or strained soup for the page.
+    """
+    if parser not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{parser}'. Choose from {list(PARSER_BACKENDS)}.")
+    builder, strained = PARSER_BACKENDS[parser]
+
+    return BeautifulSoup(content, builder, parse_only = _PRODUCT_PAGE_STRAINER if strained else None)
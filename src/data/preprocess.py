@@ -1,21 +1,29 @@
 import pandas as pd
 import numpy as np
 import re
+import time
+import tracemalloc
+from src.utils import setup_logger
+from src.instrumentation import log_event, set_gauge, timed
+from src.data.specs import BALANCE_SIGNS
+from src.data.storage import dataset_format
 
-def _add_brand_column(raw_df:pd.DataFrame) -> pd.DataFrame:
+logger = setup_logger(__name__)
+
+def _add_brand_column(raw_df:pd.DataFrame, copy:bool = True) -> pd.DataFrame:
     """Create a brand column.
 
     Args:
         raw_df (pd.DataFrame): The raw, scraped data set.
+        copy (bool, optional): Copy the data. If False, the brand column is inserted into a shallow copy
+            that shares its other columns with raw_df (raw_df itself is not modified). Defaults to True.
 
     Returns:
         pd.DataFrame: Raw data set with racquet brand column.
     """
     
-    mod_df = raw_df.copy()
-    mod_df["racquet_brand"] = mod_df["racquet_name"].apply(lambda x: x.split(" ")[0])
-    _new_col_order = ["racquet_brand"] + [col for col in mod_df.columns if col != "racquet_brand"]
-    mod_df = mod_df[_new_col_order]
+    mod_df = raw_df.copy(deep = copy)
+    mod_df.insert(0, "racquet_brand", mod_df["racquet_name"].str.split(" ").str[0])
     
     return mod_df
 
@@ -29,49 +37,59 @@ def _remove_junior_racquets(mod_df:pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Dataframe with racquet brand column, junior racquets removed.
     """
     
-    jr_df = mod_df[mod_df["racquet_name"].str.contains("Junior")]
-    no_jr_df = mod_df.merge(jr_df, how = "outer", indicator=True)
-    no_jr_df = no_jr_df[no_jr_df["_merge"]=="left_only"].drop(columns="_merge")
+    no_jr_df = mod_df[~_is_junior(mod_df["racquet_name"])]
     
     return no_jr_df
 
-def _drop_majority_NA_cols(no_jr_df:pd.DataFrame) -> pd.DataFrame:
+def _is_junior(racquet_names:pd.Series) -> pd.Series:
+    return racquet_names.str.contains("Junior")
+
+def _majority_NA_cols(na_counts:pd.Series, n_rows:int) -> list[str]:
+    """Pick the columns whose share of NA values is above 95%.
+
+    Args:
+        na_counts (pd.Series): Number of NA values per column.
+        n_rows (int): Number of rows the counts were taken over.
+
+    Returns:
+        list[str]: Columns to drop.
+    """
+    
+    na_fraction = na_counts / n_rows
+    return na_fraction.index[na_fraction > 0.95].tolist()
+
+def _drop_majority_NA_cols(no_jr_df:pd.DataFrame, copy:bool = True) -> pd.DataFrame:
     """Drop all columns with more than 95% NA values.
 
     Args:
         no_jr_df (pd.DataFrame): Dataframe with junior racquets removed.
+        copy (bool, optional): Work on a copy. If False, no_jr_df is modified in place. Defaults to True.
 
     Returns:
         pd.DataFrame: Dataframe with racquet brand column, junior racquets removed, and majority NA columns dropped.
     """
     
-    na_dropped_df = no_jr_df.copy()
+    na_dropped_df = no_jr_df.copy() if copy else no_jr_df
     
-    cols_to_drop = []
-    for col in no_jr_df.columns:
-        if no_jr_df[col].isna().sum() == 0:
-            pass
-        elif no_jr_df[col].isna().sum() / no_jr_df.shape[0] > 0.95:
-            cols_to_drop.append(col)
-        else:
-            pass
+    cols_to_drop = _majority_NA_cols(na_counts=na_dropped_df.isna().sum(), n_rows=na_dropped_df.shape[0])
         
-    na_dropped_df = na_dropped_df.drop(columns = cols_to_drop)
-    na_dropped_df = na_dropped_df.reset_index().drop(columns = "index")
+    na_dropped_df.drop(columns = cols_to_drop, inplace = True)
+    na_dropped_df.reset_index(drop = True, inplace = True)
     
     return na_dropped_df
 
-def _regex_transform_cols(na_dropped_df:pd.DataFrame) -> pd.DataFrame:
+def _regex_transform_cols(na_dropped_df:pd.DataFrame, copy:bool = True) -> pd.DataFrame:
     """Use regex functions to convert string columns with non-standard formatting to float values.
 
     Args:
         na_dropped_df (pd.DataFrame): DataFrame with majority NA columns dropped.
+        copy (bool, optional): Work on a copy. If False, columns are added to na_dropped_df in place. Defaults to True.
 
     Returns:
         pd.DataFrame: DataFrame with racquet brand column, junior racquets removed, majority NA columns dropped, and string columns transformed.
     """
     
-    regex_df = na_dropped_df.copy()
+    regex_df = na_dropped_df.copy() if copy else na_dropped_df
     
     # Get columns to change (might not need this)
     str_cols = [] 
@@ -118,97 +136,54 @@ def _regex_transform_cols(na_dropped_df:pd.DataFrame) -> pd.DataFrame:
 
     extracted["value"] = extracted["value"].astype(float)
 
-    def apply_balance_sign(row):
-        if row["label"] == "HL":
-            return row['value']
-        elif row["label"] == "HH":
-            return -row["value"]
-        elif row["label"] == "EB":
-            return 0.0
-        return None
-
-    # Extract and apply discrete headlight indicator
-    regex_df["racquet_balance_HH_HL"] = extracted.apply(apply_balance_sign, axis = 1)
+    # Apply discrete headlight indicator: HL points are positive, HH points negative, EB is 0 (BALANCE_SIGNS)
+    regex_df["racquet_balance_HH_HL"] = np.select(
+        [extracted["label"] == label for label in BALANCE_SIGNS],
+        [extracted["value"] * sign for sign in BALANCE_SIGNS.values()],
+        default = np.nan
+    )
     
     # Extract racquet stiffness
     regex_df["racquet_stiffness"] = regex_df["Stiffness"]
     regex_df['racquet_stiffness'] = regex_df['racquet_stiffness'].replace('N/A (very low)', np.nan)
     regex_df["racquet_stiffness"] = regex_df["racquet_stiffness"].astype(float)
     
-    # Get average beam width as proxy for 3-value beam width field
-    def average_beam_width(value):
-        if isinstance(value, str):
-            parts = value.split("/")
-            numbers = []
-            for part in parts:
-                cleaned = part.strip().replace("mm", "")
-                if cleaned:
-                    try:
-                        numbers.append(float(cleaned))
-                    except ValueError:
-                        pass
-            if numbers:
-                return sum(numbers) / len(numbers)
-            else:
-                return float("nan")
-        else:
-            return float("nan")
-    
-    # Extract and apply average beam width function
-    regex_df["racquet_avg_beam_width"] = regex_df["Beam Width"].apply(average_beam_width)
+    # Get average beam width as proxy for 3-value beam width field: average every "/"-separated
+    # part that parses as a number once "mm" is removed
+    beam_parts = regex_df["Beam Width"].reset_index(drop = True).str.split("/").explode()
+    beam_parts = pd.to_numeric(beam_parts.str.replace("mm", "", regex = False).str.strip(), errors = "coerce")
+    regex_df["racquet_avg_beam_width"] = beam_parts.groupby(level = 0).mean().to_numpy()
     
-    # Extract main and cross values, assign to relevant column in series, and pass series to df
-    def extract_mains_crosses(value):
-        mains = np.nan
-        crosses = np.nan
-        
-        if isinstance(value, str) and value.strip():
-            
-            mains_regex = re.search(r'(\d+)\s*Mains', value, re.IGNORECASE)
-            crosses_regex = re.search(r'(\d+)\s*Crosses', value, re.IGNORECASE)
-            
-            if mains_regex:
-                mains = float(mains_regex.group(1))
-                
-            if crosses_regex:
-                crosses = float(crosses_regex.group(1))
-                
-        return pd.Series([mains, crosses])
-
     # Extract main and cross values and apply to respective columns
-    regex_df[["racquet_mains", "racquet_crosses"]] = regex_df["String Pattern"].apply(extract_mains_crosses)
+    regex_df["racquet_mains"] = regex_df["String Pattern"].str.extract(r"(\d+)\s*Mains", flags = re.IGNORECASE)[0].astype(float)
+    regex_df["racquet_crosses"] = regex_df["String Pattern"].str.extract(r"(\d+)\s*Crosses", flags = re.IGNORECASE)[0].astype(float)
     
-    # Define function to get tension upper and lower bounds
-    def extract_tension_bounds(value):
-        lower = np.nan
-        upper = np.nan
-        
-        if isinstance(value, str) and value.strip():
-            tension_regex = re.search(r'(\d+)\s*-\s*(\d+)', value)
-            if tension_regex:
-                lower = float(tension_regex.group(1))
-                upper = float(tension_regex.group(2))
-            
-        return pd.Series([lower, upper])
-
-    # Extract and apply tension bounds to new columns
-    regex_df[["racquet_tension_lower", "racquet_tension_upper"]] = regex_df["String Tension"].apply(extract_tension_bounds)
+    # Extract tension bounds to new columns
+    regex_df[["racquet_tension_lower", "racquet_tension_upper"]] = (
+        regex_df["String Tension"]\
+            .str.extract(r"(\d+)\s*-\s*(\d+)")\
+                .astype(float)
+                )
     
     return regex_df
 
-def _final_touch_ups(regex_df:pd.DataFrame) -> pd.DataFrame:
+def _final_touch_ups(regex_df:pd.DataFrame, copy:bool = True) -> pd.DataFrame:
     """Drop non-regexed columns, standardized naming conventions of columns
 
     Args:
         regex_df (pd.DataFrame): DataFrame with regexed columns.
+        copy (bool, optional): Work on a copy. If False, regex_df is modified in place. Defaults to True.
 
     Returns:
         pd.DataFrame: DataFrame with racquet brand column, junior racquets removed, majority NA columns dropped, 
         string columns transformed, old columns dropped, and column names standardized.
     """
     
-    intermediate_df = regex_df.copy()
+    intermediate_df = regex_df.copy() if copy else regex_df
     drop_cols = ["Head Size", "Length", "Strung Weight", "Balance", "Beam Width", "String Pattern", "String Tension", "Stiffness"]
+    # The product page URL only keys raw rows for merge_scrape_delta; it is not in RAW_COLUMNS either
+    if "racquet_url" in intermediate_df.columns:
+        drop_cols.append("racquet_url")
     
     intermediate_df.drop(columns = drop_cols, inplace = True)
     intermediate_df.rename(columns = {"Swingweight":"racquet_swingweight",
@@ -222,16 +197,215 @@ def _final_touch_ups(regex_df:pd.DataFrame) -> pd.DataFrame:
     
     return intermediate_df
 
-def preprocess_raw_data(raw_df:pd.DataFrame) -> pd.DataFrame:
+# Helper function to record a stage's time and the rows it leaves in the instrumentation metrics
+def _instrumented(name:str, stage):
+    def run(df:pd.DataFrame) -> pd.DataFrame:
+        timer = timed("preprocess_stage", stage=name)
+        with timer:
+            df = stage(df)
+        set_gauge("preprocess_stage_rows", len(df), stage=name)
+        log_event("preprocess_stage", stage=name, seconds=round(timer.seconds, 6), rows=df.shape[0], cols=df.shape[1])
+        return df
+    return run
+
+def _preprocess_stages(low_memory:bool = False) -> list:
+    copy = not low_memory
+    stages = [
+        ("add_brand_column", lambda df: _add_brand_column(raw_df=df, copy=copy)),
+        ("remove_junior_racquets", lambda df: _remove_junior_racquets(mod_df=df)),
+        ("drop_majority_NA_cols", lambda df: _drop_majority_NA_cols(no_jr_df=df, copy=copy)),
+        ("regex_transform_cols", lambda df: _regex_transform_cols(na_dropped_df=df, copy=copy)),
+        ("final_touch_ups", lambda df: _final_touch_ups(regex_df=df, copy=copy)),
+    ]
+    return [(name, _instrumented(name, stage)) for name, stage in stages]
+
+def profile_preprocess(raw_df:pd.DataFrame, low_memory:bool = False) -> tuple[pd.DataFrame, list[dict]]:
+    """Run the preprocessing pipeline and measure every stage.
+
+    Peak memory is the tracemalloc peak of new allocations while the stage runs. Timings include
+    tracemalloc's overhead, so compare them against each other rather than an untraced run.
+
+    Args:
+        raw_df (pd.DataFrame): The raw, scraped data set.
+        low_memory (bool, optional): Run the stages in place, see preprocess_raw_data. Defaults to False.
+
+    Returns:
+        tuple[pd.DataFrame, list[dict]]: Preprocessed DataFrame and one dict per stage with
+        stage, seconds, peak_mb, rows and cols.
+    """
     
-    mod_df = _add_brand_column(raw_df=raw_df)
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
     
-    no_jr_df = _remove_junior_racquets(mod_df=mod_df)
+    stage_report = []
+    df = raw_df
+    try:
+        for name, stage in _preprocess_stages(low_memory=low_memory):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            start = time.perf_counter()
+            df = stage(df)
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            stage_report.append({"stage": name, "seconds": seconds, "peak_mb": (peak - baseline) / 2**20,
+                                 "rows": df.shape[0], "cols": df.shape[1]})
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
     
-    na_dropped_df = _drop_majority_NA_cols(no_jr_df=no_jr_df)
+    return df, stage_report
+
+def preprocess_raw_data(raw_df:pd.DataFrame, low_memory:bool = False, report:bool = False) -> pd.DataFrame:
+    """Run all preprocessing stages on the raw scraped data.
+
+    Args:
+        raw_df (pd.DataFrame): The raw, scraped data set.
+        low_memory (bool, optional): Run the stages on one working frame instead of copying the data at
+            every stage. raw_df is never modified. Defaults to False.
+        report (bool, optional): Log per-stage wall time and peak memory. Defaults to False.
+
+    Returns:
+        pd.DataFrame: Preprocessed (intermediate) DataFrame.
+    """
     
-    regex_df = _regex_transform_cols(na_dropped_df=na_dropped_df)
+    if report:
+        intermediate_df, stage_report = profile_preprocess(raw_df=raw_df, low_memory=low_memory)
+        for stats in stage_report:
+            logger.info(f"{stats['stage']}: {stats['seconds']:.3f}s, peak {stats['peak_mb']:.1f} MB, "
+                        f"{stats['rows']} rows x {stats['cols']} cols")
+        return intermediate_df
+    
+    df = raw_df
+    for _, stage in _preprocess_stages(low_memory=low_memory):
+        df = stage(df)
+    
+    return df
+
+# Columns that the row-local stages read with the .str accessor, so they must stay strings in every chunk
+_STRING_COLS = ["racquet_name", "Head Size", "Length", "Strung Weight", "Balance", "Beam Width",
+                "String Pattern", "String Tension"]
+
+def _count_nulls_in_chunks(raw_csv_path:str, chunksize:int) -> tuple[pd.Series, int, dict]:
+    """First streaming pass: count NA values per column over the non-junior rows.
+
+    Also settles one dtype per column so every chunk of the second pass is read the same way.
+
+    Args:
+        raw_csv_path (str): Path of the raw scraped CSV.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        tuple[pd.Series, int, dict]: NA counts per column, number of non-junior rows and read_csv dtypes.
+    """
+    
+    na_counts = None
+    n_rows = 0
+    col_kinds = {}
+    for chunk in pd.read_csv(raw_csv_path, chunksize=chunksize, dtype={col: object for col in _STRING_COLS}):
+        chunk = chunk[~_is_junior(chunk["racquet_name"])]
+        chunk_na_counts = chunk.isna().sum()
+        na_counts = chunk_na_counts if na_counts is None else na_counts + chunk_na_counts
+        n_rows += chunk.shape[0]
+        for col, dtype in chunk.dtypes.items():
+            kind = "object" if dtype == object else ("int" if pd.api.types.is_integer_dtype(dtype) else "float")
+            if col_kinds.get(col) in (None, "int") or kind == "object":
+                col_kinds[col] = kind
+    
+    dtypes = {col: {"object": object, "int": "int64", "float": "float64"}[kind] for col, kind in col_kinds.items()}
+    
+    return na_counts, n_rows, dtypes
+
+@timed("preprocess_chunk")
+def _preprocess_chunk(chunk:pd.DataFrame, cols_to_drop:list[str]) -> pd.DataFrame:
+    """Apply the row-local stages to one chunk of raw data, in place where possible."""
+    
+    chunk = _add_brand_column(raw_df=chunk, copy=False)
+    chunk = chunk[~_is_junior(chunk["racquet_name"])]
+    chunk = chunk.drop(columns=cols_to_drop).reset_index(drop=True)
+    chunk = _regex_transform_cols(na_dropped_df=chunk, copy=False)
+    
+    return _final_touch_ups(regex_df=chunk, copy=False)
+
+# Raw scrape columns the cleaned data is built from: those the majority-NA filter keeps on the full scrape.
+# Streamed records cannot be null-counted over the whole catalog first, so preprocess_records keeps these
+RAW_COLUMNS = ["racquet_img", "racquet_name", "racquet_rating", "racquet_price", "racquet_desc", "Head Size",
+               "Length", "Strung Weight", "Balance", "Swingweight", "Stiffness", "Beam Width", "Composition",
+               "Power Level", "Stroke Style", "Swing Speed", "Racquet Colors", "Grip Type", "String Pattern",
+               "String Tension"]
+
+def preprocess_records(records:list[dict]) -> pd.DataFrame:
+    """Preprocess a batch of scraped racquet records as they arrive.
+
+    Applies the row-local stages to a small batch, so it can run while the rest of the catalog is
+    still being scraped. The columns are fixed to RAW_COLUMNS instead of dropping majority-NA
+    columns, so every batch has the same cleaned columns; rows keep their input order.
+
+    Args:
+        records (list[dict]): Raw racquet records, e.g. from _parse_racquet_features.
+
+    Returns:
+        pd.DataFrame: Preprocessed rows (junior racquets removed), with the columns of preprocess_raw_data.
+    """
+    
+    chunk = pd.DataFrame.from_records(records).reindex(columns=RAW_COLUMNS)
+    # A column that is missing from every record of a batch comes back as float NaN
+    chunk[_STRING_COLS] = chunk[_STRING_COLS].astype(object)
+    chunk_df = _preprocess_chunk(chunk, cols_to_drop=[])
+    # Numeric strings the batch path only converts when the cleaned CSV is read back
+    chunk_df["racquet_swingweight"] = pd.to_numeric(chunk_df["racquet_swingweight"], errors="coerce")
+    
+    return chunk_df
+
+def preprocess_raw_csv_in_chunks(raw_csv_path:str, output_path:str, chunksize:int = 50_000) -> int:
+    """Preprocess a raw CSV that may not fit in memory, writing the result incrementally.
+
+    A first pass only counts nulls to decide which columns are more than 95% NA. The second pass reads
+    the raw CSV chunk by chunk, applies the row-local stages (brand extraction, junior filtering,
+    regex extraction, renaming) and appends each chunk to the output, so memory is bounded by the
+    chunk size. Rows keep their input order, as in preprocess_raw_data, so both produce the same rows
+    in the same order.
+
+    Args:
+        raw_csv_path (str): Path of the raw scraped CSV.
+        output_path (str): Output file ending in .csv, .parquet or .arrow (the columnar formats need pyarrow).
+        chunksize (int, optional): Rows per chunk. Defaults to 50_000.
+
+    Returns:
+        int: Number of rows written.
+    """
+    
+    na_counts, n_rows, dtypes = _count_nulls_in_chunks(raw_csv_path=raw_csv_path, chunksize=chunksize)
+    cols_to_drop = _majority_NA_cols(na_counts=na_counts, n_rows=n_rows)
+    logger.info(f"Counted nulls over {n_rows} rows, dropping {len(cols_to_drop)} majority-NA columns.")
+    
+    file_format = dataset_format(output_path)
+    write_columnar = file_format != "csv"
+    if write_columnar:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        # Derive a fixed output schema by running the stages on an empty frame with the settled dtypes
+        empty_df = _preprocess_chunk(pd.read_csv(raw_csv_path, nrows=0, dtype=dtypes).astype(dtypes), cols_to_drop)
+        schema = pa.schema([
+            (col, pa.string() if dtype == object else pa.from_numpy_dtype(dtype))
+            for col, dtype in empty_df.dtypes.items()
+        ])
+        writer = pq.ParquetWriter(output_path, schema) if file_format == "parquet" else pa.ipc.new_file(output_path, schema)
+    
+    rows_written = 0
+    try:
+        for i, chunk in enumerate(pd.read_csv(raw_csv_path, chunksize=chunksize, dtype=dtypes)):
+            chunk_df = _preprocess_chunk(chunk, cols_to_drop)
+            if write_columnar:
+                writer.write_table(pa.Table.from_pandas(chunk_df, schema=schema, preserve_index=False))
+            else:
+                chunk_df.to_csv(output_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+            rows_written += chunk_df.shape[0]
+    finally:
+        if write_columnar:
+            writer.close()
     
-    intermediate_df = _final_touch_ups(regex_df=regex_df)
+    logger.info(f"Wrote {rows_written} preprocessed rows to {output_path}.")
     
-    return intermediate_df
\ No newline at end of file
+    return rows_written
\ No newline at end of file
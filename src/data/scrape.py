@@ -4,16 +4,32 @@ import pandas as pd
 import numpy as np
 import re
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlparse
 from src.utils import setup_logger
+from src.instrumentation import count, set_gauge, timed
+from src.data.cache import PageCache
+from src.data.fetch import Fetcher, FetchConfig
+from src.data.parse import make_product_soup
+from src.data.storage import save_dataset
 import datashelf.core as ds
 from tqdm import tqdm
 
 logger = setup_logger(__name__)
 
+_SPECS_CLASS = re.compile("Specs")
+
 # Scraper function
-def scrape_tw_rackets(shop_all_URL:str, file_name:str, datashelf:bool = False, collection_name:str = None, tag:str = None, message:str = None):
+@timed("scrape", log = True)
+def scrape_tw_rackets(shop_all_URL:str, file_name:str, datashelf:bool = False, collection_name:str = None, tag:str = None, message:str = None,
+                      concurrent:bool = False, fetch_config:FetchConfig = None, cache_dir:str = None,
+                      parser:str = "html.parser", parse_workers:int = 0, file_format:str = "csv"):
     """Run all scraping functions
 
+    The saved raw dataset starts with a racquet_url column (the product page URL) ahead of the scraped
+    fields. merge_scrape_delta matches rows on it and preprocessing drops it.
+
     Args:
         shop_all_URL (str): URL of 'Shop All' page of TW website
         file_name (str): Name of file to save
@@ -21,21 +37,42 @@ def scrape_tw_rackets(shop_all_URL:str, file_name:str, datashelf:bool = False, c
         collection_name (str, optional): Name of collection to save df. Defaults to None.
         tag (str, optional): Tag for df. Defaults to None.
         message (str, optional): Save message. Defaults to None.
+        concurrent (bool, optional): Fetch pages on a thread pool with a shared keep-alive session. Defaults to False.
+        fetch_config (FetchConfig, optional): Concurrency, rate limit, retry and timeout settings for concurrent mode.
+            Defaults to None (FetchConfig defaults).
+        cache_dir (str, optional): Directory of the on-disk page cache. When given, runs an incremental concurrent
+            crawl that revalidates cached pages and only re-parses changed products. Defaults to None.
+        parser (str, optional): Product page parser backend, see src.data.parse.PARSER_BACKENDS. Defaults to "html.parser".
+        parse_workers (int, optional): In concurrent mode, parse product pages in a process pool of this size
+            while the thread pool keeps fetching. 0 parses on the fetch threads. Defaults to 0.
+        file_format (str, optional): Local file format when not using datashelf: "csv", "parquet" or "arrow". Defaults to "csv".
     """
     
     logger.info("Beginning scraping...")
-    brand_page_URLS = _get_brand_URLs(shop_all_URL = shop_all_URL)
-    
-    logger.info("Scraped brand pages...")
     
-    complete_racquet_info_df = pd.DataFrame()
-    
-    logger.info("Scraping racquet data...")
-    for brand_URL in tqdm(brand_page_URLS, desc = "Scraping brand pages"):
-        brand_df = _scrape_brand_page(brand_page_URL = brand_URL)
-        complete_racquet_info_df = pd.concat([complete_racquet_info_df, brand_df])
+    if cache_dir is not None:
+        delta = scrape_tw_rackets_incremental(shop_all_URL = shop_all_URL, cache_dir = cache_dir, fetch_config = fetch_config,
+                                              parser = parser)
+        complete_racquet_info_df = delta.full
+    elif concurrent:
+        complete_racquet_info_df = _scrape_concurrently(shop_all_URL = shop_all_URL, fetch_config = fetch_config,
+                                                        parser = parser, parse_workers = parse_workers)
+    else:
+        brand_page_URLS = _get_brand_URLs(shop_all_URL = shop_all_URL)
+        
+        logger.info("Scraped brand pages...")
+        
+        # Collect plain records and build the DataFrame once at the end
+        racquet_records = []
+        
+        logger.info("Scraping racquet data...")
+        for brand_URL in tqdm(brand_page_URLS, desc = "Scraping brand pages"):
+            racquet_records.extend(_get_brand_page_records(brand_page_URL = brand_URL, parser = parser))
+        
+        complete_racquet_info_df = pd.DataFrame.from_records(racquet_records)
         
     logger.info("Scaping complete.")
+    set_gauge("scrape_racquets", len(complete_racquet_info_df))
     
     if datashelf:
         if all(arg is not None for arg in (tag, message, collection_name)):
@@ -48,21 +85,238 @@ def scrape_tw_rackets(shop_all_URL:str, file_name:str, datashelf:bool = False, c
             )
     else:
         clean_file_name = file_name.strip().lower().replace(" ", "_")
-        complete_racquet_info_df.to_csv(f"{clean_file_name + '.csv'}", index = False, sep = ",")
+        save_dataset(complete_racquet_info_df, f"{clean_file_name}.{file_format}")
+
+
+# Run the brand -> product list -> product page crawl on a pooled thread pool
+def _scrape_concurrently(shop_all_URL: str, fetch_config: FetchConfig = None, parser: str = "html.parser",
+                         parse_workers: int = 0) -> pd.DataFrame:
+    """Concurrent equivalent of the sequential brand-by-brand crawl.
+
+    Product pages that still fail after retries are logged and skipped. Rows are returned in the
+    same brand/product order as the sequential crawl.
+
+    Args:
+        shop_all_URL (str): URL of 'Shop All' page of TW website.
+        fetch_config (FetchConfig, optional): Fetcher settings. Defaults to None.
+        parser (str, optional): Product page parser backend. Defaults to "html.parser".
+        parse_workers (int, optional): Size of a separate process pool for parsing. 0 parses on the
+            fetch threads. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: DataFrame of every racquet and its features.
+    """
+    
+    with Fetcher(fetch_config) as fetcher:
+        brand_page_URLs = _get_brand_URLs(shop_all_URL = shop_all_URL, fetcher = fetcher)
+        logger.info(f"Found {len(brand_page_URLs)} brand pages...")
+        
+        product_URL_lists = fetcher.map(
+            lambda URL: _get_product_page_URLs(brand_page_URL = URL, fetcher = fetcher),
+            brand_page_URLs
+        )
+        product_URLs = [URL for URL_list in product_URL_lists for URL in URL_list]
+        logger.info(f"Found {len(product_URLs)} product pages...")
+        
+        def _safe_get_content(product_URL):
+            try:
+                return _get_page(product_URL, fetcher = fetcher).content
+            except requests.RequestException as e:
+                logger.warning(f"Skipping {product_URL}: {e}")
+                return None
+        
+        if parse_workers > 0:
+            # Fetch threads hand page bodies to the process pool as they arrive
+            with ProcessPoolExecutor(max_workers = parse_workers) as parse_pool:
+                parse_futures = [
+                    (product_URL, parse_pool.submit(_parse_racquet_features, content, parser))
+                    for product_URL, content in zip(product_URLs, tqdm(fetcher.map(_safe_get_content, product_URLs),
+                                                                       total = len(product_URLs), desc = "Scraping product pages"))
+                    if content is not None
+                ]
+                racquet_records = [_with_URL(product_URL, future.result()) for product_URL, future in parse_futures]
+        else:
+            def _safe_get_racquet_features(product_URL):
+                content = _safe_get_content(product_URL)
+                return None if content is None else _with_URL(product_URL, _parse_racquet_features(content, parser = parser))
+            
+            racquet_records = [
+                record for record in tqdm(fetcher.map(_safe_get_racquet_features, product_URLs),
+                                          total = len(product_URLs), desc = "Scraping product pages")
+                if record is not None
+            ]
+    
+    return pd.DataFrame.from_records(racquet_records)
+
+
+@dataclass
+class ScrapeDelta:
+    """Result of an incremental crawl. Delta frames are indexed by product page URL, which every frame
+    also stores in its racquet_url column.
+
+    Attributes:
+        full (pd.DataFrame): Every racquet currently listed, same shape as a full crawl.
+        added (pd.DataFrame): Racquets whose product page was not in the previous crawl.
+        changed (pd.DataFrame): New versions of racquets whose product page changed.
+        changed_previous (pd.DataFrame): Previous versions of the racquets in changed.
+        removed (pd.DataFrame): Racquets from the previous crawl that are no longer listed.
+    """
+    full: pd.DataFrame
+    added: pd.DataFrame
+    changed: pd.DataFrame
+    changed_previous: pd.DataFrame
+    removed: pd.DataFrame
+
+
+# Crawl against the on-disk page cache and only re-parse product pages whose HTML changed
+def scrape_tw_rackets_incremental(shop_all_URL: str, cache_dir: str, fetch_config: FetchConfig = None,
+                                  parser: str = "html.parser") -> ScrapeDelta:
+    """Incrementally re-scrape the catalog using conditional GETs against a page cache.
+
+    Product pages are revalidated with If-None-Match / If-Modified-Since and compared by content hash.
+    Unchanged pages reuse the racquet record parsed on a previous run. The first run against an
+    empty cache is a full crawl where every racquet is reported as added.
+
+    Args:
+        shop_all_URL (str): URL of 'Shop All' page of TW website.
+        cache_dir (str): Directory of the on-disk page cache.
+        fetch_config (FetchConfig, optional): Fetcher settings. Defaults to None.
+        parser (str, optional): Product page parser backend. Defaults to "html.parser".
+
+    Returns:
+        ScrapeDelta: Full current dataset plus added/changed/removed racquets.
+    """
+    
+    cache = PageCache(cache_dir)
+    previous_URLs = cache.product_URLs
+    previous_records = {URL: cache.record(URL) for URL in previous_URLs}
+    
+    with Fetcher(fetch_config) as fetcher:
+        brand_page_URLs = _get_brand_URLs(shop_all_URL = shop_all_URL, fetcher = fetcher)
+        product_URL_lists = fetcher.map(
+            lambda URL: _get_product_page_URLs(brand_page_URL = URL, fetcher = fetcher),
+            brand_page_URLs
+        )
+        product_URLs = [URL for URL_list in product_URL_lists for URL in URL_list]
+        unique_URLs = list(dict.fromkeys(product_URLs))
+        
+        def _refresh(product_URL):
+            try:
+                content, changed = fetcher.get_conditional(product_URL, cache)
+            except requests.RequestException as e:
+                # Keep the last known record so a transient failure is not reported as a removal
+                logger.warning(f"Could not refresh {product_URL}: {e}")
+                return cache.record(product_URL), False
+            
+            record = None if changed else cache.record(product_URL)
+            if record is None:
+                record = _parse_racquet_features(content, parser = parser)
+                cache.set_record(product_URL, record)
+                return record, True
+            return record, False
+        
+        refreshed = dict(zip(unique_URLs, tqdm(fetcher.map(_refresh, unique_URLs),
+                                               total = len(unique_URLs), desc = "Refreshing product pages")))
+    
+    added, changed, changed_previous = {}, {}, {}
+    for URL, (record, parsed) in refreshed.items():
+        if record is None:
+            continue
+        if previous_records.get(URL) is None:
+            added[URL] = record
+        elif parsed and not _records_equal(record, previous_records[URL]):
+            changed[URL] = record
+            changed_previous[URL] = previous_records[URL]
+    
+    current_URLs = {URL for URL, (record, _) in refreshed.items() if record is not None}
+    removed = {URL: record for URL, record in previous_records.items()
+               if URL not in current_URLs and record is not None}
+    
+    for URL in removed:
+        cache.evict(URL)
+    cache.product_URLs = [URL for URL in unique_URLs if URL in current_URLs]
+    cache.save()
+    
+    n_parsed = sum(parsed for _, parsed in refreshed.values())
+    logger.info(f"Refreshed {len(unique_URLs)} product pages, re-parsed {n_parsed}: "
+                f"{len(added)} added, {len(changed)} changed, {len(removed)} removed.")
+    
+    return ScrapeDelta(
+        full = pd.DataFrame.from_records([_with_URL(URL, refreshed[URL][0]) for URL in product_URLs if URL in current_URLs]),
+        added = _records_to_df(added),
+        changed = _records_to_df(changed),
+        changed_previous = _records_to_df(changed_previous),
+        removed = _records_to_df(removed),
+    )
+
+
+# Merge an incremental crawl's delta into a previously saved raw dataset
+def merge_scrape_delta(previous_df: pd.DataFrame, delta: ScrapeDelta) -> pd.DataFrame:
+    """Apply added/changed/removed racquets to a previous raw dataset.
+
+    Rows are matched on their product page URL (racquet_url), so listings sharing a racquet_name are
+    kept apart.
+
+    Args:
+        previous_df (pd.DataFrame): Previously saved raw dataset.
+        delta (ScrapeDelta): Output of scrape_tw_rackets_incremental.
+
+    Raises:
+        ValueError: If previous_df has no racquet_url column (scraped before product URLs were stored).
+
+    Returns:
+        pd.DataFrame: Raw dataset with stale rows dropped and new/changed rows appended.
+    """
+    
+    if "racquet_url" not in previous_df.columns:
+        raise ValueError("previous_df has no racquet_url column; re-scrape it in full before merging deltas into it")
+    
+    stale_URLs = set(delta.removed.index) | set(delta.changed_previous.index)
+    kept_df = previous_df[~previous_df["racquet_url"].isin(stale_URLs)]
+    
+    return pd.concat([kept_df, delta.changed, delta.added], ignore_index = True)
+
+
+def _records_to_df(records: dict[str, dict]) -> pd.DataFrame:
+    records_df = pd.DataFrame.from_records([_with_URL(URL, record) for URL, record in records.items()])
+    records_df.index = pd.Index(list(records.keys()), name = "product_URL", dtype = object)
+    
+    return records_df
+
+
+# Helper function to key a parsed record by its product page URL (the first column of the raw dataset)
+def _with_URL(product_page_URL: str, record: dict) -> dict:
+    return {"racquet_url": product_page_URL, **record}
+
+
+def _records_equal(a: dict, b: dict) -> bool:
+    # Compare as Series so NaN specs count as equal
+    return list(a) == list(b) and pd.Series(a, dtype = object).equals(pd.Series(b, dtype = object))
+
+
+# Helper function to GET a page with the pooled fetcher if one is given, else a bare request
+def _get_page(URL: str, fetcher: Fetcher = None) -> requests.Response:
+    with timed("scrape_fetch"):
+        response = fetcher.get(URL) if fetcher is not None else requests.get(URL)
+    count("scrape_pages_fetched", status = response.status_code)
+    count("scrape_bytes_downloaded", len(response.content))
+
+    return response
 
 
 # Helper function to get all brand page URLs from the side navbar  
-def _get_brand_URLs(shop_all_URL: str) -> list[str]:
+def _get_brand_URLs(shop_all_URL: str, fetcher: Fetcher = None) -> list[str]:
     """Get brand page URLs from shop all page.
 
     Args:
         shop_all_URL (str): Shop all page URL.
+        fetcher (Fetcher, optional): Pooled fetcher to use instead of a bare request. Defaults to None.
 
     Returns:
         list[str]: List of URLs.
     """
     
-    webpage = requests.get(shop_all_URL)
+    webpage = _get_page(shop_all_URL, fetcher = fetcher)
     soup = BeautifulSoup(webpage.content, "html.parser")
     sidebar_links = soup \
         .find_all("ul", attrs = {"class": "left_menu-section"})
@@ -74,31 +328,36 @@ def _get_brand_URLs(shop_all_URL: str) -> list[str]:
         brand_pointer = brand.find("a").get("href")
         brand_pointer_list.append(brand_pointer)
     
-    brand_page_URLs = ["https://www.tennis-warehouse.com"+ pointer for pointer in brand_pointer_list]
+    brand_page_URLs = [urljoin(shop_all_URL, pointer) for pointer in brand_pointer_list]
     
     return brand_page_URLs
 
 
 # Helper function to generate a list of all product page URLs from a given brand page URL
-def _get_product_page_URLs(brand_page_URL: str)->list[str]:
+def _get_product_page_URLs(brand_page_URL: str, fetcher: Fetcher = None)->list[str]:
     """Get tennis racquet product page URL
 
     Args:
         brand_page_URL (str): A brand's racquet display page URL.
+        fetcher (Fetcher, optional): Pooled fetcher to use instead of a bare request. Defaults to None.
 
     Returns:
         list[str]: List of tennis racquet listing URLs
     """
     
-    webpage = requests.get(brand_page_URL)
+    webpage = _get_page(brand_page_URL, fetcher = fetcher)
     soup = BeautifulSoup(webpage.content, "html.parser")
     product_elements = soup \
         .find_all("a", attrs = {"class": "cattable-wrap-cell-info"})
     
+    # Only keep absolute links back to the same site (https://www.tennis-warehouse.com/ in production)
+    _brand_page = urlparse(brand_page_URL)
+    site_root = f"{_brand_page.scheme}://{_brand_page.netloc}/"
+    
     product_page_URLs = []
     for product_element in product_elements:
         product_URL = product_element.get("href")
-        if "https://www.tennis-warehouse.com/" in product_URL:
+        if site_root in product_URL:
             product_page_URLs.append(product_URL)
         else:
             pass
@@ -121,7 +380,7 @@ def _get_racquet_specs(soup: BeautifulSoup) -> dict:
     
     if soup.find("tbody"):
         racquet_spec_elements = soup.find("tbody")\
-            .find_all("td", class_ = re.compile("Specs")) # type:ignore
+            .find_all("td", class_ = _SPECS_CLASS) # type:ignore
         
         for spec in racquet_spec_elements:
             if spec.find("strong"):
@@ -152,19 +411,38 @@ def _get_racquet_specs(soup: BeautifulSoup) -> dict:
     return racquet_specs
 
 
-#Get racquet features from a product page and return a DataFrame
-def _get_racquet_features(product_page_URL: str) -> pd.DataFrame:
+#Get racquet features from a product page and return them as a record
+def _get_racquet_features(product_page_URL: str, fetcher: Fetcher = None, parser: str = "html.parser") -> dict:
     """Get main features and specs from racquet page.
 
     Args:
         product_page_URL (str): A product's URL.
+        fetcher (Fetcher, optional): Pooled fetcher to use instead of a bare request. Defaults to None.
+        parser (str, optional): Parser backend, see src.data.parse.PARSER_BACKENDS. Defaults to "html.parser".
 
     Returns:
-        pd.DataFrame: A dataframe of a racquet and all of the collected features.
+        dict: A racquet record of its product page URL and all of the collected features (one DataFrame row).
     """
     
-    webpage = requests.get(product_page_URL)
-    soup = BeautifulSoup(webpage.content, "html.parser")
+    webpage = _get_page(product_page_URL, fetcher = fetcher)
+    
+    return _with_URL(product_page_URL, _parse_racquet_features(webpage.content, parser = parser))
+
+
+# Parse racquet features out of a product page's HTML
+@timed("scrape_parse")
+def _parse_racquet_features(content: bytes, parser: str = "html.parser") -> dict:
+    """Parse main features and specs from a racquet page's HTML.
+
+    Args:
+        content (bytes): Product page HTML.
+        parser (str, optional): Parser backend, see src.data.parse.PARSER_BACKENDS. Defaults to "html.parser".
+
+    Returns:
+        dict: A racquet record of all of the collected features (one DataFrame row).
+    """
+    
+    soup = make_product_soup(content, parser = parser)
     
     # Extract features from top part of page
     racquet_info = {}
@@ -197,9 +475,23 @@ def _get_racquet_features(product_page_URL: str) -> pd.DataFrame:
     #Combine top info and specs dictionaries
     racquet_info.update(racquet_specs)
     
-    racquet_info_df = pd.DataFrame(racquet_info, index=[0])
+    return racquet_info
+
+
+# Get racquet records for all products listed on a brand page
+def _get_brand_page_records(brand_page_URL: str, parser: str = "html.parser") -> list[dict]:
+    """Aggregates above helpers to input a brand page and return a record for every racquet on page.
+
+    Args:
+        brand_page_URL (str): URL of a brand's page.
+        parser (str, optional): Product page parser backend. Defaults to "html.parser".
+
+    Returns:
+        list[dict]: One record per racquet on the page.
+    """
+    product_URLs = _get_product_page_URLs(brand_page_URL= brand_page_URL)
     
-    return racquet_info_df
+    return [_get_racquet_features(product_URL, parser = parser) for product_URL in product_URLs]
 
 
 # Get racquet features for all products listed on a brand page and return a DataFrame with all of the information
@@ -212,29 +504,21 @@ def _scrape_brand_page(brand_page_URL) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame of an entire page's racquets and their features.
     """
-    product_URLs = _get_product_page_URLs(brand_page_URL= brand_page_URL)
     
-    total_racquet_info_df = pd.DataFrame()
-    for product_URL in product_URLs:
-        racquet_info_df = _get_racquet_features(product_URL)
-        total_racquet_info_df = pd.concat([total_racquet_info_df,
-                                           racquet_info_df])
- 
-    return total_racquet_info_df
+    return pd.DataFrame.from_records(_get_brand_page_records(brand_page_URL = brand_page_URL))
 
 
 # Run scraping functions over all brand pages and store results  in a single DataFrame -- UNUSED
 def _scrape_all_brand_pages(brand_page_URLs: list[str]) -> pd.DataFrame:
     i = 0
-    final_df = pd.DataFrame()
+    racquet_records = []
     for brand_URL in brand_page_URLs:
-        df = _scrape_brand_page(brand_URL)
-        final_df = pd.concat([final_df, df])
+        racquet_records.extend(_get_brand_page_records(brand_URL))
         
         logging.debug(f"Completed brand {i}")
         i += 1
     
     logging.info(f"Successfully scraped all {i} brands \
         (if this works on the first try it'd be a miracle)!")
-    return final_df
+    return pd.DataFrame.from_records(racquet_records)
 
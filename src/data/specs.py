@@ -0,0 +1,4 @@
+# Sign racquet_balance_HH_HL gets per label of the scraped "Balance" spec ("... 4 pts HL"): head light
+# points are stored positive, head heavy points negative and an even balance as 0. Kept free of pandas
+# so the search service can read it without importing the preprocessing stack.
+BALANCE_SIGNS = {"HL": 1.0, "HH": -1.0, "EB": 0.0}
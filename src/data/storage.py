@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Low-cardinality text columns stored dictionary-encoded (pandas Categorical) in columnar files
+CATEGORICAL_COLS = [
+    "racquet_brand", "racquet_power", "racquet_stroke_style", "racquet_swing_speed",  # preprocessed names
+    "Power Level", "Stroke Style", "Swing Speed",  # raw scrape names
+]
+
+_PARQUET_SUFFIXES = (".parquet", ".pq")
+_ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+
+def dataset_format(path: str) -> str:
+    """Map a dataset path to "csv", "parquet" or "arrow" by its suffix.
+
+    Args:
+        path (str): Dataset path.
+
+    Raises:
+        ValueError: If the suffix is not a supported dataset format.
+
+    Returns:
+        str: The format name.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in _PARQUET_SUFFIXES:
+        return "parquet"
+    if suffix in _ARROW_SUFFIXES:
+        return "arrow"
+    if suffix == ".csv":
+        return "csv"
+    raise ValueError(f"Unsupported dataset file type '{suffix}'. Use .csv, .parquet or .arrow.")
+
+
+def _with_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    categorical_cols = [col for col in CATEGORICAL_COLS if col in df.columns and df[col].dtype == object]
+    if not categorical_cols:
+        return df
+    return df.astype({col: "category" for col in categorical_cols})
+
+
+def save_dataset(df: pd.DataFrame, path: str):
+    """Save a racquet dataset as CSV, Parquet or Arrow IPC, picked by the file suffix.
+
+    Columnar formats keep dtypes and store the brand/power/stroke style/swing speed columns
+    dictionary-encoded. Arrow IPC files are written uncompressed so they can be memory-mapped.
+
+    Args:
+        df (pd.DataFrame): Dataset to save.
+        path (str): Output path ending in .csv, .parquet or .arrow.
+    """
+    file_format = dataset_format(path)
+    if file_format == "csv":
+        df.to_csv(path, index = False, sep = ",")
+        return
+
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(_with_categoricals(df), preserve_index = False)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, path, compression = "uncompressed")
+
+
+def load_dataset(path: str, columns: list[str] = None, memory_map: bool = True) -> pd.DataFrame:
+    """Load a racquet dataset saved with save_dataset (or any CSV/Parquet/Arrow file).
+
+    Args:
+        path (str): Path ending in .csv, .parquet or .arrow.
+        columns (list[str], optional): Only read these columns. Defaults to None (all).
+        memory_map (bool, optional): Memory-map columnar files instead of reading them into buffers. Defaults to True.
+
+    Returns:
+        pd.DataFrame: The dataset, with categorical columns as pandas Categorical for columnar files.
+    """
+    file_format = dataset_format(path)
+    if file_format == "csv":
+        return pd.read_csv(path, usecols = columns)
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        schema_names = pq.read_schema(path).names
+        table = pq.read_table(
+            path,
+            columns = columns,
+            memory_map = memory_map,
+            read_dictionary = [col for col in CATEGORICAL_COLS if col in schema_names],
+        )
+    else:
+        import pyarrow.feather as feather
+
+        table = feather.read_table(path, columns = columns, memory_map = memory_map)
+
+    df = table.to_pandas()
+
+    # Arrow gives None for missing strings; use NaN like pd.read_csv so downstream text matches
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+
+    # Arrow IPC files written chunk by chunk keep these columns as plain strings
+    return _with_categoricals(df)
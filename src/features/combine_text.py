@@ -1,9 +1,17 @@
+import numpy as np
 import pandas as pd
 from typing import List
+from src.instrumentation import timed
 
+# Template versions used in embedding cache keys (src/features/embedding_store.py).
+# Bump a version whenever its builder's output text changes so cached embeddings are recomputed.
+STRUCTURED_TEMPLATE_VERSION = "structured-v1"
+NATURAL_TEMPLATE_VERSION = "natural-v1"
+NATURAL_V2_TEMPLATE_VERSION = "natural-v2"
+
+
+@timed("combine_text", builder="structured")
 def structured_combine_text(df:pd.DataFrame, object_cols:List[str]) -> pd.DataFrame:
-    _df = df.copy()
-    _df["combined_col"] = ""
     
     _replacements = str.maketrans({
         "!":".",
@@ -31,12 +39,14 @@ def structured_combine_text(df:pd.DataFrame, object_cols:List[str]) -> pd.DataFr
         "racquet_grip":"Racquet Grip Type"
     }
     
+    # Build one "Title: content\n" piece per column and concatenate them in a single pass
+    _pieces = []
     for col in object_cols:        
-        _content = _df[col].fillna("").astype(str).str.translate(_replacements)
+        _content = df[col].astype(object).fillna("").astype(str).str.translate(_replacements)
         _content = _content.str.replace("in²", "inches squared", regex=False).str.replace("  ", " ", regex=False)
-        _df["combined_col"] += _title_dict[col] + ": " + _content + "\n"
+        _pieces += [_title_dict[col] + ": ", _content, "\n"]
             
-    return _df["combined_col"]
+    return _join_pieces(_pieces, df.index, collapse_whitespace=False).rename("combined_col")
 
 
 def create_natural_combined_text(row:pd.Series) -> str:
@@ -91,4 +101,72 @@ def create_natural_combined_text_v2(row:pd.Series) -> str:
         f"\n\nHere is the marketing blurb for the {safe(row['racquet_name'])}:\n{row['racquet_desc']}"
         )
     
-    return " ".join(combined_text.split())
\ No newline at end of file
+    return " ".join(combined_text.split())
+
+
+# Batch equivalents of the row-wise builders above: same text, built column-wise over a whole DataFrame
+
+def _balance_tag(balance:pd.Series) -> np.ndarray:
+    return np.select([balance < 0, balance > 0], ["head light", "head heavy"], default="equally balanced").astype(object)
+
+
+def _to_str(values:pd.Series) -> np.ndarray:
+    # str() of every value, formatting each distinct spec value only once
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([str(value) for value in uniques], dtype=object)[codes]
+
+
+def _natural_text_pieces(df:pd.DataFrame) -> list:
+    def safe(col):
+        return df[col].astype(object).str.strip().fillna("unkown")
+    
+    def num(col):
+        return _to_str(df[col])
+    
+    balance = df["racquet_balance_HH_HL"]
+    balance_value = np.where(balance == 0, "", _to_str(balance))
+    
+    # Alternating template literals and per-row columns, joined once per row in _join_pieces
+    return [
+        "The ", safe("racquet_name"), " is a ", safe("racquet_power").str.lower(), " powered racquet designed for players with ",
+        safe("racquet_stroke_style").str.lower(), " strokes and ", safe("racquet_swing_speed").str.lower(), " swings. ",
+        "It features a stiffness rating of ", num("racquet_stiffness"), " and a ", pd.Series(_to_str(df["racquet_composition"])).str.lower(), " ",
+        "composition. The racquet has a ", num("racquet_swingweight"), " ounce swing weight, a ", num("racquet_head_size_sq_in"), " ",
+        "square inch head size, a ", num("racquet_strung_weight_oz"), " ounce strung weight, ",
+        "and has a ", num("racquet_mains"), " by ", num("racquet_crosses"), " string pattern. ",
+        "The racquet has a tension range of ", num("racquet_tension_lower"), " pounds (lbs) to ", num("racquet_tension_upper"), " pounds (lbs). ",
+        "The racquet has an average beam width of ", num("racquet_avg_beam_width"), ", with a ", num("racquet_balance_in"), " inch balance point, ",
+        "and is ", balance_value, " ", _balance_tag(balance), ". The racquet has a ",
+        _to_str(df["racquet_colors"]), " colorway and has a price of ", num("racquet_price"), " dollars.",
+    ]
+
+
+def _join_pieces(pieces:list, index:pd.Index, collapse_whitespace:bool = True) -> pd.Series:
+    # Concatenate every row's pieces once, optionally collapsing whitespace like " ".join(text.split())
+    columns = [
+        [piece] * len(index) if isinstance(piece, str) else piece.tolist()
+        for piece in pieces
+    ]
+    if not columns:
+        texts = [""] * len(index)
+    elif collapse_whitespace:
+        texts = [" ".join("".join(parts).split()) for parts in zip(*columns)]
+    else:
+        texts = ["".join(parts) for parts in zip(*columns)]
+    
+    return pd.Series(texts, index=index, dtype=object)
+
+
+@timed("combine_text", builder="natural")
+def create_natural_combined_text_batch(df:pd.DataFrame) -> pd.Series:
+    return _join_pieces(_natural_text_pieces(df), df.index)
+
+
+@timed("combine_text", builder="natural_v2")
+def create_natural_combined_text_v2_batch(df:pd.DataFrame) -> pd.Series:
+    pieces = _natural_text_pieces(df) + [
+        "\n\nHere is the marketing blurb for the ", df["racquet_name"].astype(object).str.strip().fillna("unkown"), ":\n",
+        _to_str(df["racquet_desc"]),
+    ]
+    
+    return _join_pieces(pieces, df.index)
\ No newline at end of file
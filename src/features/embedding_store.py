@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Sequence
+
+import numpy as np
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Encoder: list of texts -> (len(texts), dim) array, e.g. SentenceTransformer(model_name).encode
+Encoder = Callable[[list[str]], np.ndarray]
+
+
+def embedding_key(model_name: str, template_version: str, text: str) -> str:
+    """Hash the inputs that determine a text's embedding.
+
+    Args:
+        model_name (str): Embedding model name, e.g. "all-MiniLM-L6-v2".
+        template_version (str): Version of the text template that produced text (see combine_text.py).
+        text (str): Combined racquet text.
+
+    Returns:
+        str: sha256 hex digest identifying the embedding.
+    """
+    payload = "\x00".join([model_name, template_version, text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def sentence_transformer_encoder(model_name: str, batch_size: int = 64) -> Encoder:
+    """Build an Encoder backed by sentence-transformers (imported only when called).
+
+    Args:
+        model_name (str): sentence-transformers model name.
+        batch_size (int, optional): Encoding batch size. Defaults to 64.
+
+    Returns:
+        Encoder: Function mapping a list of texts to a float32 embedding matrix.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+
+    def encode(texts: list[str]) -> np.ndarray:
+        return model.encode(texts, batch_size = batch_size, show_progress_bar = False, convert_to_numpy = True)
+
+    return encode
+
+
+class LazyEncoder:
+    """Encoder that loads its sentence-transformers model on first use instead of at construction.
+
+    Importing sentence-transformers (and torch) and loading the weights takes seconds, so a server
+    can start answering lexical and cached queries first and call warm_up() to load the model on a
+    background thread. Queries that need the model before it is ready wait for the load to finish.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 64):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._encode = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._encode is not None
+
+    def _load(self) -> Encoder:
+        with self._lock:
+            if self._encode is None:
+                started = time.perf_counter()
+                self._encode = sentence_transformer_encoder(self.model_name, self.batch_size)
+                logger.info(f"Loaded {self.model_name} in {time.perf_counter() - started:.1f}s.")
+        return self._encode
+
+    # Helper function for the warm-up thread. A failed preload is retried by the first query that needs it
+    def _warm(self):
+        try:
+            self._load()
+        except Exception as e:
+            logger.warning(f"Could not preload {self.model_name}: {e}")
+
+    def warm_up(self) -> threading.Thread:
+        """Start loading the model on a daemon thread.
+
+        Returns:
+            threading.Thread: The loading thread.
+        """
+        thread = threading.Thread(target = self._warm, name = "model-loader", daemon = True)
+        thread.start()
+        return thread
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        return self._load()(texts)
+
+
+class EmbeddingStore:
+    """On-disk embedding cache: a memory-mapped float32 matrix plus a JSON index of row keys.
+
+    Rows are keyed by embedding_key(model_name, template_version, text), so a racquet is only
+    re-embedded when its combined text, the text template or the model changes. Whenever rows are
+    added or evicted, the matrix is written to a new vectors-*.f32 file and the index (index.json),
+    which names that file, is replaced last. A crash at any point leaves the previous index and the
+    matrix it names intact (plus, at worst, an unnamed vectors file that is never read).
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self._index_path = os.path.join(store_dir, "index.json")
+        os.makedirs(store_dir, exist_ok = True)
+
+        index = self._read_index()
+        self.dim = index.get("dim")
+        self._keys = index.get("keys", [])
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+        self._vectors_path = os.path.join(store_dir, index["vectors"]) if self._keys else None
+
+    def _read_index(self) -> dict:
+        if not os.path.exists(self._index_path):
+            return {}
+        with open(self._index_path, "r", encoding = "utf-8") as f:
+            return json.load(f)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def vectors(self) -> np.ndarray:
+        """Memory-map the cached matrix read-only.
+
+        Returns:
+            np.ndarray: (len(self), dim) float32 matrix, rows in index order.
+        """
+        if not self._keys:
+            return np.empty((0, self.dim or 0), dtype = np.float32)
+        return np.memmap(self._vectors_path, dtype = np.float32, mode = "r", shape = (len(self._keys), self.dim))
+
+    def lookup(self, keys: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Gather cached vectors for keys.
+
+        Args:
+            keys (Sequence[str]): Embedding keys.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (len(keys), dim) matrix with zero rows for misses, and a
+            boolean mask of which keys were found.
+        """
+        rows = np.array([self._rows.get(key, -1) for key in keys], dtype = np.int64)
+        found = rows >= 0
+        matrix = np.zeros((len(keys), self.dim or 0), dtype = np.float32)
+        if found.any():
+            matrix[found] = self.vectors()[rows[found]]
+
+        return matrix, found
+
+    def refresh(self, texts: Sequence[str], encode: Encoder, model_name: str, template_version: str,
+                batch_size: int = 256, evict: bool = True) -> np.ndarray:
+        """Return embeddings for texts, only encoding texts whose key is not cached yet.
+
+        Args:
+            texts (Sequence[str]): Combined racquet texts, e.g. from create_natural_combined_text_v2_batch.
+            encode (Encoder): Embedding function, e.g. sentence_transformer_encoder(model_name).
+            model_name (str): Model name used in the cache key.
+            template_version (str): Text template version used in the cache key.
+            batch_size (int, optional): Number of new texts passed to encode per call. Defaults to 256.
+            evict (bool, optional): Drop cached rows not used by texts. Defaults to True.
+
+        Raises:
+            ValueError: If encode returns vectors of a different size than the cached ones.
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32 embeddings aligned with texts.
+        """
+        keys = [embedding_key(model_name, template_version, text) for text in texts]
+        n_cached = sum(key in self._rows for key in keys)
+
+        # Encode each distinct uncached text once
+        new_texts = {}
+        for key, text in zip(keys, texts):
+            if key not in self._rows and key not in new_texts:
+                new_texts[key] = text
+        new_keys = list(new_texts)
+        new_vectors = []
+        for start in range(0, len(new_keys), batch_size):
+            batch = [new_texts[key] for key in new_keys[start:start + batch_size]]
+            new_vectors.append(np.asarray(encode(batch), dtype = np.float32))
+
+        new_matrix = np.concatenate(new_vectors) if new_vectors else np.empty((0, self.dim or 0), dtype = np.float32)
+
+        wanted = dict.fromkeys(keys)
+        stale = [key for key in self._keys if key not in wanted] if evict else []
+        logger.info(f"Embedding store: {n_cached} cached, {len(new_keys)} newly embedded, {len(stale)} evicted.")
+
+        if new_keys or stale:
+            self._rewrite(list(wanted) if evict else self._keys + new_keys, new_keys, new_matrix)
+
+        matrix, _ = self.lookup(keys)
+        return matrix
+
+    def _rewrite(self, keys: list[str], new_keys: list[str], new_matrix: np.ndarray):
+        # Write the kept cached rows followed by the new rows to a new matrix file, then swap in the index
+        # that names it. Only the file the replaced index named is removed afterwards: another process
+        # refreshing the same store may have written a file its index does not name yet.
+        kept = [key for key in keys if key in self._rows]
+        kept_rows = np.array([self._rows[key] for key in kept], dtype = np.int64)
+        dim = new_matrix.shape[1] if len(new_keys) else self.dim
+        if kept and dim != self.dim:
+            raise ValueError(f"Encoder returned {dim}-d vectors but the store holds {self.dim}-d vectors.")
+        all_keys = kept + new_keys
+
+        vectors_path = None
+        if all_keys:
+            fd, vectors_path = tempfile.mkstemp(prefix = "vectors-", suffix = ".f32", dir = self.store_dir)
+            os.close(fd)
+            out = np.memmap(vectors_path, dtype = np.float32, mode = "w+", shape = (len(all_keys), dim))
+            if len(kept):
+                out[:len(kept)] = self.vectors()[kept_rows]
+            out[len(kept):] = new_matrix
+            out.flush()
+            del out
+
+        fd, tmp_index = tempfile.mkstemp(prefix = "index-", suffix = ".json.tmp", dir = self.store_dir)
+        with os.fdopen(fd, "w", encoding = "utf-8") as f:
+            json.dump({"dim": dim, "vectors": vectors_path and os.path.basename(vectors_path), "keys": all_keys}, f)
+        replaced = self._read_index().get("vectors")
+        os.replace(tmp_index, self._index_path)
+
+        self.dim = dim
+        self._keys = all_keys
+        self._rows = {key: row for row, key in enumerate(all_keys)}
+        self._vectors_path = vectors_path
+        # Open memmaps of an old file stay readable after it is unlinked
+        if replaced and os.path.join(self.store_dir, replaced) != vectors_path:
+            try:
+                os.remove(os.path.join(self.store_dir, replaced))
+            except FileNotFoundError:
+                pass
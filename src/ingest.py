@@ -0,0 +1,451 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+import requests
+
+from src.data.fetch import Fetcher, FetchConfig
+from src.data.preprocess import preprocess_records
+from src.data.scrape import _get_brand_URLs, _get_page, _get_product_page_URLs, _parse_racquet_features
+from src.features.combine_text import NATURAL_V2_TEMPLATE_VERSION, create_natural_combined_text_v2_batch
+from src.features.embedding_store import Encoder
+from src.instrumentation import count, log_event, set_gauge, timed
+from src.search.dense import DenseIndex
+from src.search.filters import FILTER_FIELDS, FilterEngine
+from src.search.incremental import IncrementalIndex, racquet_id
+from src.search.lexical import BM25Index
+from src.search.service import DEFAULT_MODEL, SearchService, ServingConfig
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Files in an ingest snapshot directory
+SNAPSHOT_MANIFEST = "snapshot.json"
+SNAPSHOT_ROWS = "racquets.csv"
+SNAPSHOT_EMBEDDINGS = "embeddings.f32"
+
+# End-of-stream marker passed down the queues
+_DONE = object()
+# Seconds a blocked queue operation waits before checking whether the pipeline was stopped
+_POLL = 0.1
+
+
+@dataclass
+class IngestConfig:
+    """Settings for the streaming ingest pipeline.
+
+    Attributes:
+        queue_size (int): Capacity of each queue between stages. A stage that gets ahead blocks on
+            the full queue, so a slow embedder throttles the crawl instead of buffering pages.
+        parse_workers (int): Processes parsing product pages, each fed by its own thread. 0 parses
+            on one thread of this process, where the GIL caps parsing at about one core.
+        batch_size (int): Max records preprocessed and turned into text together.
+        embed_batch_size (int): Max texts per encoder call.
+        max_batch_wait (float): Seconds a stage waits to fill a batch before running a partial one.
+        parser (str): Product page parser backend, see src.data.parse.PARSER_BACKENDS.
+        compact_rows (int): Delta rows plus tombstones at which the index is compacted between
+            batches. Lower than COMPACT_ROWS because every upsert rebuilds the delta's BM25
+            postings, and a fresh catalog streams entirely through the delta.
+    """
+    queue_size: int = 64
+    parse_workers: int = 0
+    batch_size: int = 32
+    embed_batch_size: int = 64
+    max_batch_wait: float = 1.0
+    parser: str = "html.parser"
+    compact_rows: int = 1_000
+
+
+@dataclass
+class IngestResult:
+    """Catalog produced by an ingest run, in the order rows were indexed.
+
+    Attributes:
+        df (pd.DataFrame): Cleaned racquet rows.
+        texts (list[str]): Natural v2 combined text per row.
+        embeddings (np.ndarray): (len(df), dim) embeddings of texts.
+        stats (dict): Page, record and row counts and stage timings.
+    """
+    df: pd.DataFrame
+    texts: list[str]
+    embeddings: np.ndarray
+    stats: dict = field(default_factory = dict)
+
+
+class _Stopped(Exception):
+    pass
+
+
+class IngestSnapshot:
+    """Append-only on-disk copy of an ingest run: cleaned rows (racquets.csv) and their embeddings
+    (embeddings.f32, float32 rows).
+
+    snapshot.json records how many rows have been written completely and is replaced atomically
+    after every append, so an interrupted run leaves a readable prefix of the catalog. Opening a
+    snapshot directory starts a new snapshot there.
+
+    Args:
+        snapshot_dir (str): Directory to write.
+        model_name (str): Embedding model name, recorded in the manifest.
+        template_version (str, optional): Text template version, recorded in the manifest.
+            Defaults to NATURAL_V2_TEMPLATE_VERSION.
+    """
+
+    def __init__(self, snapshot_dir: str, model_name: str, template_version: str = NATURAL_V2_TEMPLATE_VERSION):
+        self.snapshot_dir = snapshot_dir
+        os.makedirs(snapshot_dir, exist_ok = True)
+        self.manifest = {"model": model_name, "template_version": template_version, "rows": 0, "dim": None,
+                         "complete": False}
+        for name in (SNAPSHOT_ROWS, SNAPSHOT_EMBEDDINGS):
+            open(os.path.join(snapshot_dir, name), "wb").close()
+        self._write_manifest()
+
+    def _write_manifest(self):
+        path = os.path.join(self.snapshot_dir, SNAPSHOT_MANIFEST)
+        with open(path + ".tmp", "w", encoding = "utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def append(self, df: pd.DataFrame, embeddings: np.ndarray):
+        """Write a batch of rows and their embeddings.
+
+        Args:
+            df (pd.DataFrame): Cleaned racquet rows, with the same columns for every batch.
+            embeddings (np.ndarray): (len(df), dim) embeddings.
+        """
+        df.to_csv(os.path.join(self.snapshot_dir, SNAPSHOT_ROWS), mode = "a", header = not self.manifest["rows"],
+                  index = False)
+        with open(os.path.join(self.snapshot_dir, SNAPSHOT_EMBEDDINGS), "ab") as f:
+            f.write(np.ascontiguousarray(embeddings, dtype = np.float32).tobytes())
+        self.manifest["rows"] += len(df)
+        self.manifest["dim"] = int(embeddings.shape[1])
+        self._write_manifest()
+
+    def close(self, complete: bool = True):
+        """Mark the snapshot as holding a whole crawl (or not).
+
+        Args:
+            complete (bool, optional): Whether the run finished. Defaults to True.
+        """
+        self.manifest["complete"] = complete
+        self._write_manifest()
+
+
+def load_snapshot(snapshot_dir: str) -> tuple[pd.DataFrame, np.ndarray, dict]:
+    """Read the rows an ingest run has written so far.
+
+    Args:
+        snapshot_dir (str): Directory written by IngestSnapshot.
+
+    Returns:
+        tuple[pd.DataFrame, np.ndarray, dict]: Cleaned rows, their (n, dim) embeddings
+        (memory-mapped read-only) and the manifest.
+    """
+    with open(os.path.join(snapshot_dir, SNAPSHOT_MANIFEST), "r", encoding = "utf-8") as f:
+        manifest = json.load(f)
+    n_rows = manifest["rows"]
+    if not n_rows:
+        return pd.DataFrame(), np.empty((0, manifest["dim"] or 0), dtype = np.float32), manifest
+
+    df = pd.read_csv(os.path.join(snapshot_dir, SNAPSHOT_ROWS), nrows = n_rows)
+    embeddings = np.memmap(os.path.join(snapshot_dir, SNAPSHOT_EMBEDDINGS), dtype = np.float32, mode = "r",
+                           shape = (n_rows, manifest["dim"]))
+    return df, embeddings, manifest
+
+
+# Helper function to build a service over an empty catalog for the first ingested rows to be upserted into
+def _empty_service(encode: Encoder, dim: int, config: ServingConfig = None) -> SearchService:
+    filters = FilterEngine({field: np.empty(0) for field in FILTER_FIELDS}, 0)
+    return SearchService([], filters, DenseIndex(np.empty((0, dim), dtype = np.float32)), encode,
+                         BM25Index.build([]), config)
+
+
+class IngestPipeline:
+    """Streams the catalog from the scraper into a live search index and an on-disk snapshot.
+
+    Stages run concurrently and are connected by bounded queues: product URL discovery (brand
+    pages), page fetching (fetch_config.max_workers threads on one pooled Fetcher), parsing
+    (_parse_racquet_features), row preprocessing (preprocess_records) with natural v2 text
+    building, batched embedding, and a sink that appends each batch to the snapshot and upserts
+    it into an IncrementalIndex. Racquets become searchable batch by batch while the crawl is
+    still running, so a fresh catalog is ready shortly after the last page is fetched rather than
+    after every stage has run over the whole catalog in turn. When a stage falls behind, the
+    queue in front of it fills up and the stages feeding it block (backpressure), which bounds
+    memory to about queue_size items per stage.
+
+    Pages that fail to fetch or parse are logged and skipped. An error in any other stage stops
+    the pipeline and is raised from run().
+
+    Args:
+        encode (Encoder): Embedding function for the combined texts.
+        snapshot_dir (str, optional): Directory for an IngestSnapshot. Defaults to None (no snapshot).
+        service (SearchService, optional): Running service to update, e.g. one serving the previous
+            catalog. Defaults to None: a new service over an empty catalog is created when the first
+            batch is embedded (self.service).
+        config (IngestConfig, optional): Pipeline settings. Defaults to None (IngestConfig defaults).
+        fetch_config (FetchConfig, optional): Fetcher settings. Defaults to None (FetchConfig defaults).
+        model_name (str, optional): Embedding model name, recorded in the snapshot. Defaults to DEFAULT_MODEL.
+        serving_config (ServingConfig, optional): Cache and batching settings of a new service.
+            Defaults to None.
+    """
+
+    def __init__(self, encode: Encoder, snapshot_dir: str = None, service: SearchService = None,
+                 config: IngestConfig = None, fetch_config: FetchConfig = None, model_name: str = DEFAULT_MODEL,
+                 serving_config: ServingConfig = None):
+        self.encode = encode
+        self.snapshot_dir = snapshot_dir
+        self.service = service
+        # Never compacted in the background: the sink compacts between batches, so no compaction
+        # is still running when run() does the final one
+        self.index = IncrementalIndex(service, background = False) if service is not None else None
+        self.config = config or IngestConfig()
+        self.fetch_config = fetch_config or FetchConfig()
+        self.model_name = model_name
+        self.serving_config = serving_config
+        self._stop = threading.Event()
+        self._errors = []
+
+    # Helper function to put an item on a bounded queue, waiting while it is full unless the pipeline stops
+    def _put(self, outbox: queue.Queue, item, stage: str):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                outbox.put(item, timeout = _POLL)
+            except queue.Full:
+                count("ingest_queue_full", stage = stage)
+                continue
+            set_gauge("ingest_queue_depth", outbox.qsize(), stage = stage)
+            return
+
+    # Helper function to take the next item from a queue, waiting while it is empty unless the pipeline stops
+    def _get(self, inbox: queue.Queue, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            wait = _POLL if deadline is None else min(_POLL, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                return inbox.get(timeout = wait)
+            except queue.Empty:
+                continue
+
+    # Helper function to group queue items into batches of up to max_rows rows. A batch is cut short when
+    # max_batch_wait passes without it filling, so rows never wait long for a slow crawl
+    def _batches(self, inbox: queue.Queue, max_rows: int, rows: Callable = lambda item: 1) -> Iterator[list]:
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                return
+            batch, n_rows = [item], rows(item)
+            deadline = time.monotonic() + self.config.max_batch_wait
+            while n_rows < max_rows:
+                try:
+                    item = self._get(inbox, timeout = max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    yield batch
+                    return
+                batch.append(item)
+                n_rows += rows(item)
+            yield batch
+
+    # Helper function to run a stage on worker threads. The last worker to finish passes _DONE downstream;
+    # an exception stops every stage and is re-raised by run()
+    def _start(self, stage: str, work: Callable, workers: int = 1, inbox: queue.Queue = None,
+               outbox: queue.Queue = None) -> list[threading.Thread]:
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def run():
+            try:
+                work()
+                if inbox is not None:
+                    # Let sibling workers see the end of the stream too
+                    inbox.put(_DONE)
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and outbox is not None:
+                    self._put(outbox, _DONE, stage)
+            except _Stopped:
+                pass
+            except BaseException as e:
+                logger.error(f"Ingest stage {stage} failed: {e!r}")
+                self._errors.append(e)
+                self._stop.set()
+
+        threads = [threading.Thread(target = run, name = f"ingest-{stage}-{i}", daemon = True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def run(self, shop_all_URL: str, prune: bool = True) -> IngestResult:
+        """Crawl the catalog and stream every racquet into the index and snapshot.
+
+        Args:
+            shop_all_URL (str): URL of 'Shop All' page of TW website.
+            prune (bool, optional): After a crawl without fetch or parse failures, delete racquets of
+                a passed-in service that are no longer listed. Defaults to True.
+
+        Raises:
+            Exception: The first error raised by a pipeline stage.
+
+        Returns:
+            IngestResult: The ingested catalog and run statistics.
+        """
+        config = self.config
+        urls, pages, records, texts, vectors = (queue.Queue(maxsize = config.queue_size) for _ in range(5))
+        snapshot = IngestSnapshot(self.snapshot_dir, self.model_name) if self.snapshot_dir is not None else None
+        stats = {"product_pages": 0, "pages_fetched": 0, "fetch_failures": 0, "parse_failures": 0, "records": 0,
+                 "rows": 0, "batches": 0}
+        stats_lock = threading.Lock()
+        start = time.perf_counter()
+
+        def add(name, value = 1):
+            with stats_lock:
+                stats[name] += value
+
+        parse_pool = ProcessPoolExecutor(max_workers = config.parse_workers) if config.parse_workers else None
+        with Fetcher(self.fetch_config) as fetcher:
+            def discover():
+                brand_page_URLs = _get_brand_URLs(shop_all_URL = shop_all_URL, fetcher = fetcher)
+                seen = set()
+                for product_URLs in fetcher.map(lambda URL: _get_product_page_URLs(URL, fetcher = fetcher), brand_page_URLs):
+                    for product_URL in product_URLs:
+                        if product_URL not in seen:
+                            seen.add(product_URL)
+                            add("product_pages")
+                            self._put(urls, product_URL, "discover")
+
+            def fetch():
+                while (product_URL := self._get(urls)) is not _DONE:
+                    try:
+                        content = _get_page(product_URL, fetcher = fetcher).content
+                    except requests.RequestException as e:
+                        logger.warning(f"Skipping {product_URL}: {e}")
+                        add("fetch_failures")
+                        continue
+                    add("pages_fetched")
+                    self._put(pages, content, "fetch")
+
+            def parse():
+                while (content := self._get(pages)) is not _DONE:
+                    try:
+                        if parse_pool is not None:
+                            record = parse_pool.submit(_parse_racquet_features, content, config.parser).result()
+                        else:
+                            record = _parse_racquet_features(content, parser = config.parser)
+                    except (AttributeError, TypeError, ValueError) as e:
+                        logger.warning(f"Skipping a product page that could not be parsed: {e!r}")
+                        add("parse_failures")
+                        continue
+                    add("records")
+                    self._put(records, record, "parse")
+
+            def preprocess():
+                for batch in self._batches(records, config.batch_size):
+                    with timed("ingest_stage", stage = "preprocess"):
+                        df = preprocess_records(batch)
+                        batch_texts = create_natural_combined_text_v2_batch(df).tolist()
+                    if len(df):
+                        self._put(texts, (df, batch_texts), "preprocess")
+
+            def embed():
+                for batch in self._batches(texts, config.embed_batch_size, rows = lambda item: len(item[1])):
+                    df = pd.concat([df for df, _ in batch], ignore_index = True)
+                    batch_texts = [text for _, item_texts in batch for text in item_texts]
+                    with timed("ingest_stage", stage = "embed"):
+                        embeddings = np.asarray(self.encode(batch_texts), dtype = np.float32)
+                    self._put(vectors, (df, batch_texts, embeddings), "embed")
+
+            threads = [
+                *self._start("discover", discover, outbox = urls),
+                *self._start("fetch", fetch, self.fetch_config.max_workers, urls, pages),
+                *self._start("parse", parse, max(1, config.parse_workers), pages, records),
+                *self._start("preprocess", preprocess, inbox = records, outbox = texts),
+                *self._start("embed", embed, inbox = texts, outbox = vectors),
+            ]
+
+            # The sink runs on the calling thread: snapshot, then index. Batches that were embedded while the
+            # previous upsert ran are indexed together, so upserts do not fall behind a fast embedder
+            frames, all_texts, all_embeddings = [], [], []
+            try:
+                done = False
+                while not done and (item := self._get(vectors)) is not _DONE:
+                    batch = [item]
+                    while True:
+                        try:
+                            item = vectors.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is _DONE:
+                            done = True
+                            break
+                        batch.append(item)
+                    df = pd.concat([df for df, _, _ in batch], ignore_index = True)
+                    batch_texts = [text for _, item_texts, _ in batch for text in item_texts]
+                    embeddings = np.concatenate([embeddings for _, _, embeddings in batch])
+                    with timed("ingest_stage", stage = "index"):
+                        if snapshot is not None:
+                            snapshot.append(df, embeddings)
+                        if self.index is None:
+                            self.service = _empty_service(self.encode, embeddings.shape[1], self.serving_config)
+                            self.index = IncrementalIndex(self.service, background = False)
+                        self.index.upsert(df, embeddings)
+                        index_stats = self.index.stats()
+                        if index_stats["delta_rows"] + index_stats["tombstones"] >= config.compact_rows:
+                            self.index.compact()
+                    if not stats["batches"]:
+                        stats["first_searchable_seconds"] = round(time.perf_counter() - start, 3)
+                    add("batches")
+                    add("rows", len(df))
+                    count("ingest_rows_indexed", len(df))
+                    frames.append(df)
+                    all_texts.extend(batch_texts)
+                    all_embeddings.append(embeddings)
+            except _Stopped:
+                pass
+            except BaseException:
+                self._stop.set()
+                raise
+            finally:
+                for thread in threads:
+                    thread.join()
+                if parse_pool is not None:
+                    parse_pool.shutdown(cancel_futures = True)
+
+        if self._errors:
+            if snapshot is not None:
+                snapshot.close(complete = False)
+            raise self._errors[0]
+
+        stats["searchable_seconds"] = round(time.perf_counter() - start, 3)
+        df = pd.concat(frames, ignore_index = True) if frames else pd.DataFrame()
+        if prune and self.index is not None and len(df):
+            if stats["fetch_failures"] or stats["parse_failures"]:
+                logger.warning("Some product pages failed; keeping racquets that were not seen in this crawl.")
+            else:
+                listed = {racquet_id(name, image) for name, image in df[["racquet_name", "racquet_img"]].values}
+                stats["pruned"] = self.index.delete([racquet for racquet in self.index.ids() if racquet not in listed])
+        if self.index is not None:
+            # Serve the finished catalog from one segment
+            self.index.compact()
+        if snapshot is not None:
+            snapshot.close()
+        log_event("ingest", **stats)
+        logger.info(f"Ingested {stats['rows']} racquets from {stats['pages_fetched']} product pages in "
+                    f"{stats['searchable_seconds']}s (first searchable after {stats.get('first_searchable_seconds')}s).")
+
+        embeddings = np.concatenate(all_embeddings) if all_embeddings else np.empty((0, 0), dtype = np.float32)
+        return IngestResult(df, all_texts, embeddings, stats)
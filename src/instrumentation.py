@@ -0,0 +1,465 @@
+import bisect
+import cProfile
+import json
+import logging
+import math
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import TYPE_CHECKING, Iterator
+
+from src.utils import setup_logger
+
+if TYPE_CHECKING:
+    import argparse
+
+logger = setup_logger(__name__)
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond query stages to minute-long crawls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROFILERS = ("cprofile", "tracemalloc")
+
+_events_enabled = False
+
+
+# Helper function to turn label kwargs into a hashable, ordered key
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((name, str(value).lower() if isinstance(value, bool) else str(value))
+                        for name, value in labels.items()))
+
+
+# Helper function to render a label key in Prometheus syntax, e.g. {stage="final_touch_ups"}
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    escaped = (name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for name, value in key)
+    return "{" + ",".join(escaped) + "}"
+
+
+# Helper function to name a label set in snapshots, e.g. "stage=final_touch_ups" ("" when unlabelled)
+def _snapshot_key(key: tuple) -> str:
+    return ",".join(f"{name}={value}" for name, value in key)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic count per label set, e.g. pages fetched or bytes downloaded."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def snapshot(self) -> dict:
+        return {_snapshot_key(key): value for _, key, value in self.samples()}
+
+
+class Gauge(Counter):
+    """Last value per label set, e.g. rows left after a preprocessing stage."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Bucketed distribution per label set, e.g. query encode latency in seconds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        samples = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip((*self.buckets, math.inf), series["counts"]):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, series["sum"]))
+                samples.append((f"{self.name}_count", key, series["count"]))
+        return samples
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Estimate a quantile from the buckets (the upper bound of the bucket it falls in).
+
+        Args:
+            q (float): Quantile in [0, 1].
+
+        Returns:
+            float | None: Estimated value, or None if nothing was observed.
+        """
+        series = self._series.get(_label_key(labels))
+        if not series or not series["count"]:
+            return None
+        rank, cumulative = q * series["count"], 0
+        for bound, count in zip((*self.buckets, math.inf), series["counts"]):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series = {key: dict(value) for key, value in self._series.items()}
+        return {
+            _snapshot_key(key): {
+                "count": value["count"],
+                "sum": round(value["sum"], 6),
+                "p50": self.quantile(0.5, **dict(key)),
+                "p99": self.quantile(0.99, **dict(key)),
+            }
+            for key, value in series.items()
+        }
+
+
+class Registry:
+    """Named metrics of one process. Metrics are created on first use."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, help, **kwargs)
+        if type(metric) is not cls:
+            raise ValueError(f"Metric '{name}' is already registered as a {metric.kind}.")
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets = buckets)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def snapshot(self) -> dict:
+        """All metrics as plain data, histograms summarized as count, sum, p50 and p99.
+
+        Returns:
+            dict: {metric name: {label string: value or summary}}.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {name: metric.snapshot() for name, metric in metrics}
+
+    def render_prometheus(self, gauges: dict[str, float] = None) -> str:
+        """Render every metric in the Prometheus text exposition format.
+
+        Args:
+            gauges (dict[str, float], optional): Extra unlabelled gauges computed at scrape time,
+                e.g. cache hit rates. Defaults to None.
+
+        Returns:
+            str: Exposition text, one "# TYPE" block per metric.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines += [f"{sample}{_format_labels(key)} {_format_value(value)}" for sample, key, value in metric.samples()]
+        for name, value in sorted((gauges or {}).items()):
+            lines += [f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def count(name: str, value: float = 1, **labels):
+    """Add to the counter <name>_total.
+
+    Args:
+        name (str): Metric name without the _total suffix.
+        value (float, optional): Amount to add. Defaults to 1.
+    """
+    REGISTRY.counter(f"{name}_total").inc(value, **labels)
+
+
+def set_gauge(name: str, value: float, **labels):
+    """Set the gauge <name>.
+
+    Args:
+        name (str): Metric name.
+        value (float): New value.
+    """
+    REGISTRY.gauge(name).set(value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    """Record a value in the histogram <name>.
+
+    Args:
+        name (str): Metric name, ending in the unit (e.g. _seconds).
+        value (float): Observed value.
+    """
+    REGISTRY.histogram(name).observe(value, **labels)
+
+
+def log_event(event: str, **fields):
+    """Emit a structured event when enable_json_logs() is on.
+
+    Args:
+        event (str): Event name, e.g. "preprocess_stage".
+        **fields: JSON-serializable fields to attach.
+    """
+    if _events_enabled:
+        logger.info(event, extra = {"event": event, "fields": fields})
+
+
+class timed:
+    """Time a block or function into the histogram <name>_seconds.
+
+    Use as `with timed("search_encode"):` or as a decorator `@timed("combine_text", builder = "v2")`.
+    Labels are attached to the histogram series. With log = True, a structured event carrying the
+    duration and labels is also logged when JSON logs are enabled.
+
+    Args:
+        name (str): Metric name without the _seconds suffix.
+        log (bool, optional): Also emit a structured log event. Defaults to False.
+        **labels: Histogram labels.
+    """
+
+    def __init__(self, name: str, log: bool = False, **labels):
+        self.name = name
+        self.log = log
+        self.labels = labels
+        self.seconds = None
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        observe(f"{self.name}_seconds", self.seconds, **self.labels)
+        if self.log:
+            log_event(self.name, seconds = round(self.seconds, 6), failed = exc_type is not None, **self.labels)
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.name, self.log, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class JSONFormatter(logging.Formatter):
+    """Format log records as one JSON object per line, including log_event() fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if hasattr(record, "event"):
+            payload["event"] = record.event
+            payload.update(record.fields)
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default = str)
+
+
+def enable_json_logs():
+    """Log every record as a JSON line and emit structured events from timed(..., log = True) blocks."""
+    global _events_enabled
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig()
+    for handler in root.handlers:
+        handler.setFormatter(JSONFormatter())
+    _events_enabled = True
+
+
+class Profiler:
+    """Opt-in cProfile or tracemalloc profiling of a whole run or a random sample of blocks.
+
+    cProfile only sees the thread that runs a sampled block, and one block is profiled at a time:
+    a block that starts while another is being profiled runs unprofiled. tracemalloc traces every
+    thread from start to close(), whatever the sample rate. close() writes the cProfile stats
+    (readable with pstats or snakeviz) or the top allocation sites to output and logs a summary.
+
+    Args:
+        kind (str): "cprofile" or "tracemalloc".
+        output (str, optional): Output file. Defaults to "profile.prof" or "tracemalloc.txt".
+        sample_rate (float, optional): Share of sample() blocks to profile with cProfile.
+            Defaults to 1.0.
+        top (int, optional): Functions or allocation sites to list. Defaults to 25.
+
+    Raises:
+        ValueError: If kind is unknown.
+    """
+
+    def __init__(self, kind: str, output: str = None, sample_rate: float = 1.0, top: int = 25):
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{kind}'. Choose from {list(PROFILERS)}.")
+        self.kind = kind
+        self.output = output or ("profile.prof" if kind == "cprofile" else "tracemalloc.txt")
+        self.sample_rate = sample_rate
+        self.top = top
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._profile = cProfile.Profile() if kind == "cprofile" else None
+        if kind == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+
+    @contextmanager
+    def sample(self) -> Iterator[None]:
+        """Profile the block if it is sampled and no other block is being profiled."""
+        if self._profile is None or random.random() >= self.sample_rate or not self._lock.acquire(blocking = False):
+            yield
+            return
+        try:
+            self._profile.enable()
+            try:
+                yield
+            finally:
+                self._profile.disable()
+                self.samples += 1
+        finally:
+            self._lock.release()
+
+    def close(self):
+        """Stop profiling, write the output file and log the top entries."""
+        if self._profile is not None:
+            with self._lock:
+                if not self.samples:
+                    logger.info("cProfile did not sample any blocks.")
+                    return
+                self._profile.dump_stats(self.output)
+                # Each stats row is (primitive calls, calls, own time, cumulative time, callers)
+                rows = sorted(pstats.Stats(self._profile).stats.items(), key = lambda item: -item[1][3])[:self.top]
+                top = [f"{func[2]} ({func[0]}:{func[1]}): {row[3]:.3f}s cumulative" for func, row in rows]
+            log_event("profile", profiler = "cprofile", samples = self.samples, output = self.output, top = top)
+            logger.info(f"Wrote cProfile stats for {self.samples} sampled blocks to {self.output}.")
+            return
+
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        top = [str(stat) for stat in snapshot.statistics("lineno")[:self.top]]
+        with open(self.output, "w", encoding = "utf-8") as f:
+            f.write(f"current {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB\n")
+            f.write("\n".join(top) + "\n")
+        log_event("profile", profiler = "tracemalloc", current_mb = round(current / 2**20, 1),
+                  peak_mb = round(peak / 2**20, 1), output = self.output, top = top)
+        logger.info(f"Traced peak {peak / 2**20:.1f} MB; wrote the top {len(top)} allocation sites to {self.output}.")
+
+
+@contextmanager
+def profiled(kind: str | None, output: str = None) -> Iterator[Profiler | None]:
+    """Profile a whole run with cProfile or tracemalloc, or do nothing when kind is None.
+
+    Args:
+        kind (str | None): "cprofile", "tracemalloc" or None.
+        output (str, optional): Output file, see Profiler. Defaults to None.
+
+    Yields:
+        Profiler | None: The profiler, if any.
+    """
+    if kind is None:
+        yield None
+        return
+    profiler = Profiler(kind, output)
+    try:
+        with profiler.sample():
+            yield profiler
+    finally:
+        profiler.close()
+
+
+def add_cli_args(parser: "argparse.ArgumentParser", sampling: bool = False):
+    """Add --log-json, --profile and --profile-output (and --profile-sample-rate) to a CLI.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend.
+        sampling (bool, optional): Also add --profile-sample-rate, for long-running servers.
+            Defaults to False.
+    """
+    parser.add_argument("--log-json", action = "store_true",
+                        help = "Log JSON lines, with a structured event per pipeline stage.")
+    parser.add_argument("--profile", choices = PROFILERS, default = None,
+                        help = "Profile this run with cProfile or tracemalloc.")
+    parser.add_argument("--profile-output", default = None,
+                        help = "Profile output file. Defaults to profile.prof or tracemalloc.txt.")
+    if sampling:
+        parser.add_argument("--profile-sample-rate", type = float, default = 0.01,
+                            help = "Share of requests profiled by --profile cprofile.")
+
+
+@contextmanager
+def cli_run(args: "argparse.Namespace") -> Iterator[None]:
+    """Apply the add_cli_args() flags around a script's work and log the metrics when it ends.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments.
+    """
+    if args.log_json:
+        enable_json_logs()
+    try:
+        with profiled(args.profile, args.profile_output):
+            yield
+    finally:
+        log_event("metrics", metrics = REGISTRY.snapshot())
@@ -0,0 +1,277 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from src.search.dense import normalize_rows, top_k, unit_vector
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Rows scored per matrix product while assigning vectors to lists, to bound temporary memory
+_ASSIGN_CHUNK = 16_384
+
+
+# Helper function to assign each row to its most similar centroid in fixed-size chunks
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(matrix), dtype = np.int64)
+    for start in range(0, len(matrix), _ASSIGN_CHUNK):
+        labels[start:start + _ASSIGN_CHUNK] = np.argmax(matrix[start:start + _ASSIGN_CHUNK] @ centroids.T, axis = 1)
+    return labels
+
+
+def spherical_kmeans(matrix: np.ndarray, n_clusters: int, n_iter: int = 10, sample_size: int = None,
+                     seed: int = 0) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity (Lloyd's algorithm on a random sample).
+
+    Args:
+        matrix (np.ndarray): (n, dim) row-normalized vectors.
+        n_clusters (int): Number of centroids.
+        n_iter (int, optional): Lloyd iterations. Defaults to 10.
+        sample_size (int, optional): Rows to train on. Defaults to 64 per cluster.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        np.ndarray: (n_clusters, dim) unit-length float32 centroids.
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(matrix), sample_size or 64 * n_clusters)
+    sample = np.asarray(matrix[np.sort(rng.choice(len(matrix), sample_size, replace = False))], dtype = np.float32)
+    centroids = sample[rng.choice(sample_size, n_clusters, replace = False)].copy()
+
+    for _ in range(n_iter):
+        labels = _assign(sample, centroids)
+        counts = np.bincount(labels, minlength = n_clusters)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        filled = counts > 0
+        # Sum each cluster's rows as one contiguous block of the label-sorted sample
+        sums = np.empty_like(centroids)
+        sums[filled] = np.add.reduceat(sample[np.argsort(labels, kind = "stable")], starts[filled])
+        # Re-seed empty clusters with random sample rows
+        sums[~filled] = sample[rng.choice(sample_size, int((~filled).sum()), replace = False)]
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class IVFIndex:
+    """Approximate cosine search with an inverted-file (IVF) index.
+
+    Vectors are clustered with spherical k-means and stored grouped by cluster, so each inverted
+    list is one contiguous block of rows. A query scores the centroids, then only the rows of the
+    nprobe closest lists. More lists probed means higher recall and slower queries.
+    """
+
+    def __init__(self, centroids: np.ndarray, vectors: np.ndarray, ids: np.ndarray, offsets: np.ndarray,
+                 nprobe: int = 8, fingerprint: str = ""):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.offsets = offsets
+        self.nprobe = nprobe
+        self.fingerprint = fingerprint
+        # ids is a permutation; its inverse maps an original row id to its stored position
+        self._positions = np.empty_like(ids)
+        self._positions[ids] = np.arange(len(ids))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, nlist: int = None, nprobe: int = 8, n_iter: int = 10,
+              seed: int = 0) -> "IVFIndex":
+        """Cluster the embeddings and lay them out by inverted list.
+
+        Args:
+            embeddings (np.ndarray): (n, dim) embeddings.
+            nlist (int, optional): Number of inverted lists. Defaults to about sqrt(n).
+            nprobe (int, optional): Lists scored per query. Defaults to 8.
+            n_iter (int, optional): k-means iterations. Defaults to 10.
+            seed (int, optional): Random seed. Defaults to 0.
+
+        Returns:
+            IVFIndex: The index.
+        """
+        matrix = normalize_rows(embeddings)
+        nlist = min(len(matrix), nlist or max(1, int(np.sqrt(len(matrix)))))
+        centroids = spherical_kmeans(matrix, nlist, n_iter = n_iter, seed = seed)
+
+        return cls.from_centroids(matrix, centroids, nprobe)
+
+    @classmethod
+    def from_centroids(cls, matrix: np.ndarray, centroids: np.ndarray, nprobe: int = 8) -> "IVFIndex":
+        """Lay out vectors by their nearest of already trained centroids, without k-means.
+
+        Args:
+            matrix (np.ndarray): (n, dim) row-normalized vectors.
+            centroids (np.ndarray): (nlist, dim) unit-length centroids, e.g. of an earlier index.
+            nprobe (int, optional): Lists scored per query. Defaults to 8.
+
+        Returns:
+            IVFIndex: The index.
+        """
+        labels = _assign(matrix, centroids)
+        ids = np.argsort(labels, kind = "stable")
+        offsets = np.zeros(len(centroids) + 1, dtype = np.int64)
+        np.cumsum(np.bincount(labels, minlength = len(centroids)), out = offsets[1:])
+
+        return cls(centroids, matrix[ids], ids, offsets, nprobe)
+
+    def reconstruct(self, ids: np.ndarray) -> np.ndarray:
+        """Stored vectors of rows in the original embedding order.
+
+        Args:
+            ids (np.ndarray): Row ids.
+
+        Returns:
+            np.ndarray: (len(ids), dim) normalized vectors.
+        """
+        return self.vectors[self._positions[ids]]
+
+    def search(self, query_vector: np.ndarray, k: int = 10, candidates: np.ndarray = None,
+               nprobe: int = None) -> tuple[np.ndarray, np.ndarray]:
+        """Find approximately the k rows most similar to the query.
+
+        Args:
+            query_vector (np.ndarray): (dim,) query embedding.
+            k (int, optional): Number of results. Defaults to 10.
+            candidates (np.ndarray, optional): Row ids to restrict the search to. These are scored
+                exactly, since a filtered candidate set is usually small. Defaults to None.
+            nprobe (int, optional): Lists to probe for this query. Defaults to self.nprobe.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row ids (in the original embedding order) and their
+            similarities, best first.
+        """
+        query = unit_vector(query_vector)
+        if candidates is not None:
+            scores = self.reconstruct(candidates) @ query
+            best = top_k(scores, k)
+            return candidates[best], scores[best]
+
+        probe = top_k(self.centroids @ query, nprobe or self.nprobe)
+        blocks = [(self.offsets[i], self.offsets[i + 1]) for i in probe]
+        scores = np.concatenate([self.vectors[start:end] @ query for start, end in blocks])
+        positions = np.concatenate([np.arange(start, end) for start, end in blocks])
+        best = top_k(scores, k)
+
+        return self.ids[positions[best]], scores[best]
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 10, candidates: np.ndarray = None,
+                     nprobe: int = None) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Run search() for each query. Queries probe different lists, so there is no shared product.
+
+        Args:
+            query_vectors (np.ndarray): (m, dim) query embeddings.
+            k (int, optional): Number of results per query. Defaults to 10.
+            candidates (np.ndarray, optional): Row ids to restrict every query to. Defaults to None.
+            nprobe (int, optional): Lists to probe per query. Defaults to self.nprobe.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Per query, row ids and similarities, best first.
+        """
+        return [self.search(query_vector, k, candidates, nprobe) for query_vector in query_vectors]
+
+    def save(self, index_dir: str):
+        """Write the index as .npy arrays plus a JSON header that load() can memory-map.
+
+        The files are written to a temporary directory next to index_dir, which then replaces it. A
+        process that memory-mapped the previous index keeps reading its (now unlinked) files intact.
+
+        Args:
+            index_dir (str): Output directory. Replaced if it exists.
+        """
+        index_dir = index_dir.rstrip(os.sep)
+        parent, name = os.path.split(index_dir)
+        os.makedirs(parent or ".", exist_ok = True)
+        build_dir = tempfile.mkdtemp(prefix = f"{name}.build-", dir = parent or ".")
+
+        try:
+            for array_name in ("centroids", "vectors", "ids", "offsets"):
+                np.save(os.path.join(build_dir, f"{array_name}.npy"), np.ascontiguousarray(getattr(self, array_name)))
+            with open(os.path.join(build_dir, "ivf.json"), "w", encoding = "utf-8") as f:
+                json.dump({
+                    "nlist": self.nlist,
+                    "nprobe": self.nprobe,
+                    "dim": self.dim,
+                    "size": len(self),
+                    "fingerprint": self.fingerprint,
+                }, f)
+            _replace_dir(build_dir, index_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors = True)
+            raise
+
+    @classmethod
+    def load(cls, index_dir: str, mmap: bool = True, nprobe: int = None) -> "IVFIndex":
+        """Load an index written by save().
+
+        Args:
+            index_dir (str): Directory written by save().
+            mmap (bool, optional): Memory-map the vectors and ids read-only, so processes serving the
+                same index share one copy. Defaults to True.
+            nprobe (int, optional): Override the saved nprobe. Defaults to None.
+
+        Returns:
+            IVFIndex: The index.
+        """
+        with open(os.path.join(index_dir, "ivf.json"), "r", encoding = "utf-8") as f:
+            header = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode = "r" if mmap and name in ("vectors", "ids") else None)
+            for name in ("centroids", "vectors", "ids", "offsets")
+        }
+
+        return cls(**arrays, nprobe = nprobe or header["nprobe"], fingerprint = header.get("fingerprint", ""))
+
+
+# Helper function to move a finished directory into place. A non-empty directory cannot be renamed
+# over, so the previous one is moved aside first and deleted once the new one is in place.
+def _replace_dir(build_dir: str, index_dir: str):
+    parent, name = os.path.split(index_dir)
+    previous_dir = None
+    if os.path.lexists(index_dir):
+        previous_dir = tempfile.mkdtemp(prefix = f"{name}.old-", dir = parent or ".")
+        os.replace(index_dir, previous_dir)
+    os.replace(build_dir, index_dir)
+    if previous_dir is not None:
+        shutil.rmtree(previous_dir, ignore_errors = True)
+
+
+def load_or_build_ivf(embeddings: np.ndarray, index_dir: str, fingerprint: str, nlist: int = None,
+                      nprobe: int = 8) -> IVFIndex:
+    """Load the saved IVF index for these embeddings, rebuilding and saving it if they changed.
+
+    Args:
+        embeddings (np.ndarray): (n, dim) embeddings in row order.
+        index_dir (str): Directory of the saved index.
+        fingerprint (str): Identifies the embeddings, e.g. a hash of the model name and texts.
+        nlist (int, optional): Inverted lists for a rebuild. Defaults to about sqrt(n).
+        nprobe (int, optional): Lists scored per query. Defaults to 8.
+
+    Returns:
+        IVFIndex: Memory-mapped index for the embeddings.
+    """
+    try:
+        index = IVFIndex.load(index_dir, nprobe = nprobe)
+        if index.fingerprint == fingerprint and len(index) == len(embeddings):
+            return index
+    except (FileNotFoundError, OSError, KeyError, ValueError):
+        pass
+
+    logger.info(f"Building IVF index over {len(embeddings)} vectors.")
+    index = IVFIndex.build(embeddings, nlist = nlist, nprobe = nprobe)
+    index.fingerprint = fingerprint
+    index.save(index_dir)
+
+    return IVFIndex.load(index_dir, nprobe = nprobe)
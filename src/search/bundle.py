@@ -0,0 +1,350 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+import numpy as np
+
+from src.features.embedding_store import Encoder, LazyEncoder
+from src.search.ann import IVFIndex
+from src.search.dense import DenseIndex
+from src.search.filters import FILTER_FIELDS, FilterEngine
+from src.search.lexical import BM25Index, corpus_fingerprint
+from src.search.quantized import PRECISIONS, QuantizedIndex
+from src.search.service import INDEX_BACKENDS, RESULT_FIELDS, VARIANT_FIELDS, SearchService, ServingConfig, decode_variants
+from src.utils import setup_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+logger = setup_logger(__name__)
+
+# Bump when the bundle layout changes so old bundles are rejected instead of misread
+BUNDLE_VERSION = 1
+
+# Files in a bundle directory
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.arrow"
+BM25_DIR = "bm25"
+IVF_DIR = "ivf"
+QUANTIZED_DIR = "quantized"
+# Builds kept next to the bundle symlink: the live one and the one before it, which workers that
+# have not reloaded yet may still be reading
+KEEP_BUILDS = 2
+
+
+class ArrowRecords:
+    """Result records read row by row from the card columns of an Arrow table.
+
+    Converting a whole memory-mapped table to Python dicts at startup costs seconds for large
+    catalogs, so a record is only built when a query returns its row. VARIANT_FIELDS columns are
+    included when the table has them.
+    """
+
+    def __init__(self, table: "pa.Table"):
+        self.n_rows = table.num_rows
+        fields = {**RESULT_FIELDS, **{field: col for field, col in VARIANT_FIELDS.items() if col in table.column_names}}
+        self._columns = {field: table.column(column) for field, column in fields.items()}
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __getitem__(self, row: int) -> dict:
+        record = {field: column[int(row)].as_py() for field, column in self._columns.items()}
+        if "variants" in record:
+            record["variants"] = decode_variants(record["variants"])
+        return record
+
+    # Helper function to convert a column to Python values, parsing the JSON variants column
+    @staticmethod
+    def _pylist(field: str, column: "pa.ChunkedArray") -> list:
+        values = column.to_pylist()
+        return [decode_variants(value) for value in values] if field == "variants" else values
+
+    def column(self, field: str) -> list:
+        """All values of one RESULT_FIELDS (or VARIANT_FIELDS) field, converted in one pass.
+
+        Args:
+            field (str): Key of RESULT_FIELDS.
+
+        Returns:
+            list: Values in row order, nulls as None.
+        """
+        return self._pylist(field, self._columns[field])
+
+    def take(self, rows: np.ndarray) -> list[dict]:
+        """Records of many rows, built column by column instead of value by value.
+
+        Args:
+            rows (np.ndarray): Row ids.
+
+        Returns:
+            list[dict]: One record per row, in the order of rows.
+        """
+        columns = {field: self._pylist(field, column.take(rows)) for field, column in self._columns.items()}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+# Helper function to repoint the bundle symlink at a finished build. rename() over an existing symlink is
+# atomic, so readers resolve either the old build or the new one, never a missing or partial bundle
+def _publish(bundle_dir: str, build_dir: str):
+    link = f"{bundle_dir}.link-{os.getpid()}"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(build_dir), link)
+    os.replace(link, bundle_dir)
+
+
+# Helper function to delete all but the newest KEEP_BUILDS builds of a bundle
+def _prune_builds(bundle_dir: str):
+    parent, name = os.path.split(bundle_dir)
+    builds = sorted(
+        (entry for entry in os.scandir(parent or ".") if entry.name.startswith(f"{name}.build-") and entry.is_dir()),
+        key = lambda entry: entry.stat().st_mtime_ns,
+    )
+    live = os.path.realpath(bundle_dir)
+    for entry in builds[:-KEEP_BUILDS]:
+        if os.path.realpath(entry.path) != live:
+            shutil.rmtree(entry.path, ignore_errors = True)
+
+
+def build_bundle(df: "pd.DataFrame", texts: list[str], embeddings: np.ndarray, bundle_dir: str, model_name: str,
+                 template_version: str, index_backend: str = "exact", nlist: int = None, nprobe: int = 8) -> dict:
+    """Write everything the search service needs to start without the dataset or the model.
+
+    The bundle holds the normalized embedding matrix (embeddings.npy), the result and filter
+    columns (metadata.arrow, uncompressed Arrow IPC), the BM25 postings (bm25/), optionally an IVF
+    index (ivf/) or int8/float16 codes (quantized/), and manifest.json, all memory-mappable. Each build goes to its own
+    <bundle_dir>.build-<timestamp> directory and bundle_dir is an atomically swapped symlink to the
+    newest one, so running workers can reload it (see BundleWatcher) without a restart.
+
+    Args:
+        df (pd.DataFrame): Cleaned racquet data.
+        texts (list[str]): Combined text per row, as embedded and indexed by BM25.
+        embeddings (np.ndarray): (n, dim) embeddings of texts.
+        bundle_dir (str): Bundle path (a symlink). Repointed if it exists.
+        model_name (str): Embedding model name, used to embed queries at serving time.
+        template_version (str): Version of the text template that produced texts.
+        index_backend (str, optional): "exact", "ivf", "int8" or "float16". Defaults to "exact".
+        nlist (int, optional): IVF inverted lists. Defaults to about sqrt(n).
+        nprobe (int, optional): IVF lists scored per query. Defaults to 8.
+
+    Raises:
+        ValueError: If index_backend is unknown, df, texts and embeddings differ in length, or
+            bundle_dir exists but is not a bundle symlink.
+
+    Returns:
+        dict: The manifest.
+    """
+    from src.data.storage import save_dataset
+
+    if index_backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend '{index_backend}'. Choose from {list(INDEX_BACKENDS)}.")
+    if not len(df) == len(texts) == len(embeddings):
+        raise ValueError(f"Got {len(df)} racquets, {len(texts)} texts and {len(embeddings)} embeddings.")
+
+    bundle_dir = bundle_dir.rstrip(os.sep)
+    if os.path.lexists(bundle_dir) and not os.path.islink(bundle_dir):
+        raise ValueError(f"{bundle_dir} exists and is not a search bundle symlink; move it or pick another path.")
+
+    started = time.perf_counter()
+    fingerprint = corpus_fingerprint([model_name, template_version, *texts])
+    parent, name = os.path.split(bundle_dir)
+    build_dir = tempfile.mkdtemp(prefix = f"{name}.build-{time.strftime('%Y%m%dT%H%M%S')}-", dir = parent or ".")
+
+    try:
+        index = DenseIndex(embeddings)
+        index.save(os.path.join(build_dir, EMBEDDINGS_FILE))
+        columns = list(dict.fromkeys([*RESULT_FIELDS.values(), *(c for c in VARIANT_FIELDS.values() if c in df.columns),
+                                      *(c for c in FILTER_FIELDS.values() if c in df.columns)]))
+        save_dataset(df[columns].reset_index(drop = True), os.path.join(build_dir, METADATA_FILE))
+        BM25Index.build(texts).save(os.path.join(build_dir, BM25_DIR))
+        if index_backend == "ivf":
+            ivf = IVFIndex.build(index.matrix, nlist = nlist, nprobe = nprobe)
+            ivf.fingerprint = fingerprint
+            ivf.save(os.path.join(build_dir, IVF_DIR))
+        elif index_backend in PRECISIONS:
+            QuantizedIndex.build(index.matrix, index_backend, normalized = True).save(os.path.join(build_dir, QUANTIZED_DIR))
+
+        manifest = {
+            "version": BUNDLE_VERSION,
+            "model": model_name,
+            "template_version": template_version,
+            "index": index_backend,
+            "racquets": len(df),
+            "dim": index.dim,
+            "fingerprint": fingerprint,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        with open(os.path.join(build_dir, MANIFEST_FILE), "w", encoding = "utf-8") as f:
+            json.dump(manifest, f, indent = 2)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors = True)
+        raise
+
+    _publish(bundle_dir, build_dir)
+    _prune_builds(bundle_dir)
+    logger.info(f"Built a {index_backend} search bundle of {len(df)} racquets in {build_dir} "
+                f"({time.perf_counter() - started:.1f}s).")
+
+    return manifest
+
+
+def read_manifest(bundle_dir: str) -> dict:
+    """Read and check a bundle's manifest.
+
+    Args:
+        bundle_dir (str): Directory written by build_bundle().
+
+    Raises:
+        FileNotFoundError: If the directory has no manifest.
+        ValueError: If the bundle was written with a different layout version.
+
+    Returns:
+        dict: The manifest.
+    """
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), "r", encoding = "utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"Bundle {bundle_dir} has layout version {manifest.get('version')}, expected "
+                         f"{BUNDLE_VERSION}. Rebuild it with run_build_index.py.")
+    return manifest
+
+
+def bundle_version(bundle_dir: str) -> str:
+    """Identify the build a bundle path currently points at, to detect rebuilds.
+
+    Args:
+        bundle_dir (str): Bundle path written by build_bundle().
+
+    Returns:
+        str: The resolved build directory and its manifest's modification time.
+    """
+    build_dir = os.path.realpath(bundle_dir)
+    return f"{build_dir}@{os.stat(os.path.join(build_dir, MANIFEST_FILE)).st_mtime_ns}"
+
+
+def load_bundle_service(bundle_dir: str, encode: Encoder = None, nprobe: int = None, config: ServingConfig = None,
+                        warm_up: bool = True) -> SearchService:
+    """Start a SearchService from a prebuilt bundle.
+
+    Nothing is recomputed or copied: the embedding matrix, IVF lists, quantized codes, BM25
+    postings and the metadata (Arrow, read without pandas) are all memory-mapped read-only, so worker processes
+    serving the same bundle share one copy through the page cache. Unless an encoder is passed, the
+    embedding model is loaded lazily (see LazyEncoder), so the service is ready before
+    sentence-transformers has even been imported.
+
+    Args:
+        bundle_dir (str): Directory written by build_bundle().
+        encode (Encoder, optional): Query encoder. Defaults to a LazyEncoder for the bundle's model.
+        nprobe (int, optional): Override the IVF lists scored per query. Defaults to None.
+        config (ServingConfig, optional): Query caching and batching settings. Defaults to None.
+        warm_up (bool, optional): Start loading the lazy encoder's model on a background thread.
+            Defaults to True.
+
+    Returns:
+        SearchService: Service ready to answer queries.
+    """
+    import pyarrow as pa
+
+    started = time.perf_counter()
+    # Resolve the symlink once so every file comes from the same build, even if it is swapped mid-load
+    bundle_dir = os.path.realpath(bundle_dir)
+    manifest = read_manifest(bundle_dir)
+    if manifest["index"] == "ivf":
+        index = IVFIndex.load(os.path.join(bundle_dir, IVF_DIR), nprobe = nprobe)
+    elif manifest["index"] in PRECISIONS:
+        # Only the re-ranked shortlist is read from the float32 matrix, so the codes are the hot set
+        full = DenseIndex.load(os.path.join(bundle_dir, EMBEDDINGS_FILE), mmap = True).matrix
+        index = QuantizedIndex.load(os.path.join(bundle_dir, QUANTIZED_DIR), full = full)
+    else:
+        index = DenseIndex.load(os.path.join(bundle_dir, EMBEDDINGS_FILE), mmap = True)
+    lexical = BM25Index.load(os.path.join(bundle_dir, BM25_DIR), mmap = True)
+    table = pa.ipc.open_file(pa.memory_map(os.path.join(bundle_dir, METADATA_FILE))).read_all()
+
+    if encode is None:
+        encode = LazyEncoder(manifest["model"])
+        if warm_up:
+            encode.warm_up()
+
+    service = SearchService(ArrowRecords(table), FilterEngine.from_arrow(table), index, encode, lexical, config)
+    logger.info(f"Loaded {manifest['racquets']} racquets from bundle {bundle_dir} "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms.")
+
+    return service
+
+
+class BundleWatcher:
+    """Polls a bundle path and swaps in a new SearchService when the bundle is rebuilt.
+
+    The new service reuses the current encoder (and its query embedding cache) when the embedding
+    model is unchanged, so a swap does not reload the model. The old service is closed after
+    close_after seconds, once requests that already hold it have finished.
+    """
+
+    def __init__(self, bundle_dir: str, service: SearchService, on_swap: Callable[[SearchService], None],
+                 interval: float = 5.0, nprobe: int = None, config: ServingConfig = None, close_after: float = 30.0):
+        self.bundle_dir = bundle_dir
+        self.service = service
+        self.on_swap = on_swap
+        self.interval = interval
+        self.nprobe = nprobe
+        self.config = config
+        self.close_after = close_after
+        self.version = bundle_version(bundle_dir)
+        self.model = read_manifest(bundle_dir)["model"]
+        self.swaps = 0
+        self._stop = threading.Event()
+
+    def check(self) -> bool:
+        """Load and swap in the bundle if it changed since the last check.
+
+        Returns:
+            bool: Whether a new service was swapped in.
+        """
+        version = bundle_version(self.bundle_dir)
+        if version == self.version:
+            return False
+
+        model = read_manifest(self.bundle_dir)["model"]
+        same_model = model == self.model
+        service = load_bundle_service(
+            self.bundle_dir, encode = self.service.encode if same_model else None, nprobe = self.nprobe, config = self.config
+        )
+        if same_model:
+            service.query_cache = self.service.query_cache
+        old, self.service, self.version, self.model = self.service, service, version, model
+        self.on_swap(service)
+        self.swaps += 1
+        timer = threading.Timer(self.close_after, old.close)
+        timer.daemon = True
+        timer.start()
+        logger.info(f"Swapped in search bundle {version}.")
+
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except (OSError, ValueError, KeyError) as e:
+                # A half-pruned or unreadable build; keep serving the current one and retry next poll
+                logger.warning(f"Could not reload search bundle {self.bundle_dir}: {e}")
+
+    def start(self) -> threading.Thread:
+        """Start polling on a daemon thread.
+
+        Returns:
+            threading.Thread: The polling thread.
+        """
+        thread = threading.Thread(target = self._run, name = "bundle-watcher", daemon = True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
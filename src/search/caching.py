@@ -0,0 +1,192 @@
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Hashable
+
+import numpy as np
+
+from src.features.embedding_store import Encoder
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as a cache key.
+
+    Args:
+        query (str): Query text.
+
+    Returns:
+        str: Lowercased query with runs of whitespace collapsed.
+    """
+    return " ".join(query.lower().split())
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live cached value (marking it most recently used), or default.
+
+        Args:
+            key (Hashable): Cache key.
+            default (Any, optional): Returned on a miss. Defaults to None.
+
+        Returns:
+            Any: Cached value or default.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = _MISSING
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last = False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class MicroBatcher:
+    """Groups encode requests that arrive within max_wait_ms into one encoder call.
+
+    Callers submit single texts from any thread and get a Future for the embedding. A worker thread
+    takes the first waiting text, keeps collecting for up to max_wait_ms or max_batch_size texts,
+    then runs the encoder once on the whole batch.
+    """
+
+    def __init__(self, encode: Encoder, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        self._batch_sizes = deque(maxlen = 1000)
+        self._waits_ms = deque(maxlen = 1000)
+        self._worker = threading.Thread(target = self._run, name = "query-encoder", daemon = True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding.
+
+        Args:
+            text (str): Text to embed.
+
+        Returns:
+            Future: Resolves to the text's (dim,) embedding, or fails if the batcher is closed.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                future.set_exception(RuntimeError("The micro-batcher is closed."))
+            else:
+                self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout = remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: list[tuple[str, Future, float]]):
+        started = time.perf_counter()
+        try:
+            vectors = np.asarray(self.encode([text for text, _, _ in batch]), dtype = np.float32)
+            # A short or misshapen result would otherwise fail below, killing the worker with futures unresolved
+            if vectors.ndim != 2 or len(vectors) != len(batch):
+                raise ValueError(f"The encoder returned embeddings of shape {vectors.shape} for {len(batch)} texts.")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result(vectors[i])
+
+        with self._lock:
+            self.batches += 1
+            self.texts += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self._batch_sizes.append(len(batch))
+            self._waits_ms.extend((started - queued) * 1000 for _, _, queued in batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = np.array(self._waits_ms) if self._waits_ms else None
+            return {
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+                "recent_mean_batch_size": round(float(np.mean(self._batch_sizes)), 2) if self._batch_sizes else None,
+                "queue_wait_ms_p50": round(float(np.percentile(waits, 50)), 3) if waits is not None else None,
+                "queue_wait_ms_p99": round(float(np.percentile(waits, 99)), 3) if waits is not None else None,
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join(timeout = 1)
+        # Fail whatever the worker did not get to, so no caller waits on its future forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError("The micro-batcher was closed before encoding this text."))
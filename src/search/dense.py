@@ -0,0 +1,191 @@
+import time
+
+import numpy as np
+
+from src.instrumentation import observe
+
+# Upper bound on the (queries x rows) score block held at once by DenseIndex.search_batch
+BATCH_SCORES_BYTES = 256 * 2**20
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row into a new C-contiguous float32 matrix (zero rows stay zero).
+
+    Args:
+        matrix (np.ndarray): (n, dim) embeddings.
+
+    Returns:
+        np.ndarray: Row-normalized float32 copy, so a dot product with a unit query is cosine similarity.
+    """
+    normalized = np.array(matrix, dtype = np.float32, order = "C", copy = True, ndmin = 2)
+    norms = np.linalg.norm(normalized, axis = 1, keepdims = True)
+    norms[norms == 0] = 1.0
+    normalized /= norms
+
+    return normalized
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without sorting the whole array.
+
+    Args:
+        scores (np.ndarray): 1-d scores.
+        k (int): Number of indices to return (clipped to len(scores)).
+
+    Returns:
+        np.ndarray: Up to k indices ordered by descending score.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype = np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+
+    return candidates[np.argsort(-scores[candidates], kind = "stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Per-row top_k() of a 2-d score matrix.
+
+    Args:
+        scores (np.ndarray): (m, n) scores.
+        k (int): Number of indices per row (clipped to n).
+
+    Returns:
+        np.ndarray: (m, min(k, n)) column indices, each row ordered by descending score.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((len(scores), 0), dtype = np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(scores, -k, axis = 1)[:, -k:]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis = 1), axis = 1, kind = "stable")
+
+    return np.take_along_axis(candidates, order, axis = 1)
+
+
+def unit_vector(query_vector: np.ndarray) -> np.ndarray:
+    """Flatten a query embedding to float32 and scale it to unit length (a zero vector stays zero).
+
+    Args:
+        query_vector (np.ndarray): Query embedding.
+
+    Returns:
+        np.ndarray: (dim,) unit-length float32 vector.
+    """
+    query = np.asarray(query_vector, dtype = np.float32).reshape(-1)
+    norm = np.linalg.norm(query)
+
+    return query / norm if norm else query
+
+
+class DenseIndex:
+    """Exact cosine-similarity index over a contiguous normalized embedding matrix."""
+
+    def __init__(self, embeddings: np.ndarray, normalized: bool = False):
+        # Already-normalized matrices (e.g. memory-mapped from save()) are used as is, without a copy
+        self.matrix = embeddings if normalized else normalize_rows(embeddings)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def scores(self, query_vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against every row (one matrix-vector product).
+
+        Args:
+            query_vector (np.ndarray): (dim,) query embedding.
+
+        Returns:
+            np.ndarray: (n,) float32 similarities.
+        """
+        return self.matrix @ unit_vector(query_vector)
+
+    def save(self, path: str):
+        """Write the normalized matrix to a .npy file that load() can memory-map.
+
+        Args:
+            path (str): Output path ending in .npy.
+        """
+        np.save(path, np.ascontiguousarray(self.matrix))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "DenseIndex":
+        """Load an index written by save().
+
+        Args:
+            path (str): Path to the .npy file.
+            mmap (bool, optional): Memory-map the matrix read-only instead of reading it into memory.
+                Defaults to True.
+
+        Returns:
+            DenseIndex: The index.
+        """
+        return cls(np.load(path, mmap_mode = "r" if mmap else None), normalized = True)
+
+    def search(self, query_vector: np.ndarray, k: int = 10,
+               candidates: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """Find the k rows most similar to the query.
+
+        Args:
+            query_vector (np.ndarray): (dim,) query embedding.
+            k (int, optional): Number of results. Defaults to 10.
+            candidates (np.ndarray, optional): Row ids to restrict the search to, e.g. rows that pass a
+                spec filter. Only these rows are scored. Defaults to None (all rows).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row indices and their similarities, best first.
+        """
+        start = time.perf_counter()
+        if candidates is None:
+            scores = self.scores(query_vector)
+        # Gathering rows costs about as much as scoring them, so wide filters score everything instead
+        elif len(candidates) * 2 > len(self):
+            scores = self.scores(query_vector)[candidates]
+        else:
+            scores = self.matrix[candidates] @ unit_vector(query_vector)
+        scored = time.perf_counter()
+        best = top_k(scores, k)
+        observe("search_score_seconds", scored - start)
+        observe("search_topk_seconds", time.perf_counter() - scored)
+
+        return (best if candidates is None else candidates[best]), scores[best]
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 10, candidates: np.ndarray = None,
+                     max_scores_bytes: int = BATCH_SCORES_BYTES) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Find the k most similar rows for many queries with matrix-matrix products.
+
+        Queries are scored in chunks (Q_chunk @ E.T) sized so one chunk's score block stays under
+        max_scores_bytes, and each chunk is reduced to its per-row top k before the next.
+
+        Args:
+            query_vectors (np.ndarray): (m, dim) query embeddings.
+            k (int, optional): Number of results per query. Defaults to 10.
+            candidates (np.ndarray, optional): Row ids to restrict every query to. Defaults to None.
+            max_scores_bytes (int, optional): Memory budget for one chunk of scores. Defaults to
+                BATCH_SCORES_BYTES.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Per query, row indices and similarities, best first.
+        """
+        queries = normalize_rows(query_vectors)
+        matrix = self.matrix if candidates is None else self.matrix[candidates]
+        chunk_size = max(1, max_scores_bytes // (4 * max(1, len(matrix))))
+
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            scores = queries[start:start + chunk_size] @ matrix.T
+            best = top_k_rows(scores, k)
+            best_scores = np.take_along_axis(scores, best, axis = 1)
+            ids = best if candidates is None else candidates[best]
+            results += list(zip(ids, best_scores))
+
+        return results
+
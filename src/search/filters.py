@@ -0,0 +1,293 @@
+import operator
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.data.specs import BALANCE_SIGNS
+
+# pandas and pyarrow are only needed by callers that build engines from their tables, so the search
+# service can start without importing them
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+# Filter field name (API params, parsed queries) -> cleaned dataset column
+FILTER_FIELDS = {
+    "price": "racquet_price",
+    "head_size": "racquet_head_size_sq_in",
+    "balance": "racquet_balance_HH_HL",
+    "weight": "racquet_strung_weight_oz",
+    "stiffness": "racquet_stiffness",
+    "swingweight": "racquet_swingweight",
+    "mains": "racquet_mains",
+    "crosses": "racquet_crosses",
+}
+
+_OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+}
+
+
+@dataclass(frozen = True)
+class Constraint:
+    """A numeric spec constraint such as price <= 200.
+
+    Attributes:
+        field (str): Key of FILTER_FIELDS.
+        op (str): One of "<", "<=", ">", ">=", "==".
+        value (float): Right-hand side.
+    """
+    field: str
+    op: str
+    value: float
+
+    def __post_init__(self):
+        if self.field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field '{self.field}'. Choose from {list(FILTER_FIELDS)}.")
+        if self.op not in _OPS:
+            raise ValueError(f"Unknown filter operator '{self.op}'. Choose from {list(_OPS)}.")
+
+    def __str__(self) -> str:
+        return f"{self.field} {self.op} {self.value:g}"
+
+
+# Query phrase patterns. Comparator words map to an operator; units pick the field.
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_UPPER = r"(?:under|below|less than|cheaper than|at most|max(?:imum)?|up to|<=?)"
+_LOWER = r"(?:over|above|more than|at least|min(?:imum)?|>=?)"
+_CURRENCY = r"(?:dollars?|usd|bucks)\b"
+_UNITS = [
+    ("price", rf"(?:\$\s*{{n}}|{{n}}\s*(?:\$|{_CURRENCY}))"),
+    ("head_size", r"{n}\s*(?:sq\.?\s*in(?:ches)?|square\s*inch(?:es)?|in²|in2)(?:\s*head(?:\s*size)?)?"),
+    ("weight", r"{n}\s*(?:oz|ounces?)(?:\s*strung)?(?:\s*weight)?"),
+    ("swingweight", r"{n}\s*(?:swing\s*weight|swingweight|sw)\b"),
+    ("stiffness", r"{n}\s*(?:stiffness|ra)\b"),
+]
+# Spec names that can come before the comparator and number ("swingweight under 320")
+_KEYWORDS = [
+    ("swingweight", r"swing\s*weight|swingweight|sw"),
+    ("stiffness", r"stiffness|ra"),
+    ("head_size", r"head\s*size"),
+    ("weight", r"(?:strung\s*)?weight"),
+    ("price", r"price|cost"),
+]
+# Counted nouns after a bare comparator and number ("at least 4 stars") mean it is not a price
+_NOT_PRICE = (r"sq|square|in|oz|ounce|sw|swing|ra|stiff|x\b|by\b|stars?\b|racquets?\b|rackets?\b|frames?\b|reviews?\b"
+              r"|ratings?\b|points?\b|pts\b|g\b|grams?\b|mm\b|cm\b|%|percent\b|lbs?\b|pounds?\b|years?\b")
+_BARE_PRICE = re.compile(rf"\b(?:{_UPPER}|{_LOWER})\s*{_NUMBER}\b(?!\s*(?:{_NOT_PRICE}))", re.I)
+_BETWEEN_PRICE = re.compile(
+    rf"(?:between\s*)?\$\s*{_NUMBER}\s*(?:-|to|and)\s*\$?\s*{_NUMBER}(?!\s*(?:sq|oz))"
+    rf"|between\s*{_NUMBER}\s*(?:and|-|to)\s*{_NUMBER}\s*(?:dollars?|usd)",
+    re.I,
+)
+_PATTERN = re.compile(r"\b(16|18)\s*(?:x|by)\s*(\d{2})\b", re.I)
+# Balance phrases compare against 0 on the side preprocessing stores that label's points on
+_SIGN_OPS = {1.0: ">", -1.0: "<", 0.0: "=="}
+_BALANCE = {
+    re.compile(r"\bhead[\s-]*light\b", re.I): Constraint("balance", _SIGN_OPS[BALANCE_SIGNS["HL"]], 0),
+    re.compile(r"\bhead[\s-]*heavy\b", re.I): Constraint("balance", _SIGN_OPS[BALANCE_SIGNS["HH"]], 0),
+    re.compile(r"\b(?:evenly|equally|even)[\s-]*balanced\b", re.I): Constraint("balance", _SIGN_OPS[BALANCE_SIGNS["EB"]], 0),
+}
+_COMPARATORS = (("<=", _UPPER), (">=", _LOWER))
+
+# A price keyword phrase also takes a trailing currency word ("price under 200 dollars")
+_KEYWORD_PATTERNS = [
+    (field, op, re.compile(rf"\b(?:{keyword})\s*(?:is\s*|of\s*)?{comparator}\s*\$?\s*{_NUMBER}"
+                           + (rf"(?:\s*{_CURRENCY})?" if field == "price" else ""), re.I))
+    for field, keyword in _KEYWORDS
+    for op, comparator in _COMPARATORS
+] + [
+    (field, "==", re.compile(rf"\b(?:{keyword})\s*(?:of\s*)?{_NUMBER}", re.I))
+    for field, keyword in _KEYWORDS
+    if field in ("swingweight", "stiffness")
+]
+_UNIT_PATTERNS = [
+    (field, op, re.compile(rf"{comparator}\s*(?:{pattern.format(n = _NUMBER)})", re.I))
+    for field, pattern in _UNITS
+    for op, comparator in _COMPARATORS
+] + [
+    (field, "==", re.compile(pattern.format(n = _NUMBER), re.I))
+    for field, pattern in _UNITS
+]
+
+
+def _first_number(match: re.Match) -> float:
+    return float(next(group for group in match.groups() if group is not None))
+
+
+def parse_query_filters(query: str) -> tuple[list[Constraint], str]:
+    """Pull numeric spec constraints out of a natural language query.
+
+    Understands phrases like "under $200", "between $150 and $250", "over 11 oz", "98 sq in",
+    "swingweight under 320", "stiffness below 65", "16x19" and "head light"/"head heavy". A bare
+    "under 200" is read as a price unless a counted noun follows it ("at least 4 stars"). Matched phrases are removed from the returned query text.
+
+    Args:
+        query (str): User query.
+
+    Returns:
+        tuple[list[Constraint], str]: Parsed constraints and the query with the matched phrases removed.
+    """
+    text = query
+    constraints = []
+
+    def consume(match: re.Match):
+        nonlocal text
+        text = text[:match.start()] + " " + text[match.end():]
+
+    for pattern, constraint in _BALANCE.items():
+        if match := pattern.search(text):
+            constraints.append(constraint)
+            consume(match)
+
+    if match := _PATTERN.search(text):
+        constraints += [Constraint("mains", "==", float(match.group(1))), Constraint("crosses", "==", float(match.group(2)))]
+        consume(match)
+
+    if match := _BETWEEN_PRICE.search(text):
+        low, high = sorted(float(group) for group in match.groups() if group is not None)
+        constraints += [Constraint("price", ">=", low), Constraint("price", "<=", high)]
+        consume(match)
+
+    # Phrases with a comparator go first so "under $200" is not also read as "== $200"
+    for field, op, pattern in _KEYWORD_PATTERNS + _UNIT_PATTERNS:
+        while match := pattern.search(text):
+            constraints.append(Constraint(field, op, _first_number(match)))
+            consume(match)
+
+    while match := _BARE_PRICE.search(text):
+        op = "<=" if re.match(_UPPER, match.group(0), re.I) else ">="
+        constraints.append(Constraint("price", op, float(match.group(1))))
+        consume(match)
+
+    # Tidy the separators left behind by removed phrases
+    text = re.sub(r"\s+([,.;!?])", r"\1", " ".join(text.split()))
+    text = re.sub(r"([,;])(?:\s*[,;])+", r"\1", text)
+
+    return constraints, text.strip(" ,;")
+
+
+def constraints_from_params(params: dict) -> list[Constraint]:
+    """Build constraints from min_<field>/max_<field> request parameters (e.g. max_price=200).
+
+    Args:
+        params (dict): Parameter name -> value.
+
+    Raises:
+        ValueError: If a value is not a number.
+
+    Returns:
+        list[Constraint]: Constraints for the recognized parameters.
+    """
+    constraints = []
+    for field in FILTER_FIELDS:
+        for prefix, op in (("min", ">="), ("max", "<=")):
+            value = params.get(f"{prefix}_{field}")
+            if value is None:
+                continue
+            try:
+                constraints.append(Constraint(field, op, float(value)))
+            except ValueError:
+                raise ValueError(f"'{prefix}_{field}' must be a number.") from None
+
+    return constraints
+
+
+# Helper function to view a numeric Arrow column as float64 without pyarrow's to_numpy(), which imports
+# pandas. Single-chunk float64 columns whose null slots already hold NaN (as pandas writes them) are
+# returned zero-copy, so columns in a memory-mapped file stay shared between processes.
+def _arrow_float64(column: "pa.ChunkedArray") -> np.ndarray:
+    import pyarrow as pa
+
+    array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    if array.type != pa.float64():
+        array = array.cast(pa.float64())
+    values = np.frombuffer(array.buffers()[1], dtype = np.float64, count = array.offset + len(array))[array.offset:]
+    if array.null_count:
+        validity = np.unpackbits(np.frombuffer(array.buffers()[0], dtype = np.uint8), bitorder = "little")
+        valid = validity[array.offset:array.offset + len(array)].astype(bool)
+        if not np.isnan(values[~valid]).all():
+            values = np.where(valid, values, np.nan)
+    return values
+
+
+class FilterEngine:
+    """Evaluates constraints as vectorized boolean masks over contiguous float column arrays."""
+
+    def __init__(self, columns: dict[str, np.ndarray], n_rows: int):
+        self.n_rows = n_rows
+        self.columns = {field: np.ascontiguousarray(values, dtype = np.float64) for field, values in columns.items()}
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame") -> "FilterEngine":
+        """Take the FILTER_FIELDS columns of a pandas DataFrame.
+
+        Args:
+            df (pd.DataFrame): Cleaned racquet data.
+
+        Returns:
+            FilterEngine: Engine over the columns present in df.
+        """
+        columns = {
+            field: df[column].to_numpy(dtype = np.float64, na_value = np.nan)
+            for field, column in FILTER_FIELDS.items()
+            if column in df.columns
+        }
+        return cls(columns, len(df))
+
+    @classmethod
+    def from_arrow(cls, table: "pa.Table") -> "FilterEngine":
+        """Take the FILTER_FIELDS columns of a pyarrow Table, without going through pandas.
+
+        Args:
+            table (pa.Table): Racquet metadata, e.g. from a search bundle.
+
+        Returns:
+            FilterEngine: Engine over the columns present in table. Nulls become NaN.
+        """
+        columns = {
+            field: _arrow_float64(table.column(column))
+            for field, column in FILTER_FIELDS.items()
+            if column in table.column_names
+        }
+        return cls(columns, table.num_rows)
+
+    def mask(self, constraints: list[Constraint]) -> np.ndarray:
+        """Rows meeting every constraint. Missing values never match.
+
+        Args:
+            constraints (list[Constraint]): Constraints to AND together.
+
+        Raises:
+            ValueError: If a constraint's column is not in the dataset.
+
+        Returns:
+            np.ndarray: (n_rows,) boolean mask.
+        """
+        mask = np.ones(self.n_rows, dtype = bool)
+        for constraint in constraints:
+            if constraint.field not in self.columns:
+                raise ValueError(f"The dataset has no '{FILTER_FIELDS[constraint.field]}' column.")
+            # NaN compares False under every operator, so missing specs drop out here
+            mask &= _OPS[constraint.op](self.columns[constraint.field], constraint.value)
+
+        return mask
+
+    def candidates(self, constraints: list[Constraint]) -> np.ndarray | None:
+        """Row ids meeting every constraint, or None when there are no constraints (all rows).
+
+        Args:
+            constraints (list[Constraint]): Constraints to AND together.
+
+        Returns:
+            np.ndarray | None: Sorted row ids, or None for "no filtering".
+        """
+        if not constraints:
+            return None
+        return np.flatnonzero(self.mask(constraints))
@@ -0,0 +1,63 @@
+from typing import Sequence
+
+import numpy as np
+
+from src.search.dense import top_k
+
+# Rank constant from Cormack et al. (2009); larger values flatten the gap between top ranks
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], k: int = 10, weights: Sequence[float] = None,
+                           rrf_k: int = RRF_K) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse ranked id lists by summing weight / (rrf_k + rank) per id.
+
+    Args:
+        rankings (Sequence[np.ndarray]): Document ids from each retriever, best first.
+        k (int, optional): Number of fused results. Defaults to 10.
+        weights (Sequence[float], optional): Per-retriever weights. Defaults to 1 each.
+        rrf_k (int, optional): Rank constant. Defaults to RRF_K.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Fused ids and RRF scores, best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking.tolist(), start = 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (rrf_k + rank)
+
+    return _top_fused(fused, k)
+
+
+def weighted_score_fusion(results: Sequence[tuple[np.ndarray, np.ndarray]], k: int = 10,
+                          weights: Sequence[float] = None) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse retriever results by a weighted sum of min-max normalized scores.
+
+    Args:
+        results (Sequence[tuple[np.ndarray, np.ndarray]]): (ids, scores) from each retriever.
+        k (int, optional): Number of fused results. Defaults to 10.
+        weights (Sequence[float], optional): Per-retriever weights. Defaults to 1 each.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Fused ids and combined scores, best first.
+    """
+    weights = weights or [1.0] * len(results)
+    fused = {}
+    for (ids, scores), weight in zip(results, weights):
+        if not len(ids):
+            continue
+        low, high = float(scores.min()), float(scores.max())
+        normalized = (scores - low) / (high - low) if high > low else np.ones(len(scores))
+        for doc_id, score in zip(ids.tolist(), normalized.tolist()):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight * score
+
+    return _top_fused(fused, k)
+
+
+def _top_fused(fused: dict, k: int) -> tuple[np.ndarray, np.ndarray]:
+    ids = np.fromiter(fused.keys(), dtype = np.int64, count = len(fused))
+    scores = np.fromiter(fused.values(), dtype = np.float64, count = len(fused))
+    best = top_k(scores, k)
+
+    return ids[best], scores[best]
@@ -0,0 +1,596 @@
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+import numpy as np
+
+from src.instrumentation import count, log_event, observe, set_gauge, timed
+from src.search.ann import IVFIndex
+from src.search.caching import normalize_query
+from src.search.dense import DenseIndex, normalize_rows, top_k
+from src.search.filters import FilterEngine
+from src.search.lexical import BM25Index, tokenize
+from src.search.quantized import QuantizedIndex, quantize_int8
+from src.search.service import SearchService, Snapshot, result_records
+from src.utils import setup_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = setup_logger(__name__)
+
+# Delta rows plus tombstones at which a background compaction folds them into the base segment
+COMPACT_ROWS = 5_000
+
+# Unfiltered searches ask each segment for k plus at most this many multiples of k rows to make up for
+# tombstones, and re-run at the full k + len(deleted) depth only when a segment comes up short
+_TOMBSTONE_DEPTH = 4
+
+# Tennis Warehouse product code in an image URL (".../rs.php?path=BABOAP-1.jpg&nw=455"); the same code
+# identifies the product page
+_PRODUCT_CODE = re.compile(r"[?&]path=([A-Za-z0-9]+)-\d+\.\w+")
+
+
+def racquet_id(name: str, image: str = None) -> str:
+    """Stable ID of a racquet across catalog refreshes.
+
+    Names are not unique (the same model is listed at different prices), so the product code in
+    the image URL is used when there is one, and the normalized name otherwise.
+
+    Args:
+        name (str): racquet_name.
+        image (str, optional): racquet_img URL. Defaults to None.
+
+    Returns:
+        str: e.g. "BABOAP", or "babolat boost aero pink" without a product code.
+    """
+    match = _PRODUCT_CODE.search(image or "")
+    return match.group(1) if match else normalize_query(name or "")
+
+
+def racquet_ids(records: Sequence[dict]) -> list[str]:
+    """IDs of result records, such as SearchService.records.
+
+    Args:
+        records (Sequence[dict]): Records with RESULT_FIELDS keys, or ArrowRecords.
+
+    Returns:
+        list[str]: racquet_id() per record, in order.
+    """
+    if hasattr(records, "column"):
+        # ArrowRecords: two column conversions instead of a dict per row
+        return [racquet_id(name, image) for name, image in zip(records.column("name"), records.column("image"))]
+    return [racquet_id(record["name"], record["image"]) for record in records]
+
+
+# Helper function to concatenate each segment's hits, drop tombstoned rows and keep the k best
+def _merge(hits: list[tuple[np.ndarray, np.ndarray]], k: int, deleted: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    ids = np.concatenate([np.asarray(ids, dtype = np.int64) for ids, _ in hits])
+    scores = np.concatenate([scores for _, scores in hits])
+    if len(deleted):
+        live = ~np.isin(ids, deleted)
+        ids, scores = ids[live], scores[live]
+    best = top_k(scores, k)
+    return ids[best], scores[best]
+
+
+class SegmentedRecords:
+    """Base records followed by the delta segment's records."""
+
+    def __init__(self, base: Sequence[dict], delta: list[dict]):
+        self.base = base
+        self.delta = delta
+        self.n_base = len(base)
+
+    def __len__(self) -> int:
+        return self.n_base + len(self.delta)
+
+    def __getitem__(self, row: int) -> dict:
+        row = int(row)
+        return self.base[row] if row < self.n_base else self.delta[row - self.n_base]
+
+
+class SegmentedFilters:
+    """Filter columns of the base and delta segments, with tombstoned rows never matching."""
+
+    def __init__(self, base: FilterEngine, delta: FilterEngine, deleted: np.ndarray):
+        self.base = base
+        self.delta = delta
+        self.deleted = deleted
+        self.n_rows = base.n_rows + delta.n_rows
+
+    def mask(self, constraints: list) -> np.ndarray:
+        """Rows meeting every constraint, as FilterEngine.mask().
+
+        Args:
+            constraints (list[Constraint]): Constraints to AND together.
+
+        Returns:
+            np.ndarray: (n_rows,) boolean mask, False for tombstoned rows.
+        """
+        mask = np.concatenate([self.base.mask(constraints), self.delta.mask(constraints)])
+        mask[self.deleted] = False
+        return mask
+
+    def candidates(self, constraints: list) -> np.ndarray | None:
+        """Live row ids meeting every constraint, or None when there are no constraints.
+
+        Args:
+            constraints (list[Constraint]): Constraints to AND together.
+
+        Returns:
+            np.ndarray | None: Sorted row ids, or None for "no filtering" (the indexes then skip
+            tombstoned rows themselves).
+        """
+        if not constraints:
+            return None
+        return np.flatnonzero(self.mask(constraints))
+
+
+class SegmentedIndex:
+    """A read-only vector index plus a small exact delta segment, minus tombstoned rows.
+
+    Rows below len(base) are the base index's and the rest the delta's. Unfiltered searches ask
+    each segment for k extra rows per tombstone, up to _TOMBSTONE_DEPTH * k, and drop tombstones
+    afterwards, so no mask over the catalog is built per query. A segment that returned a full page
+    with fewer than k live rows may hide better live rows, so only then is the query re-run at the
+    full depth. Filtered candidates (from SegmentedFilters) are already live.
+    """
+
+    def __init__(self, base: DenseIndex | IVFIndex | QuantizedIndex, delta: DenseIndex, deleted: np.ndarray):
+        self.base = base
+        self.delta = delta
+        self.deleted = deleted
+        self.n_base = len(base)
+
+    def __len__(self) -> int:
+        return self.n_base + len(self.delta)
+
+    @property
+    def dim(self) -> int:
+        return self.base.dim
+
+    # Helper function to split row ids into base and delta-local ids
+    def _split(self, candidates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        in_base = candidates < self.n_base
+        return candidates[in_base], candidates[~in_base] - self.n_base
+
+    # Helper function to search both segments for the depth best rows each, in catalog row ids
+    def _hits(self, query_vector: np.ndarray, depth: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        delta_ids, delta_scores = self.delta.search(query_vector, depth)
+        return [self.base.search(query_vector, depth), (delta_ids + self.n_base, delta_scores)]
+
+    # Helper function to check whether a segment's page is full but has fewer than k live rows
+    def _short(self, hits: list[tuple[np.ndarray, np.ndarray]], depth: int, k: int) -> bool:
+        return any(len(ids) == depth and len(ids) - np.count_nonzero(np.isin(ids, self.deleted)) < k for ids, _ in hits)
+
+    def search(self, query_vector: np.ndarray, k: int = 10,
+               candidates: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """Find the k live rows most similar to the query across both segments.
+
+        Args:
+            query_vector (np.ndarray): (dim,) query embedding.
+            k (int, optional): Number of results. Defaults to 10.
+            candidates (np.ndarray, optional): Live row ids to restrict the search to. Defaults to None.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row indices and their similarities, best first.
+        """
+        if candidates is None:
+            full_depth = k + len(self.deleted)
+            depth = min(full_depth, k * (1 + _TOMBSTONE_DEPTH))
+            hits = self._hits(query_vector, depth)
+            if depth < full_depth and self._short(hits, depth, k):
+                hits = self._hits(query_vector, full_depth)
+            return _merge(hits, k, self.deleted)
+
+        base_candidates, delta_candidates = self._split(candidates)
+        hits = []
+        if len(base_candidates):
+            hits.append(self.base.search(query_vector, k, base_candidates))
+        if len(delta_candidates):
+            delta_ids, delta_scores = self.delta.search(query_vector, k, delta_candidates)
+            hits.append((delta_ids + self.n_base, delta_scores))
+        return _merge(hits or [(np.empty(0, dtype = np.int64), np.empty(0))], k, self.deleted[:0])
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 10,
+                     candidates: np.ndarray = None) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Batched search() over both segments (see DenseIndex.search_batch).
+
+        Args:
+            query_vectors (np.ndarray): (m, dim) query embeddings.
+            k (int, optional): Number of results per query. Defaults to 10.
+            candidates (np.ndarray, optional): Live row ids to restrict every query to. Defaults to None.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Per query, row indices and similarities, best first.
+        """
+        empty = [(np.empty(0, dtype = np.int64), np.empty(0))] * len(query_vectors)
+        if candidates is not None:
+            base_candidates, delta_candidates = self._split(candidates)
+            base_hits = self.base.search_batch(query_vectors, k, base_candidates) if len(base_candidates) else empty
+            delta_hits = self.delta.search_batch(query_vectors, k, delta_candidates) if len(delta_candidates) else empty
+            return [
+                _merge([base, (delta[0] + self.n_base, delta[1])], k, self.deleted[:0])
+                for base, delta in zip(base_hits, delta_hits)
+            ]
+
+        full_depth = k + len(self.deleted)
+        depth = min(full_depth, k * (1 + _TOMBSTONE_DEPTH))
+        base_hits = self.base.search_batch(query_vectors, depth)
+        delta_hits = self.delta.search_batch(query_vectors, depth) if len(self.delta) else empty
+        results = []
+        for query_vector, base, delta in zip(query_vectors, base_hits, delta_hits):
+            hits = [base, (delta[0] + self.n_base, delta[1])]
+            if depth < full_depth and self._short(hits, depth, k):
+                hits = self._hits(query_vector, full_depth)
+            results.append(_merge(hits, k, self.deleted))
+        return results
+
+
+class SegmentedBM25:
+    """BM25 over the base postings plus a delta index built with the base's term statistics
+    (BM25Index.build(reference = ...)), so scores of both segments are comparable. Tombstoned rows
+    score 0 and are never returned.
+    """
+
+    def __init__(self, base: BM25Index, delta: BM25Index, deleted: np.ndarray):
+        self.base = base
+        self.delta = delta
+        self.deleted = deleted
+        self.n_docs = base.n_docs + delta.n_docs
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for the query, as BM25Index.scores().
+
+        Args:
+            query (str): Query text.
+
+        Returns:
+            np.ndarray: (n_docs,) float32 scores.
+        """
+        scores = np.concatenate([self.base.scores(query), self.delta.scores(query)])
+        scores[self.deleted] = 0
+        return scores
+
+    # Same top-k over scores() as a single index
+    search = BM25Index.search
+
+
+@dataclass(frozen = True)
+class _Delta:
+    """Rows added since the last compaction, replaced wholesale (never mutated) on each update."""
+    records: list[dict]
+    columns: dict[str, np.ndarray]
+    vectors: np.ndarray
+    texts: list[str]
+    # Counter(tokenize(text)) per text, so rebuilding the delta's postings only tokenizes new texts
+    token_counts: list[Counter]
+    lexical: BM25Index | None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+# Helper function to rebuild a vector index over its kept rows followed by new normalized vectors,
+# keeping the index type. IVF lists reuse the trained centroids; only a full rebuild retrains them
+def _merge_vectors(index: DenseIndex | IVFIndex | QuantizedIndex, keep: np.ndarray,
+                   vectors: np.ndarray) -> DenseIndex | IVFIndex | QuantizedIndex:
+    if isinstance(index, IVFIndex):
+        matrix = np.concatenate([index.reconstruct(keep), vectors])
+        return IVFIndex.from_centroids(matrix, index.centroids, index.nprobe)
+    if isinstance(index, QuantizedIndex):
+        full = np.concatenate([index.full[keep], vectors]) if index.full is not None else None
+        if index.precision == "int8":
+            codes, scales = quantize_int8(vectors)
+            codes, scales = np.concatenate([index.codes[keep], codes]), np.concatenate([index.scales[keep], scales])
+        else:
+            codes, scales = np.concatenate([index.codes[keep], vectors.astype(np.float16)]), None
+        return QuantizedIndex(codes, scales, full, index.rerank)
+    return DenseIndex(np.concatenate([index.matrix[keep], vectors]), normalized = True)
+
+
+# Helper function to fold the delta postings into the base postings without the documents' texts,
+# dropping tombstoned documents. Weights are kept as computed, so term statistics stay those of the
+# last full build (plus the deltas) until the index is rebuilt from scratch. The delta was built with the
+# base as reference, so its mean length already covers both segments (and is the only one when the base was empty)
+def _merge_postings(base: BM25Index, keep_base: np.ndarray, delta: BM25Index, keep_delta: np.ndarray) -> BM25Index:
+    vocabulary = dict(base.vocabulary)
+    for term in delta.vocabulary:
+        vocabulary.setdefault(term, len(vocabulary))
+    delta_terms = np.array([vocabulary[term] for term in delta.vocabulary], dtype = np.int64)
+
+    terms, doc_ids, weights = [], [], []
+    for index, keep, term_map, offset in ((base, keep_base, None, 0), (delta, keep_delta, delta_terms, len(keep_base))):
+        remap = np.full(index.n_docs, -1, dtype = np.int64)
+        remap[keep] = np.arange(len(keep)) + offset
+        posting_terms = np.repeat(np.arange(len(index.vocabulary)), np.diff(index.offsets))
+        posting_docs = remap[index.doc_ids]
+        live = posting_docs >= 0
+        terms.append(posting_terms[live] if term_map is None else term_map[posting_terms[live]])
+        doc_ids.append(posting_docs[live])
+        weights.append(np.asarray(index.weights)[live])
+
+    # Stable by term, so each term's postings stay in row order (base rows, then delta rows)
+    terms = np.concatenate(terms)
+    order = np.argsort(terms, kind = "stable")
+    offsets = np.zeros(len(vocabulary) + 1, dtype = np.int64)
+    np.cumsum(np.bincount(terms, minlength = len(vocabulary)), out = offsets[1:])
+
+    return BM25Index(vocabulary, offsets, np.concatenate(doc_ids)[order].astype(np.int32),
+                     np.concatenate(weights)[order], len(keep_base) + len(keep_delta),
+                     avg_length = delta.avg_length if delta.n_docs else base.avg_length)
+
+
+class IncrementalIndex:
+    """Upserts and deletes racquets in a running SearchService without rebuilding its indexes.
+
+    The service's data becomes a read-only base segment plus a small delta segment: new and
+    changed racquets are appended to the delta (exact vectors, BM25 postings built with the base's
+    term statistics, filter columns and records), and the rows they replace or delete are
+    tombstoned. Every update builds a new Snapshot from the delta and swaps it into the service,
+    so queries see either all of an update or none of it, and an update costs time proportional
+    to the delta, not the catalog. Once the delta plus tombstones reach compact_rows, a
+    background thread folds them into a new base segment; updates made while it runs are carried
+    over when it swaps in.
+
+    Row IDs default to racquet_ids() of the service's records. With background=False nothing
+    compacts until compact() is called. Updates live in this process only: rebuild the bundle
+    (run_build_index.py) to persist them.
+    """
+
+    def __init__(self, service: SearchService, ids: Sequence[str] = None, compact_rows: int = COMPACT_ROWS,
+                 background: bool = True):
+        base = service.snapshot
+        ids = list(ids) if ids is not None else racquet_ids(base.records)
+        if len(ids) != len(base.index):
+            raise ValueError(f"Got {len(ids)} racquet IDs for {len(base.index)} racquets.")
+        self.service = service
+        self.compact_rows = compact_rows
+        self.background = background
+        self.compactions = 0
+        self._base = base
+        self._delta = self._empty_delta(base)
+        self._ids = ids
+        self._rows = {}
+        # Rows sharing an ID (duplicate scrapes of one product) keep the last; the others are tombstoned
+        duplicates = []
+        for row, racquet in enumerate(ids):
+            if racquet in self._rows:
+                duplicates.append(self._rows[racquet])
+                self._ids[self._rows[racquet]] = None
+            self._rows[racquet] = row
+        self._deleted = np.array(duplicates, dtype = np.int64)
+        self._lock = threading.Lock()
+        # Held for a whole compaction, so an explicit compact() waits for a background one
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        if duplicates:
+            logger.info(f"Tombstoned {len(duplicates)} rows with duplicate racquet IDs.")
+            self._publish()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, racquet: str) -> bool:
+        return racquet in self._rows
+
+    def ids(self) -> list[str]:
+        """Racquet IDs currently in the index.
+
+        Returns:
+            list[str]: Live racquet IDs.
+        """
+        with self._lock:
+            return list(self._rows)
+
+    @staticmethod
+    def _empty_delta(base: Snapshot) -> _Delta:
+        columns = {field: np.empty(0) for field in base.filters.columns}
+        lexical = BM25Index.build([], reference = base.lexical) if base.lexical is not None else None
+        return _Delta([], columns, np.empty((0, base.index.dim), dtype = np.float32), [], [], lexical)
+
+    def stats(self) -> dict:
+        """Segment sizes, for metrics endpoints.
+
+        Returns:
+            dict: Live racquets, base and delta rows, tombstones and completed compactions.
+        """
+        return {
+            "racquets": len(self),
+            "base_rows": len(self._base.index),
+            "delta_rows": len(self._delta),
+            "tombstones": len(self._deleted),
+            "compactions": self.compactions,
+        }
+
+    # Helper function to swap a snapshot of the current segments into the service. Called with the lock held
+    def _publish(self):
+        base, delta, deleted = self._base, self._delta, self._deleted
+        if not len(delta) and not len(deleted):
+            snapshot = base
+        else:
+            lexical = SegmentedBM25(base.lexical, delta.lexical, deleted) if base.lexical is not None else None
+            snapshot = Snapshot(
+                SegmentedRecords(base.records, delta.records),
+                SegmentedFilters(base.filters, FilterEngine(delta.columns, len(delta)), deleted),
+                SegmentedIndex(base.index, DenseIndex(delta.vectors, normalized = True), deleted),
+                lexical,
+            )
+        self.service.swap(snapshot)
+        set_gauge("index_delta_rows", len(delta))
+        set_gauge("index_tombstones", len(deleted))
+
+    def _maybe_compact(self):
+        if len(self._delta) + len(self._deleted) < self.compact_rows or not self.background:
+            return
+        if self._compact_lock.locked() or (self._compactor is not None and self._compactor.is_alive()):
+            return
+        self._compactor = threading.Thread(target = self._run_compaction, name = "index-compactor", daemon = True)
+        self._compactor.start()
+
+    def _run_compaction(self):
+        try:
+            self.compact()
+        except (MemoryError, ValueError) as e:
+            # Keep serving the segmented snapshot; the next update retries
+            logger.warning(f"Index compaction failed: {e}")
+
+    def upsert(self, df: "pd.DataFrame", embeddings: np.ndarray = None) -> int:
+        """Add racquets, or replace the ones whose racquet_id() already exists.
+
+        Args:
+            df (pd.DataFrame): Cleaned racquet rows, as in basic_preprocessed_data_cleaned.csv.
+            embeddings (np.ndarray, optional): (len(df), dim) embeddings of the rows' natural v2
+                texts. Defaults to embedding them with the service's encoder.
+
+        Raises:
+            ValueError: If embeddings do not match df or the index dimension.
+
+        Returns:
+            int: Number of existing racquets replaced.
+        """
+        from src.features.combine_text import create_natural_combined_text_v2_batch
+
+        if not len(df):
+            return 0
+        start = time.perf_counter()
+        df = df.reset_index(drop = True)
+        texts = create_natural_combined_text_v2_batch(df).tolist()
+        if embeddings is None:
+            embeddings = self.service.encode(texts)
+        vectors = normalize_rows(embeddings)
+        if vectors.shape != (len(df), self._base.index.dim):
+            raise ValueError(f"Got embeddings of shape {vectors.shape} for {len(df)} racquets and a "
+                             f"{self._base.index.dim}-d index.")
+        records = result_records(df)
+        columns = FilterEngine.from_frame(df).columns
+
+        with self._lock:
+            delta, first_row = self._delta, len(self._ids)
+            dead = []
+            for offset, racquet in enumerate(racquet_ids(records)):
+                if racquet in self._rows:
+                    dead.append(self._rows[racquet])
+                    self._ids[self._rows[racquet]] = None
+                self._rows[racquet] = first_row + offset
+                self._ids.append(racquet)
+            delta_texts = delta.texts + texts
+            delta_counts = delta.token_counts + [Counter(tokenize(text)) for text in texts]
+            self._delta = _Delta(
+                delta.records + records,
+                {
+                    field: np.concatenate([values, columns.get(field, np.full(len(df), np.nan))])
+                    for field, values in delta.columns.items()
+                },
+                np.concatenate([delta.vectors, vectors]),
+                delta_texts,
+                delta_counts,
+                BM25Index.build(delta_texts, reference = self._base.lexical, token_counts = delta_counts)
+                if self._base.lexical is not None else None,
+            )
+            self._deleted = np.union1d(self._deleted, np.array(dead, dtype = np.int64))
+            self._publish()
+            self._maybe_compact()
+
+        count("index_rows_upserted", len(df))
+        observe("index_update_seconds", time.perf_counter() - start, op = "upsert")
+        return len(dead)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove racquets by racquet_id(). Unknown IDs are ignored.
+
+        Args:
+            ids (Iterable[str]): Racquet IDs.
+
+        Returns:
+            int: Number of racquets removed.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            rows = [self._rows.pop(racquet) for racquet in set(ids) if racquet in self._rows]
+            if not rows:
+                return 0
+            for row in rows:
+                self._ids[row] = None
+            self._deleted = np.union1d(self._deleted, np.array(rows, dtype = np.int64))
+            self._publish()
+            self._maybe_compact()
+
+        count("index_rows_deleted", len(rows))
+        observe("index_update_seconds", time.perf_counter() - start, op = "delete")
+        return len(rows)
+
+    @timed("index_compaction", log = True)
+    def compact(self):
+        """Fold the delta segment into a new base segment and drop tombstoned rows.
+
+        The merge reads the whole catalog, so it runs without the update lock: updates made in the
+        meantime are re-applied to the new base before it is swapped in. Only one compaction runs
+        at a time; a call made while another (e.g. the background one) is running waits for it and
+        then compacts whatever that one left.
+        """
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self):
+        with self._lock:
+            base, delta, deleted = self._base, self._delta, self._deleted
+        if not len(delta) and not len(deleted):
+            return
+        n_base, n_rows = len(base.index), len(base.index) + len(delta)
+
+        keep = np.ones(n_rows, dtype = bool)
+        keep[deleted] = False
+        keep_base, keep_delta = np.flatnonzero(keep[:n_base]), np.flatnonzero(keep[n_base:])
+        records = base.records.take(keep_base) if hasattr(base.records, "take") else [base.records[i] for i in keep_base]
+        merged = Snapshot(
+            records + [delta.records[i] for i in keep_delta],
+            FilterEngine({
+                field: np.concatenate([values[keep_base], delta.columns[field][keep_delta]])
+                for field, values in base.filters.columns.items()
+            }, len(keep_base) + len(keep_delta)),
+            _merge_vectors(base.index, keep_base, delta.vectors[keep_delta]),
+            _merge_postings(base.lexical, keep_base, delta.lexical, keep_delta) if base.lexical is not None else None,
+        )
+        # Old row -> row in the merged base (-1 for dropped rows)
+        remap = np.full(n_rows, -1, dtype = np.int64)
+        remap[keep] = np.arange(len(merged.index))
+
+        with self._lock:
+            if self._base is not base:
+                # Never swap over a base this merge was not computed from (row ids would not line up)
+                logger.warning("Index base changed during compaction; discarding the merge.")
+                return
+            # Rows appended and tombstones added since the merge started move over to the new segments
+            tail = self._delta
+            new_rows = slice(len(delta), len(tail))
+            late_deleted = np.setdiff1d(self._deleted, deleted)
+            late_deleted = np.where(late_deleted < n_rows, remap[np.minimum(late_deleted, n_rows - 1)],
+                                    late_deleted - n_rows + len(merged.index))
+            tail_texts, tail_counts = tail.texts[new_rows], tail.token_counts[new_rows]
+            self._base = merged
+            self._delta = _Delta(
+                tail.records[new_rows],
+                {field: values[new_rows] for field, values in tail.columns.items()},
+                tail.vectors[new_rows],
+                tail_texts,
+                tail_counts,
+                BM25Index.build(tail_texts, reference = merged.lexical, token_counts = tail_counts)
+                if merged.lexical is not None else None,
+            )
+            self._deleted = np.sort(late_deleted)
+            # Rows tombstoned since the merge started are already None here
+            self._ids = [self._ids[row] for row in np.flatnonzero(keep)] + self._ids[n_rows:]
+            self._rows = {racquet: row for row, racquet in enumerate(self._ids) if racquet is not None}
+            self._publish()
+            self.compactions += 1
+
+        log_event("index_compacted", racquets = len(self), dropped = int(n_rows - keep.sum()),
+                  delta_rows = len(self._delta), tombstones = len(self._deleted))
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Sequence
+
+import numpy as np
+
+from src.instrumentation import timed
+from src.search.dense import top_k
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "i", "in", "is", "it", "its",
+    "me", "my", "of", "on", "or", "that", "the", "this", "to", "with", "want", "looking",
+})
+# Postings arrays written as separate .npy files when an index is saved to a directory
+_POSTINGS_ARRAYS = ("offsets", "doc_ids", "weights")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric tokens without stopwords ("$200" -> "200", "16x19" -> "16x19").
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list[str]: Tokens in order.
+    """
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def corpus_fingerprint(texts: Sequence[str]) -> str:
+    """Hash a corpus so a saved index can be checked against the texts it should cover.
+
+    Args:
+        texts (Sequence[str]): Documents in index order.
+
+    Returns:
+        str: sha256 hex digest.
+    """
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index stored as flat NumPy arrays.
+
+    Postings are kept CSR-style: the postings of term t are doc_ids[offsets[t]:offsets[t + 1]] with
+    the matching precomputed BM25 term weights in weights[...], so a query only adds a few array
+    slices into a score vector.
+    """
+
+    def __init__(self, vocabulary: dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, n_docs: int, avg_length: float, fingerprint: str = ""):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+        self.fingerprint = fingerprint
+        # Mean document length in tokens, kept so other indexes can be built with the same statistics
+        self.avg_length = avg_length
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = 1.5, b: float = 0.75,
+              reference: "BM25Index" = None, token_counts: Sequence[Counter] = None) -> "BM25Index":
+        """Tokenize texts and build the postings arrays.
+
+        Args:
+            texts (Sequence[str]): Documents, e.g. combined racquet texts, in row order.
+            k1 (float, optional): Term frequency saturation. Defaults to 1.5.
+            b (float, optional): Document length normalization. Defaults to 0.75.
+            reference (BM25Index, optional): Larger index whose document frequencies, document count
+                and mean length are added to those of texts, so the weights are comparable with the
+                reference's scores (e.g. for a few added documents searched alongside it). Defaults
+                to None.
+            token_counts (Sequence[Counter], optional): Counter(tokenize(text)) of every text, kept
+                from an earlier build over some of the same texts. Defaults to None (tokenize texts).
+
+        Returns:
+            BM25Index: The index.
+        """
+        vocabulary = {}
+        term_ids, doc_ids, tfs = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype = np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text)) if token_counts is None else token_counts[doc_id]
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+
+        term_ids = np.array(term_ids, dtype = np.int64)
+        order = np.argsort(term_ids, kind = "stable")
+        doc_ids = np.array(doc_ids, dtype = np.int32)[order]
+        tfs = np.array(tfs, dtype = np.float32)[order]
+        doc_freqs = np.bincount(term_ids, minlength = len(vocabulary))
+        offsets = np.zeros(len(vocabulary) + 1, dtype = np.int64)
+        np.cumsum(doc_freqs, out = offsets[1:])
+
+        # Precompute each posting's full BM25 contribution: idf * tf * (k1 + 1) / (tf + k1 * length norm)
+        n_docs = len(texts)
+        avg_length = float(doc_lengths.mean()) if n_docs and doc_lengths.mean() else 1.0
+        stats_docs, stats_freqs = n_docs, doc_freqs
+        if reference is not None:
+            stats_docs = n_docs + reference.n_docs
+            stats_freqs = doc_freqs + np.array([reference.doc_freq(term) for term in vocabulary], dtype = np.int64)
+            if stats_docs:
+                avg_length = (reference.avg_length * reference.n_docs + doc_lengths.sum()) / stats_docs
+        idf = np.log1p((stats_docs - stats_freqs + 0.5) / (stats_freqs + 0.5)).astype(np.float32)
+        length_norm = 1 - b + b * doc_lengths[doc_ids] / avg_length
+        weights = np.repeat(idf, doc_freqs) * tfs * (k1 + 1) / (tfs + k1 * length_norm)
+
+        return cls(vocabulary, offsets, doc_ids, weights.astype(np.float32), n_docs, avg_length,
+                   corpus_fingerprint(texts))
+
+    def doc_freq(self, term: str) -> int:
+        """Number of documents containing a term.
+
+        Args:
+            term (str): Token, as produced by tokenize().
+
+        Returns:
+            int: Document frequency, 0 for unknown terms.
+        """
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            return 0
+        return int(self.offsets[term_id + 1] - self.offsets[term_id])
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query.
+
+        Args:
+            query (str): Query text.
+
+        Returns:
+            np.ndarray: (n_docs,) float32 scores, 0 for documents sharing no terms with the query.
+        """
+        scores = np.zeros(self.n_docs, dtype = np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # A term's postings hold each document once, so fancy-index += is safe here
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+
+        return scores
+
+    @timed("search_lexical")
+    def search(self, query: str, k: int = 10, candidates: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """Find the k best matching documents.
+
+        Args:
+            query (str): Query text.
+            k (int, optional): Number of results. Defaults to 10.
+            candidates (np.ndarray, optional): Document ids to restrict the results to. Defaults to
+                None (all documents).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Document indices and BM25 scores, best first. Documents
+            with no matching terms are left out.
+        """
+        scores = self.scores(query)
+        if candidates is not None:
+            scores = scores[candidates]
+        ids = top_k(scores, min(k, int(np.count_nonzero(scores))))
+
+        return (ids if candidates is None else candidates[ids]), scores[ids]
+
+    def save(self, path: str):
+        """Write the index to a single .npz file (no pickle needed to load it), or to a directory of
+        .npy files that load() can memory-map when path does not end in .npz.
+
+        Args:
+            path (str): Output .npz path or directory.
+        """
+        terms = np.array(sorted(self.vocabulary, key = self.vocabulary.get), dtype = str)
+        if path.endswith(".npz"):
+            np.savez(
+                path,
+                terms = terms,
+                offsets = self.offsets,
+                doc_ids = self.doc_ids,
+                weights = self.weights,
+                n_docs = np.array(self.n_docs),
+                fingerprint = np.array(self.fingerprint),
+                avg_length = np.array(self.avg_length),
+            )
+            return
+
+        os.makedirs(path, exist_ok = True)
+        np.save(os.path.join(path, "terms.npy"), terms)
+        for name in _POSTINGS_ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(path, "bm25.json"), "w", encoding = "utf-8") as f:
+            json.dump({"n_docs": self.n_docs, "fingerprint": self.fingerprint, "avg_length": self.avg_length}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        """Load an index written by save().
+
+        Args:
+            path (str): The .npz file or directory written by save().
+            mmap (bool, optional): Memory-map the postings arrays read-only when loading a
+                directory, so processes serving the same index share one copy. Defaults to True.
+
+        Returns:
+            BM25Index: The index.
+        """
+        if os.path.isdir(path):
+            with open(os.path.join(path, "bm25.json"), "r", encoding = "utf-8") as f:
+                header = json.load(f)
+            terms = np.load(os.path.join(path, "terms.npy")).tolist()
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode = "r" if mmap else None)
+                for name in _POSTINGS_ARRAYS
+            }
+            return cls({term: term_id for term_id, term in enumerate(terms)}, **arrays,
+                       n_docs = header["n_docs"], avg_length = header["avg_length"], fingerprint = header["fingerprint"])
+
+        with np.load(path, allow_pickle = False) as data:
+            vocabulary = {term: term_id for term_id, term in enumerate(data["terms"].tolist())}
+            return cls(vocabulary, data["offsets"], data["doc_ids"], data["weights"],
+                       int(data["n_docs"]), float(data["avg_length"]), str(data["fingerprint"]))
+
+
+def load_or_build_bm25(texts: Sequence[str], path: str) -> BM25Index:
+    """Load the saved BM25 index for texts, rebuilding and saving it if texts changed.
+
+    Args:
+        texts (Sequence[str]): Documents in row order.
+        path (str): .npz path of the saved index.
+
+    Returns:
+        BM25Index: Index whose fingerprint matches texts.
+    """
+    fingerprint = corpus_fingerprint(texts)
+    try:
+        index = BM25Index.load(path)
+        if index.fingerprint == fingerprint:
+            return index
+    except (FileNotFoundError, OSError, KeyError, ValueError):
+        pass
+
+    index = BM25Index.build(texts)
+    index.save(path)
+    return index
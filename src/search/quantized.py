@@ -0,0 +1,204 @@
+import json
+import os
+
+import numpy as np
+
+from src.search.dense import BATCH_SCORES_BYTES, normalize_rows, top_k, unit_vector
+
+PRECISIONS = ("float16", "int8")
+# Shortlist scored against full-precision vectors after the coarse pass
+RERANK_DEPTH = 100
+# Rows converted to float32 at a time while scoring; small enough for the buffer to stay in cache
+_BLOCK_ROWS = 512
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantization: row ≈ codes * scale.
+
+    Args:
+        matrix (np.ndarray): (n, dim) float vectors.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (n, dim) int8 codes and (n,) float32 scales.
+    """
+    matrix = np.asarray(matrix, dtype = np.float32)
+    scales = np.abs(matrix).max(axis = 1) / 127
+    scales[scales == 0] = 1.0
+    codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+# Helper function to score stored codes against one (dim,) or many (dim, m) queries, converting a block
+# of rows to float32 at a time so the BLAS product reads 2 or 4x fewer bytes from memory
+def _coarse_scores(codes: np.ndarray, scales: np.ndarray | None, queries: np.ndarray) -> np.ndarray:
+    scores = np.empty((len(codes),) + queries.shape[1:], dtype = np.float32)
+    buffer = np.empty((min(_BLOCK_ROWS, len(codes)), codes.shape[1]), dtype = np.float32)
+    for start in range(0, len(codes), _BLOCK_ROWS):
+        block = codes[start:start + _BLOCK_ROWS]
+        rows = buffer[:len(block)]
+        rows[...] = block
+        np.dot(rows, queries, out = scores[start:start + len(block)])
+    if scales is not None:
+        scores *= scales if scores.ndim == 1 else scales[:, None]
+    return scores
+
+
+class QuantizedIndex:
+    """Two-stage cosine search over a float16 or int8 copy of the normalized embedding matrix.
+
+    The coarse pass scores every row against the compact copy and keeps the best rerank rows, which
+    are then re-scored exactly against the full-precision matrix (typically memory-mapped, so only
+    the shortlisted rows are read). int8 codes take a quarter of the float32 memory and float16 half.
+    """
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray | None, full: np.ndarray | None,
+                 rerank: int = RERANK_DEPTH):
+        self.codes = codes
+        self.scales = scales
+        self.full = full
+        self.rerank = rerank
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def dim(self) -> int:
+        return self.codes.shape[1]
+
+    @property
+    def precision(self) -> str:
+        return "int8" if self.codes.dtype == np.int8 else "float16"
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, precision: str = "int8", rerank: int = RERANK_DEPTH,
+              normalized: bool = False) -> "QuantizedIndex":
+        """Quantize normalized embeddings, keeping them as the full-precision re-ranking matrix.
+
+        Args:
+            embeddings (np.ndarray): (n, dim) embeddings.
+            precision (str, optional): "int8" or "float16". Defaults to "int8".
+            rerank (int, optional): Coarse shortlist size re-ranked exactly; 0 skips re-ranking.
+                Defaults to RERANK_DEPTH.
+            normalized (bool, optional): embeddings are already row-normalized (e.g. a memory-mapped
+                DenseIndex matrix) and are used as is. Defaults to False.
+
+        Raises:
+            ValueError: If precision is unknown.
+
+        Returns:
+            QuantizedIndex: The index.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}'. Choose from {list(PRECISIONS)}.")
+        full = embeddings if normalized else normalize_rows(embeddings)
+        if precision == "int8":
+            codes, scales = quantize_int8(full)
+        else:
+            codes, scales = full.astype(np.float16), None
+
+        return cls(codes, scales, full, rerank)
+
+    def _rerank(self, query: np.ndarray, ids: np.ndarray, coarse: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        if self.full is None or not self.rerank:
+            best = top_k(coarse, k)
+            return ids[best], coarse[best]
+        shortlist = top_k(coarse, max(k, self.rerank))
+        # Sorted row order keeps the gather from a memory-mapped matrix sequential
+        shortlist = np.sort(ids[shortlist])
+        exact = self.full[shortlist] @ query
+        best = top_k(exact, k)
+        return shortlist[best], exact[best]
+
+    def search(self, query_vector: np.ndarray, k: int = 10,
+               candidates: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """Find the k rows most similar to the query.
+
+        Args:
+            query_vector (np.ndarray): (dim,) query embedding.
+            k (int, optional): Number of results. Defaults to 10.
+            candidates (np.ndarray, optional): Row ids to restrict the search to. Defaults to None.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row indices and their similarities (exact when re-ranked),
+            best first.
+        """
+        query = unit_vector(query_vector)
+        if candidates is None:
+            ids = np.arange(len(self))
+            coarse = _coarse_scores(self.codes, self.scales, query)
+        else:
+            ids = candidates
+            scales = self.scales[candidates] if self.scales is not None else None
+            coarse = _coarse_scores(self.codes[candidates], scales, query)
+
+        return self._rerank(query, ids, coarse, k)
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 10, candidates: np.ndarray = None,
+                     max_scores_bytes: int = BATCH_SCORES_BYTES) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Coarse-score many queries per pass over the codes, then re-rank each query's shortlist.
+
+        Args:
+            query_vectors (np.ndarray): (m, dim) query embeddings.
+            k (int, optional): Number of results per query. Defaults to 10.
+            candidates (np.ndarray, optional): Row ids to restrict every query to. Defaults to None.
+            max_scores_bytes (int, optional): Memory budget for one chunk of coarse scores.
+                Defaults to BATCH_SCORES_BYTES.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: Per query, row indices and similarities, best first.
+        """
+        queries = normalize_rows(query_vectors)
+        if candidates is None:
+            ids, codes, scales = np.arange(len(self)), self.codes, self.scales
+        else:
+            ids, codes = candidates, self.codes[candidates]
+            scales = self.scales[candidates] if self.scales is not None else None
+        chunk_size = max(1, max_scores_bytes // (4 * max(1, len(codes))))
+
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            coarse = _coarse_scores(codes, scales, np.ascontiguousarray(chunk.T))
+            results += [self._rerank(query, ids, coarse[:, i], k) for i, query in enumerate(chunk)]
+
+        return results
+
+    def save(self, index_dir: str):
+        """Write the codes and scales as .npy arrays plus a JSON header. The full-precision matrix is
+        not included; pass it to load().
+
+        Args:
+            index_dir (str): Output directory.
+        """
+        os.makedirs(index_dir, exist_ok = True)
+        np.save(os.path.join(index_dir, "codes.npy"), np.ascontiguousarray(self.codes))
+        if self.scales is not None:
+            np.save(os.path.join(index_dir, "scales.npy"), self.scales)
+        with open(os.path.join(index_dir, "quantized.json"), "w", encoding = "utf-8") as f:
+            json.dump({"precision": self.precision, "rerank": self.rerank, "size": len(self), "dim": self.dim}, f)
+
+    @classmethod
+    def load(cls, index_dir: str, full: np.ndarray = None, mmap: bool = True, rerank: int = None) -> "QuantizedIndex":
+        """Load an index written by save().
+
+        Args:
+            index_dir (str): Directory written by save().
+            full (np.ndarray, optional): Normalized full-precision matrix for re-ranking, e.g. a
+                memory-mapped DenseIndex matrix. Defaults to None (coarse scores only).
+            mmap (bool, optional): Memory-map the codes read-only. Defaults to True.
+            rerank (int, optional): Override the saved shortlist size. Defaults to None.
+
+        Raises:
+            ValueError: If full does not match the codes' shape.
+
+        Returns:
+            QuantizedIndex: The index.
+        """
+        with open(os.path.join(index_dir, "quantized.json"), "r", encoding = "utf-8") as f:
+            header = json.load(f)
+        codes = np.load(os.path.join(index_dir, "codes.npy"), mmap_mode = "r" if mmap else None)
+        scales = np.load(os.path.join(index_dir, "scales.npy")) if header["precision"] == "int8" else None
+        if full is not None and full.shape != codes.shape:
+            raise ValueError(f"Full-precision matrix has shape {full.shape}, codes have {codes.shape}.")
+
+        return cls(codes, scales, full, header["rerank"] if rerank is None else rerank)
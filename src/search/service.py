@@ -0,0 +1,520 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Sequence
+
+import numpy as np
+
+from src.features.embedding_store import EmbeddingStore, Encoder, sentence_transformer_encoder
+from src.instrumentation import count, observe
+from src.search.ann import IVFIndex, load_or_build_ivf
+from src.search.caching import LRUCache, MicroBatcher, normalize_query
+from src.search.dense import DenseIndex
+from src.search.filters import Constraint, FilterEngine, constraints_from_params, parse_query_filters
+from src.search.hybrid import reciprocal_rank_fusion, weighted_score_fusion
+from src.search.lexical import BM25Index, corpus_fingerprint, load_or_build_bm25
+from src.search.quantized import PRECISIONS, QuantizedIndex
+from src.utils import setup_logger
+
+# pandas is only needed to serve straight from a dataset (load_search_service); prebuilt bundles
+# (src/search/bundle.py) are served without it
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = setup_logger(__name__)
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+SEARCH_MODES = ("hybrid", "dense", "lexical")
+# Vector index backends: exact brute-force cosine, approximate IVF, or a quantized coarse pass
+# re-ranked against the full-precision vectors
+INDEX_BACKENDS = ("exact", "ivf", *PRECISIONS)
+FUSIONS = ("rrf", "weighted")
+# Candidates taken from each retriever before fusing
+CANDIDATE_DEPTH = 100
+
+# Result field -> cleaned dataset column, matching the racquet cards in webapp/frontend/script.js
+RESULT_FIELDS = {
+    "name": "racquet_name",
+    "brand": "racquet_brand",
+    "price": "racquet_price",
+    "rating": "racquet_rating",
+    "image": "racquet_img",
+}
+# Extra result fields of datasets collapsed by src.data.dedup.dedup_variants, when the columns exist.
+# racquet_variants holds a JSON list of the family's other listings
+VARIANT_FIELDS = {
+    "family_size": "racquet_family_size",
+    "variants": "racquet_variants",
+}
+
+
+@dataclass
+class ServingConfig:
+    """Query-path caching and batching settings for SearchService.
+
+    Attributes:
+        query_cache_size (int): Max cached query embeddings. 0 disables the cache.
+        query_cache_ttl (float): Seconds a cached query embedding stays valid. None never expires.
+        result_cache_size (int): Max cached result pages (keyed by normalized query, k, mode and filters).
+            0 disables the cache.
+        result_cache_ttl (float): Seconds a cached result page stays valid. None never expires.
+        max_batch_size (int): Max queries embedded in one encoder call. 1 encodes each query inline.
+        max_batch_wait_ms (float): How long the first query in a batch waits for others to join.
+    """
+    query_cache_size: int = 10_000
+    query_cache_ttl: float = 3600.0
+    result_cache_size: int = 5_000
+    result_cache_ttl: float = 300.0
+    max_batch_size: int = 32
+    max_batch_wait_ms: float = 2.0
+
+
+# Helper function to turn the card columns into JSON-ready dicts once, so queries only index a list
+def result_records(df: "pd.DataFrame") -> list[dict]:
+    """Build one result dict per racquet with the fields the frontend cards show.
+
+    Args:
+        df (pd.DataFrame): Cleaned racquet data.
+
+    Returns:
+        list[dict]: Records keyed by RESULT_FIELDS names (and VARIANT_FIELDS names for collapsed
+        data), missing values as None.
+    """
+    fields = {**RESULT_FIELDS, **{field: col for field, col in VARIANT_FIELDS.items() if col in df.columns}}
+    cards = df[list(fields.values())].astype(object)
+    cards = cards.where(cards.notna(), None)
+    cards.columns = list(fields)
+    if "variants" in cards.columns:
+        cards["variants"] = cards["variants"].map(decode_variants)
+
+    return cards.to_dict(orient = "records")
+
+
+def decode_variants(value: str | None) -> list[dict]:
+    """Parse a racquet_variants value.
+
+    Args:
+        value (str | None): JSON list written by collapse_variants, or None.
+
+    Returns:
+        list[dict]: The family's other listings, empty for None.
+    """
+    return json.loads(value) if value else []
+
+
+def parse_batch_item(item: str | dict) -> tuple[str, list[Constraint]]:
+    """Read one batch search entry: a bare query string, or an object such as
+    {"q": "control racquet", "max_price": 200} with min_<field>/max_<field> filters.
+
+    Args:
+        item (str | dict): Batch entry. The query can be under "q" or "query".
+
+    Raises:
+        ValueError: If the entry has no query text or a filter value is not a number.
+
+    Returns:
+        tuple[str, list[Constraint]]: The query and its explicit constraints.
+    """
+    if isinstance(item, str):
+        query, constraints = item, []
+    elif isinstance(item, dict):
+        query, constraints = item.get("q", item.get("query")), constraints_from_params(item)
+    else:
+        raise ValueError("Each batch entry must be a query string or an object with a 'q' field.")
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("Each batch entry needs a non-empty query.")
+    return query.strip(), constraints
+
+
+# Helper function to combine passed-in constraints with those parsed from the query text
+def _query_constraints(query: str, constraints: list[Constraint] | None, parse_filters: bool) -> tuple[list[Constraint], str]:
+    constraints = list(constraints or [])
+    if not parse_filters:
+        return constraints, query
+    parsed, text = parse_query_filters(query)
+    return constraints + parsed, text or query
+
+
+# Helper function to fuse dense and BM25 candidate lists for hybrid mode
+def _fuse(dense: tuple[np.ndarray, np.ndarray], lexical: tuple[np.ndarray, np.ndarray], k: int,
+          fusion: str) -> tuple[np.ndarray, np.ndarray]:
+    if fusion == "rrf":
+        return reciprocal_rank_fusion([dense[0], lexical[0]], k)
+    return weighted_score_fusion([dense, lexical], k)
+
+
+@dataclass(frozen = True)
+class Snapshot:
+    """The row-aligned data a SearchService answers queries from. A service swaps whole snapshots,
+    so every query reads records, filters and indexes of the same catalog version.
+
+    Attributes:
+        records (Sequence[dict]): Result card per row.
+        filters (FilterEngine): Numeric spec columns per row.
+        index (DenseIndex | IVFIndex | QuantizedIndex): Vector index over the rows.
+        lexical (BM25Index): BM25 index over the rows, or None.
+        generation (int): Set by SearchService.swap(); part of the result cache key, so pages computed
+            from an older snapshot never match.
+    """
+    records: Sequence[dict]
+    filters: FilterEngine
+    index: "DenseIndex | IVFIndex | QuantizedIndex"
+    lexical: BM25Index = None
+    generation: int = 0
+
+    def __post_init__(self):
+        if len(self.records) != len(self.index):
+            raise ValueError(f"Got {len(self.records)} racquets but {len(self.index)} embeddings.")
+        if self.filters.n_rows != len(self.index):
+            raise ValueError(f"Got {len(self.index)} embeddings but filter columns for {self.filters.n_rows} racquets.")
+        if self.lexical is not None and len(self.lexical) != len(self.index):
+            raise ValueError(f"Got {len(self.index)} racquets but a BM25 index over {len(self.lexical)} documents.")
+
+
+class SearchService:
+    """Racquet search over embeddings and a BM25 index held in memory for the lifetime of the service.
+
+    Hybrid queries run BM25 on a worker thread while the query is embedded and scored against the
+    dense index, then fuse both candidate lists. Query embeddings and full result pages are kept in
+    LRU/TTL caches, and concurrent cache misses are embedded together by a MicroBatcher. Build one
+    from a DataFrame with from_frame(), or from a prebuilt bundle with src.search.bundle. The data
+    itself is one immutable Snapshot that swap() replaces, e.g. for incremental catalog updates
+    (src.search.incremental).
+    """
+
+    def __init__(self, records: Sequence[dict], filters: FilterEngine, index: DenseIndex | IVFIndex | QuantizedIndex, encode: Encoder,
+                 lexical: BM25Index = None, config: ServingConfig = None):
+        self.snapshot = Snapshot(records, filters, index, lexical)
+        self.encode = encode
+        self.config = config or ServingConfig()
+        self.query_cache = LRUCache(self.config.query_cache_size, self.config.query_cache_ttl)
+        self.result_cache = LRUCache(self.config.result_cache_size, self.config.result_cache_ttl)
+        self.batcher = None
+        if self.config.max_batch_size > 1:
+            self.batcher = MicroBatcher(encode, self.config.max_batch_size, self.config.max_batch_wait_ms)
+        self._executor = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = "bm25")
+
+    @property
+    def generation(self) -> int:
+        return self.snapshot.generation
+
+    @property
+    def index(self) -> "DenseIndex | IVFIndex | QuantizedIndex":
+        return self.snapshot.index
+
+    @property
+    def lexical(self) -> BM25Index | None:
+        return self.snapshot.lexical
+
+    @property
+    def records(self) -> Sequence[dict]:
+        return self.snapshot.records
+
+    @property
+    def filters(self) -> FilterEngine:
+        return self.snapshot.filters
+
+    def swap(self, snapshot: "Snapshot"):
+        """Atomically replace the data queries read, e.g. after an incremental catalog update.
+
+        Queries already running finish on the snapshot they started with. The snapshot is stored
+        with the next generation, so the result cache never mixes pages of the two. The result
+        cache is cleared; query embeddings stay cached since the encoder is unchanged.
+
+        Args:
+            snapshot (Snapshot): New records, filters, vector index and BM25 index.
+        """
+        self.snapshot = replace(snapshot, generation = self.snapshot.generation + 1)
+        self.result_cache.clear()
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame", embeddings: np.ndarray, encode: Encoder, lexical: BM25Index = None,
+                   index: DenseIndex | IVFIndex | QuantizedIndex = None, config: ServingConfig = None) -> "SearchService":
+        """Build a service over a cleaned racquet DataFrame and its embeddings.
+
+        Args:
+            df (pd.DataFrame): Cleaned racquet data, one row per embedding.
+            embeddings (np.ndarray): (n, dim) embeddings in row order.
+            encode (Encoder): Query encoder for the same model as the embeddings.
+            lexical (BM25Index, optional): BM25 index over the same rows. Defaults to None.
+            index (DenseIndex | IVFIndex | QuantizedIndex, optional): Vector index to use instead
+                of an exact DenseIndex over embeddings. Defaults to None.
+            config (ServingConfig, optional): Query caching and batching settings. Defaults to None.
+
+        Returns:
+            SearchService: The service.
+        """
+        df = df.reset_index(drop = True)
+        index = index if index is not None else DenseIndex(embeddings)
+        return cls(result_records(df), FilterEngine.from_frame(df), index, encode, lexical, config)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embed a query, using the query embedding cache and the micro-batcher.
+
+        Args:
+            query (str): Query text. Whitespace and case are normalized before embedding.
+
+        Returns:
+            np.ndarray: (dim,) float32 query embedding.
+        """
+        text = normalize_query(query)
+        vector = self.query_cache.get(text)
+        if vector is not None:
+            return vector
+        if self.batcher is not None:
+            vector = self.batcher.submit(text).result()
+        else:
+            vector = np.asarray(self.encode([text]), dtype = np.float32)[0]
+        self.query_cache.put(text, vector)
+
+        return vector
+
+    def metrics(self) -> dict:
+        """Cache hit rates and encoder batching statistics.
+
+        Returns:
+            dict: Stats for the query embedding cache, the result cache and the micro-batcher.
+        """
+        return {
+            "racquets": len(self),
+            "query_embedding_cache": self.query_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+            "encoder_batching": self.batcher.stats() if self.batcher is not None else None,
+        }
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+        self._executor.shutdown(wait = False)
+
+    def _resolve_mode(self, mode: str, fusion: str) -> str:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Choose from {list(SEARCH_MODES)}.")
+        if fusion not in FUSIONS:
+            raise ValueError(f"Unknown fusion '{fusion}'. Choose from {list(FUSIONS)}.")
+        if mode == "hybrid" and self.lexical is None:
+            return "dense"
+        if mode == "lexical" and self.lexical is None:
+            raise ValueError("This service has no BM25 index.")
+        return mode
+
+    @staticmethod
+    def _page(snapshot: Snapshot, query: str, k: int, mode: str, constraints: list[Constraint],
+              candidates: np.ndarray | None, ids: np.ndarray, scores: np.ndarray) -> dict:
+        return {
+            "query": query,
+            "k": k,
+            "mode": mode,
+            "filters": [str(constraint) for constraint in constraints],
+            "candidates": len(snapshot.index) if candidates is None else len(candidates),
+            "results": [{**snapshot.records[i], "score": round(float(score), 4)} for i, score in zip(ids, scores)],
+        }
+
+    def search(self, query: str, k: int = 10, mode: str = "hybrid", fusion: str = "rrf",
+               constraints: list[Constraint] = None, parse_filters: bool = True) -> dict:
+        """Return the k best racquets for a query.
+
+        Numeric spec constraints (from the query text and/or passed in) are applied first as a
+        boolean mask, and only the racquets that pass are scored.
+
+        Args:
+            query (str): Natural language query.
+            k (int, optional): Number of results. Defaults to 10.
+            mode (str, optional): "hybrid" (BM25 + dense), "dense" or "lexical". Hybrid falls back to
+                dense if the service has no BM25 index. Defaults to "hybrid".
+            fusion (str, optional): "rrf" (reciprocal-rank fusion) or "weighted" (normalized score sum)
+                for hybrid mode. Defaults to "rrf".
+            constraints (list[Constraint], optional): Spec constraints to apply, e.g. from API params.
+                Defaults to None.
+            parse_filters (bool, optional): Also parse constraints such as "under $200" out of the
+                query and search with the rest of the text. Defaults to True.
+
+        Raises:
+            ValueError: If mode or fusion is unknown, or mode is "lexical" without a BM25 index.
+
+        Returns:
+            dict: query, k, mode, the applied filters, the number of candidates that passed them,
+            results (RESULT_FIELDS plus score, best first), whether the page came from the result
+            cache, and timings_ms for filtering, query encoding and the index search.
+        """
+        mode = self._resolve_mode(mode, fusion)
+        snapshot = self.snapshot
+
+        start = time.perf_counter()
+        cache_key = (normalize_query(query), k, mode, fusion, tuple(constraints or ()), parse_filters, snapshot.generation)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            elapsed = time.perf_counter() - start
+            count("search_queries", mode = mode, cached = True)
+            observe("search_seconds", elapsed, mode = mode)
+            elapsed = round(elapsed * 1000, 3)
+            return {**cached, "query": query, "cached": True, "timings_ms": {"filter": 0.0, "encode": 0.0, "search": elapsed}}
+
+        constraints, text = _query_constraints(query, constraints, parse_filters)
+        candidates = snapshot.filters.candidates(constraints)
+        filtered = time.perf_counter()
+
+        if candidates is not None and not len(candidates):
+            encoded = filtered
+            ids, scores = np.empty(0, dtype = np.int64), np.empty(0)
+        elif mode == "lexical":
+            encoded = filtered
+            ids, scores = snapshot.lexical.search(text, k, candidates)
+        elif mode == "dense":
+            query_vector = self.encode_query(text)
+            encoded = time.perf_counter()
+            ids, scores = snapshot.index.search(query_vector, k, candidates)
+        else:
+            depth = max(k, CANDIDATE_DEPTH)
+            lexical_future = self._executor.submit(snapshot.lexical.search, text, depth, candidates)
+            query_vector = self.encode_query(text)
+            encoded = time.perf_counter()
+            dense = snapshot.index.search(query_vector, depth, candidates)
+            ids, scores = _fuse(dense, lexical_future.result(), k, fusion)
+        searched = time.perf_counter()
+        count("search_queries", mode = mode, cached = False)
+        observe("search_seconds", searched - start, mode = mode)
+        observe("search_stage_seconds", filtered - start, stage = "filter")
+        observe("search_stage_seconds", encoded - filtered, stage = "encode")
+        observe("search_stage_seconds", searched - encoded, stage = "search")
+
+        payload = {
+            **self._page(snapshot, query, k, mode, constraints, candidates, ids, scores),
+            "timings_ms": {
+                "filter": round((filtered - start) * 1000, 3),
+                "encode": round((encoded - filtered) * 1000, 3),
+                "search": round((searched - encoded) * 1000, 3),
+            },
+        }
+        self.result_cache.put(cache_key, {**payload, "cached": False})
+
+        return {**payload, "cached": False}
+
+    def search_batch(self, queries: Sequence[str], k: int = 10, mode: str = "hybrid", fusion: str = "rrf",
+                     constraints: Sequence[list[Constraint]] = None, parse_filters: bool = True) -> list[dict]:
+        """Answer many queries at once, e.g. saved quiz preferences in a nightly job.
+
+        All query texts are embedded in one encoder call, and queries sharing the same spec filters
+        are scored together with chunked matrix-matrix products (see DenseIndex.search_batch).
+        The query and result caches are bypassed, so a large job neither pollutes them nor grows
+        memory.
+
+        Args:
+            queries (Sequence[str]): Natural language queries.
+            k (int, optional): Number of results per query. Defaults to 10.
+            mode (str, optional): "hybrid", "dense" or "lexical", as in search(). Defaults to "hybrid".
+            fusion (str, optional): "rrf" or "weighted" for hybrid mode. Defaults to "rrf".
+            constraints (Sequence[list[Constraint]], optional): Extra spec constraints per query.
+                Defaults to None.
+            parse_filters (bool, optional): Also parse constraints out of each query. Defaults to True.
+
+        Raises:
+            ValueError: If mode or fusion is unknown, mode is "lexical" without a BM25 index, or
+                constraints does not have one entry per query.
+
+        Returns:
+            list[dict]: One result page per query, in order, shaped like search() without the
+            cache flag and timings.
+        """
+        mode = self._resolve_mode(mode, fusion)
+        if constraints is not None and len(constraints) != len(queries):
+            raise ValueError(f"Got {len(queries)} queries but {len(constraints)} constraint lists.")
+        snapshot = self.snapshot
+        start = time.perf_counter()
+
+        parsed = [
+            _query_constraints(query, constraints[i] if constraints is not None else None, parse_filters)
+            for i, query in enumerate(queries)
+        ]
+        # Queries with the same filters share one candidate set and one batched product
+        groups = {}
+        for i, (query_constraints, _) in enumerate(parsed):
+            groups.setdefault(tuple(query_constraints), []).append(i)
+
+        vectors = None
+        if mode != "lexical" and len(queries):
+            texts = [text for _, text in parsed]
+            unique_texts = list(dict.fromkeys(texts))
+            unique_vectors = np.asarray(self.encode(unique_texts), dtype = np.float32)
+            positions = {text: row for row, text in enumerate(unique_texts)}
+            vectors = unique_vectors[[positions[text] for text in texts]]
+
+        depth = k if mode == "dense" else max(k, CANDIDATE_DEPTH)
+        pages = [None] * len(queries)
+        for group_constraints, rows in groups.items():
+            candidates = snapshot.filters.candidates(list(group_constraints))
+            if candidates is not None and not len(candidates):
+                hits = [(np.empty(0, dtype = np.int64), np.empty(0))] * len(rows)
+            elif mode == "lexical":
+                hits = [snapshot.lexical.search(parsed[i][1], k, candidates) for i in rows]
+            else:
+                hits = snapshot.index.search_batch(vectors[rows], depth, candidates)
+                if mode == "hybrid":
+                    hits = [
+                        _fuse(dense, snapshot.lexical.search(parsed[i][1], depth, candidates), k, fusion)
+                        for i, dense in zip(rows, hits)
+                    ]
+            for i, (ids, scores) in zip(rows, hits):
+                pages[i] = self._page(snapshot, queries[i], k, mode, parsed[i][0], candidates, ids, scores)
+        count("search_batch_queries", len(queries), mode = mode)
+        observe("search_batch_seconds", time.perf_counter() - start, mode = mode)
+
+        return pages
+
+
+def load_search_service(data_path: str, store_dir: str, model_name: str = DEFAULT_MODEL,
+                        encode: Encoder = None, index_backend: str = "exact", nprobe: int = 8,
+                        config: ServingConfig = None) -> SearchService:
+    """Load the cleaned dataset and its embeddings into a SearchService.
+
+    Embeddings come from the on-disk EmbeddingStore, so only racquets whose natural v2 text is
+    not cached yet are embedded at startup. The BM25 index over the same texts is saved next to
+    the embeddings (bm25.npz) and only rebuilt when the texts change, as is the IVF index (ivf/)
+    when index_backend is "ivf". The "int8" and "float16" backends quantize the embeddings at
+    startup and re-rank their shortlist against the float32 matrix.
+
+    Args:
+        data_path (str): Cleaned dataset (.csv, .parquet or .arrow).
+        store_dir (str): EmbeddingStore directory for model_name.
+        model_name (str, optional): Embedding model name. Defaults to DEFAULT_MODEL.
+        encode (Encoder, optional): Encoder to use instead of loading model_name with
+            sentence-transformers. Defaults to None.
+        index_backend (str, optional): "exact", "ivf" (approximate, for large catalogs), "int8"
+            or "float16" (quantized). Defaults to "exact".
+        nprobe (int, optional): Inverted lists scored per query by the IVF index; higher is more
+            accurate and slower. Defaults to 8.
+        config (ServingConfig, optional): Query caching and batching settings. Defaults to None
+            (ServingConfig defaults).
+
+    Raises:
+        ValueError: If index_backend is unknown.
+
+    Returns:
+        SearchService: Service ready to answer queries.
+    """
+    from src.data.storage import load_dataset
+    from src.features.combine_text import NATURAL_V2_TEMPLATE_VERSION, create_natural_combined_text_v2_batch
+
+    df = load_dataset(data_path)
+    encode = encode or sentence_transformer_encoder(model_name)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    embeddings = EmbeddingStore(store_dir).refresh(texts, encode, model_name, NATURAL_V2_TEMPLATE_VERSION)
+    lexical = load_or_build_bm25(texts, os.path.join(store_dir, "bm25.npz"))
+    if index_backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend '{index_backend}'. Choose from {list(INDEX_BACKENDS)}.")
+    index = None
+    if index_backend == "ivf":
+        index = load_or_build_ivf(
+            embeddings, os.path.join(store_dir, "ivf"), fingerprint = corpus_fingerprint([model_name, *texts]), nprobe = nprobe
+        )
+    elif index_backend in PRECISIONS:
+        index = QuantizedIndex.build(embeddings, index_backend)
+    logger.info(f"Loaded {len(df)} racquets with {embeddings.shape[1]}-d embeddings from {data_path}.")
+
+    return SearchService.from_frame(df, embeddings, encode, lexical, index, config)
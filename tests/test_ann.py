@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+
+from src.search.ann import IVFIndex, load_or_build_ivf
+
+
+def _embeddings(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((200, 8)).astype(np.float32)
+
+
+def test_save_does_not_overwrite_a_memory_mapped_index(tmp_path):
+    index_dir = str(tmp_path / "ivf")
+    IVFIndex.build(_embeddings(0), nlist = 4).save(index_dir)
+    live = IVFIndex.load(index_dir)
+    live_vectors = np.array(live.vectors)
+
+    # Same shapes, different values: a write into the mapped files would show through
+    IVFIndex.build(_embeddings(1), nlist = 4).save(index_dir)
+
+    np.testing.assert_array_equal(live.vectors, live_vectors)
+    assert not np.array_equal(IVFIndex.load(index_dir).vectors, live_vectors)
+    assert os.listdir(tmp_path) == ["ivf"]
+
+
+def test_load_or_build_rebuilds_for_new_embeddings(tmp_path):
+    index_dir = str(tmp_path / "ivf")
+    first = load_or_build_ivf(_embeddings(0), index_dir, fingerprint = "a", nlist = 4)
+    assert load_or_build_ivf(_embeddings(0), index_dir, fingerprint = "a", nlist = 4).fingerprint == "a"
+
+    second = load_or_build_ivf(_embeddings(1), index_dir, fingerprint = "b", nlist = 4)
+
+    assert (first.fingerprint, second.fingerprint) == ("a", "b")
+    assert first.search(first.vectors[0], k = 1)[0][0] == first.ids[0]
+    assert sorted(os.listdir(index_dir)) == ["centroids.npy", "ids.npy", "ivf.json", "offsets.npy", "vectors.npy"]
@@ -0,0 +1,112 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_ann import synthetic_vectors
+from benchmarks.encoder import HashingEncoder
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.search.bundle import (KEEP_BUILDS, MANIFEST_FILE, BundleWatcher, _publish, build_bundle, bundle_version,
+                               load_bundle_service, read_manifest)
+from src.search.lexical import BM25Index
+from src.search.service import SearchService, ServingConfig
+
+pytest.importorskip("pyarrow")
+
+DIM = 16
+QUERIES = ["lightweight control racquet", "powerful frame under $200", "babolat pure drive"]
+_UNCACHED = ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1)
+
+
+@pytest.fixture(scope = "module")
+def catalog():
+    df = preprocess_raw_data(synthetic_raw_catalog(300)).reset_index(drop = True)
+    texts = create_natural_combined_text_v2_batch(df).tolist()
+    return df, texts, synthetic_vectors(len(df), DIM, n_topics = 10)
+
+
+def _build(catalog, bundle_dir, **kwargs) -> dict:
+    df, texts, embeddings = catalog
+    return build_bundle(df, texts, embeddings, str(bundle_dir), "hashing", "v2", **kwargs)
+
+
+def _builds(bundle_dir) -> list[str]:
+    return sorted(name for name in os.listdir(os.path.dirname(bundle_dir)) if name.startswith("bundle.build-"))
+
+
+def _pages(service: SearchService, mode: str) -> list[list[tuple]]:
+    return [[(result["name"], result["price"]) for result in service.search(query, 5, mode = mode)["results"]]
+            for query in QUERIES]
+
+
+@pytest.mark.parametrize("backend", ["exact", "ivf", "int8"])
+def test_bundle_service_answers_like_the_in_memory_service(catalog, tmp_path, backend):
+    df, texts, embeddings = catalog
+    manifest = _build(catalog, tmp_path / "bundle", index_backend = backend, nlist = 4, nprobe = 4)
+    assert manifest == read_manifest(str(tmp_path / "bundle"))
+    assert (manifest["index"], manifest["racquets"], manifest["dim"]) == (backend, len(df), DIM)
+
+    bundled = load_bundle_service(str(tmp_path / "bundle"), encode = HashingEncoder(dim = DIM), config = _UNCACHED)
+    in_memory = SearchService.from_frame(df, embeddings, HashingEncoder(dim = DIM), BM25Index.build(texts), config = _UNCACHED)
+
+    assert _pages(bundled, "dense") == _pages(in_memory, "dense")
+    assert _pages(bundled, "lexical") == _pages(in_memory, "lexical")
+    bundled.close()
+    in_memory.close()
+
+
+def test_rebuilds_swap_the_symlink_and_prune_old_builds(catalog, tmp_path):
+    bundle_dir = str(tmp_path / "bundle")
+    _build(catalog, bundle_dir)
+    first_build = os.path.realpath(bundle_dir)
+    service = load_bundle_service(bundle_dir, encode = HashingEncoder(dim = DIM), config = _UNCACHED)
+    watcher = BundleWatcher(bundle_dir, service, on_swap = lambda new: None, config = _UNCACHED, close_after = 0)
+    assert not watcher.check()
+
+    _build(catalog, bundle_dir)
+    assert os.path.islink(bundle_dir) and os.path.realpath(bundle_dir) != first_build
+    assert watcher.check() and watcher.swaps == 1
+    # The service still serving the previous build keeps working until it is closed
+    assert len(service.search(QUERIES[0], 5, mode = "dense")["results"]) == 5
+
+    _build(catalog, bundle_dir)
+    builds = _builds(bundle_dir)
+    assert len(builds) == KEEP_BUILDS
+    assert os.path.basename(os.path.realpath(bundle_dir)) in builds
+    assert os.path.basename(first_build) not in builds
+    watcher.service.close()
+
+
+def test_publish_replaces_the_link_atomically(tmp_path):
+    for name in ("bundle.build-a", "bundle.build-b"):
+        os.makedirs(tmp_path / name)
+        with open(tmp_path / name / MANIFEST_FILE, "w", encoding = "utf-8") as f:
+            json.dump({"build": name}, f)
+    bundle_dir = str(tmp_path / "bundle")
+
+    _publish(bundle_dir, str(tmp_path / "bundle.build-a"))
+    version = bundle_version(bundle_dir)
+    _publish(bundle_dir, str(tmp_path / "bundle.build-b"))
+
+    assert os.readlink(bundle_dir) == "bundle.build-b"
+    assert bundle_version(bundle_dir) != version
+    assert sorted(os.listdir(tmp_path)) == ["bundle", "bundle.build-a", "bundle.build-b"]
+
+
+def test_rejects_plain_directories_and_other_layout_versions(catalog, tmp_path):
+    os.makedirs(tmp_path / "plain")
+    with pytest.raises(ValueError):
+        _build(catalog, tmp_path / "plain")
+    assert os.listdir(tmp_path) == ["plain"]
+
+    _build(catalog, tmp_path / "bundle")
+    manifest_path = os.path.join(os.path.realpath(tmp_path / "bundle"), MANIFEST_FILE)
+    with open(manifest_path, encoding = "utf-8") as f:
+        manifest = json.load(f)
+    with open(manifest_path, "w", encoding = "utf-8") as f:
+        json.dump({**manifest, "version": 0}, f)
+    with pytest.raises(ValueError):
+        read_manifest(str(tmp_path / "bundle"))
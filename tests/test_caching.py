@@ -0,0 +1,59 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.search.caching import MicroBatcher
+
+
+def _encoder(texts: list[str]) -> np.ndarray:
+    return np.array([[len(text), 1.0] for text in texts], dtype = np.float32)
+
+
+def test_batches_texts_into_one_encoder_call():
+    calls = []
+    batcher = MicroBatcher(lambda texts: calls.append(len(texts)) or _encoder(texts), max_batch_size = 8, max_wait_ms = 50)
+    futures = [batcher.submit(text) for text in ["a", "bb", "ccc"]]
+
+    assert [future.result(timeout = 5)[0] for future in futures] == [1, 2, 3]
+    assert sum(calls) == 3
+    batcher.close()
+
+
+def test_bad_encoder_output_fails_the_batch_and_keeps_the_worker():
+    outputs = iter([np.zeros((1, 2), dtype = np.float32), np.zeros(2, dtype = np.float32)])
+    batcher = MicroBatcher(lambda texts: next(outputs, None) if len(texts) > 1 else _encoder(texts),
+                           max_batch_size = 8, max_wait_ms = 100)
+
+    for _ in range(2):
+        futures = [batcher.submit(text) for text in ["a", "bb"]]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout = 5)
+
+    # The worker is still alive and serving new texts
+    assert batcher.submit("abcd").result(timeout = 5)[0] == 4
+    batcher.close()
+
+
+def test_close_fails_queued_and_later_futures():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_encoder(texts):
+        started.set()
+        release.wait(5)
+        return _encoder(texts)
+
+    batcher = MicroBatcher(slow_encoder, max_batch_size = 1, max_wait_ms = 0)
+    running = batcher.submit("a")
+    started.wait(5)
+    queued = [batcher.submit(text) for text in ["b", "c"]]
+    batcher.close()
+    release.set()
+
+    assert running.result(timeout = 5)[0] == 1
+    for future in queued:
+        with pytest.raises(RuntimeError):
+            future.result(timeout = 5)
+    with pytest.raises(RuntimeError):
+        batcher.submit("d").result(timeout = 5)
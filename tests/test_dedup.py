@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.dedup import (SPEC_COLUMNS, _components, collapse_variants, dedup_variants, lsh_candidate_pairs,
+                            minhash_signatures, variant_families)
+
+_DESC = "a powerful frame with easy depth and plenty of spin from the open string pattern for club players"
+
+
+def _listing(name: str, price: float, desc: str = _DESC, head_size: float = 100.0) -> dict:
+    specs = {col: 1.0 for col in SPEC_COLUMNS}
+    specs["racquet_head_size_sq_in"] = head_size
+    return {"racquet_name": name, "racquet_price": price, "racquet_colors": "Blue", "racquet_img": f"{name}.jpg",
+            "racquet_desc": desc, **specs}
+
+
+def test_minhash_estimates_jaccard_similarity():
+    words = [f"w{i}" for i in range(200)]
+    texts = pd.Series([" ".join(words), " ".join(words), " ".join(words[:100] + [f"x{i}" for i in range(100)]), "single"])
+    signatures = minhash_signatures(texts, num_perm = 256)
+
+    assert signatures.shape == (4, 256) and signatures.dtype == np.uint32
+    np.testing.assert_array_equal(signatures[0], signatures[1])
+    # 99 of the 299 distinct bigrams are shared
+    assert (signatures[0] == signatures[2]).mean() == pytest.approx(99 / 299, abs = 0.1)
+    assert (signatures[3] == 0xFFFFFFFF).all()
+    np.testing.assert_array_equal(minhash_signatures(texts, num_perm = 256), signatures)
+
+
+def test_lsh_pairs_rows_sharing_a_band_and_key():
+    signatures = np.array([[1, 2, 3, 4], [1, 2, 9, 9], [5, 6, 3, 4], [7, 7, 7, 7]], dtype = np.uint32)
+
+    assert lsh_candidate_pairs(signatures, bands = 2).tolist() == [[0, 1], [0, 2]]
+    assert lsh_candidate_pairs(signatures, bands = 2, keys = np.array([1, 2, 1, 1])).tolist() == [[0, 2]]
+    with pytest.raises(ValueError):
+        lsh_candidate_pairs(signatures, bands = 3)
+
+
+def test_lsh_caps_large_buckets():
+    pairs = lsh_candidate_pairs(np.zeros((10, 4), dtype = np.uint32), bands = 2, max_bucket = 3)
+
+    # Each row is paired with the next two rows of its bucket only
+    assert sorted(map(tuple, pairs.tolist())) == [(i, j) for i in range(10) for j in (i + 1, i + 2) if j < 10]
+
+
+def test_components_label_rows_with_their_smallest_row():
+    labels = _components(7, np.array([[4, 5], [1, 3], [3, 6], [5, 2]]))
+
+    assert labels.tolist() == [0, 1, 2, 1, 2, 2, 1]
+    assert _components(3, np.empty((0, 2), dtype = np.int64)).tolist() == [0, 1, 2]
+
+
+def test_collapse_keeps_the_shortest_cheapest_listing_per_family():
+    df = pd.DataFrame([
+        _listing("Pure Drive Pink", 199.0),
+        _listing("Pure Drive", 229.0),
+        _listing("Speed MP", 249.0, desc = "a fast whippy frame", head_size = 98.0),
+        _listing("Pure Drive", 209.0),
+    ])
+    collapsed = collapse_variants(df, np.array([0, 0, 2, 0]))
+
+    assert list(collapsed["racquet_name"]) == ["Speed MP", "Pure Drive"]
+    assert list(collapsed["racquet_price"]) == [249.0, 209.0]
+    assert list(collapsed["racquet_family_size"]) == [1, 3]
+    assert json.loads(collapsed["racquet_variants"][0]) == []
+    assert [variant["name"] for variant in json.loads(collapsed["racquet_variants"][1])] == ["Pure Drive Pink", "Pure Drive"]
+
+
+def test_dedup_groups_variants_with_equal_specs_and_similar_descriptions():
+    df = pd.DataFrame([
+        _listing("Pure Drive", 229.0),
+        _listing("Pure Drive Pink", 229.0, desc = _DESC + " in a pink colorway"),
+        _listing("Pure Drive 107", 229.0, head_size = 107.0),
+        _listing("Speed MP", 249.0, desc = "a fast whippy frame for advanced players who swing big"),
+    ])
+
+    assert variant_families(df).tolist() == [0, 0, 2, 3]
+    assert list(dedup_variants(df)["racquet_family_size"]) == [2, 1, 1]
+
+
+def test_dedup_of_an_empty_catalog():
+    df = pd.DataFrame([_listing("Pure Drive", 229.0)]).iloc[:0]
+    collapsed = dedup_variants(df)
+
+    assert len(collapsed) == 0
+    assert {"racquet_family_size", "racquet_variants"} <= set(collapsed.columns)
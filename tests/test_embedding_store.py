@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.features.embedding_store import EmbeddingStore
+
+
+def _encoder(texts: list[str]) -> np.ndarray:
+    return np.array([[len(text), text.count("a"), 1.0] for text in texts], dtype = np.float32)
+
+
+def test_refresh_reuses_cached_rows_across_reopens(tmp_path):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return _encoder(texts)
+
+    first = EmbeddingStore(str(tmp_path)).refresh(["a", "bb", "aaa"], encode, "model", "v1")
+    second = EmbeddingStore(str(tmp_path)).refresh(["aaa", "dddd", "a"], encode, "model", "v1")
+
+    assert calls == [["a", "bb", "aaa"], ["dddd"]]
+    np.testing.assert_array_equal(first, _encoder(["a", "bb", "aaa"]))
+    np.testing.assert_array_equal(second, _encoder(["aaa", "dddd", "a"]))
+    assert len(EmbeddingStore(str(tmp_path))) == 3
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("vectors-")]) == 1
+
+
+def test_crash_before_the_index_swap_keeps_the_previous_store(tmp_path, monkeypatch):
+    EmbeddingStore(str(tmp_path)).refresh(["a", "bb", "aaa"], _encoder, "model", "v1")
+
+    replace = os.replace
+
+    def crash_on_index(src, dst):
+        if os.path.basename(dst) == "index.json":
+            raise OSError("simulated crash")
+        replace(src, dst)
+
+    # Everything else is written, then the process dies before index.json is replaced
+    monkeypatch.setattr(os, "replace", crash_on_index)
+    with pytest.raises(OSError):
+        EmbeddingStore(str(tmp_path)).refresh(["zz", "a"], _encoder, "model", "v1")
+    monkeypatch.undo()
+
+    store = EmbeddingStore(str(tmp_path))
+    np.testing.assert_array_equal(store.refresh(["a", "bb", "aaa"], _encoder, "model", "v1"), _encoder(["a", "bb", "aaa"]))
+
+
+def test_concurrent_writer_keeps_the_file_its_index_will_name(tmp_path):
+    EmbeddingStore(str(tmp_path)).refresh(["a", "bb"], _encoder, "model", "v1")
+    first, second = EmbeddingStore(str(tmp_path)), EmbeddingStore(str(tmp_path))
+
+    replace = os.replace
+    interleaved = []
+
+    def other_writer_first(src, dst):
+        # The first store finishes a whole refresh between the second one writing its matrix and its index
+        if os.path.basename(dst) == "index.json" and not interleaved:
+            interleaved.append(dst)
+            first.refresh(["a", "ccc"], _encoder, "model", "v1")
+        replace(src, dst)
+
+    os.replace = other_writer_first
+    try:
+        second.refresh(["bb", "dddd"], _encoder, "model", "v1")
+    finally:
+        os.replace = replace
+
+    # The last index wins and its matrix survives; the other writer's file is at worst left unnamed
+    store = EmbeddingStore(str(tmp_path))
+    np.testing.assert_array_equal(store.refresh(["bb", "dddd"], _encoder, "model", "v1"), _encoder(["bb", "dddd"]))
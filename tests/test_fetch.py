@@ -0,0 +1,216 @@
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pandas as pd
+import pytest
+import requests
+
+from benchmarks.fixture_site import FixtureSite, serve_fixture_site
+from src.data.cache import PageCache
+from src.data.fetch import Fetcher, FetchConfig
+from src.data.scrape import (_get_brand_page_records, _get_brand_URLs, _scrape_concurrently, merge_scrape_delta,
+                             scrape_tw_rackets_incremental)
+
+
+class _FlakyServer:
+    """Local server answering each path with a scripted list of statuses, then 200.
+
+    Records the path and arrival time of every request.
+    """
+
+    def __init__(self, statuses: dict[str, list[int]] = None, retry_after: str = None):
+        self.statuses = {path: list(codes) for path, codes in (statuses or {}).items()}
+        self.retry_after = retry_after
+        self.arrivals = []
+        self._lock = threading.Lock()
+
+    def handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.arrivals.append((self.path, time.monotonic()))
+                    codes = server.statuses.get(self.path, [])
+                    status = codes.pop(0) if codes else 200
+                body = f"{self.path} {status}".encode()
+                self.send_response(status)
+                if status != 200 and server.retry_after is not None:
+                    self.send_header("Retry-After", server.retry_after)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return _Handler
+
+    def arrival_times(self, path: str = None) -> list[float]:
+        return [arrival for arrival_path, arrival in self.arrivals if path in (None, arrival_path)]
+
+
+@contextmanager
+def _serve(flaky: _FlakyServer) -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), flaky.handler())
+    server.daemon_threads = True
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _config(**overrides) -> FetchConfig:
+    settings = {"requests_per_second": 0, "backoff_factor": 0.01, "timeout": 5.0}
+    return FetchConfig(**{**settings, **overrides})
+
+
+# Helper function to measure how long a burst of requests took to arrive. At 20 requests per second,
+# n request starts need at least (n - 1) * 50 ms; 10% is left for timer jitter.
+def _spread(arrivals: list[float]) -> float:
+    return max(arrivals) - min(arrivals)
+
+
+def test_concurrent_scrape_matches_sequential_scrape():
+    with serve_fixture_site(FixtureSite(n_products = 12, n_brands = 3)) as shop_all_URL:
+        sequential_df = pd.DataFrame.from_records([
+            record
+            for brand_URL in _get_brand_URLs(shop_all_URL)
+            for record in _get_brand_page_records(brand_URL)
+        ])
+        concurrent_df = _scrape_concurrently(shop_all_URL, fetch_config = _config(max_workers = 4))
+
+    assert len(concurrent_df) == 12
+    pd.testing.assert_frame_equal(concurrent_df, sequential_df)
+
+
+def test_retries_retryable_statuses():
+    flaky = _FlakyServer({"/page": [503, 429]})
+    with _serve(flaky) as base_URL, Fetcher(_config()) as fetcher:
+        response = fetcher.get(f"{base_URL}/page")
+
+    assert response.status_code == 200
+    assert response.content == b"/page 200"
+    assert len(flaky.arrival_times("/page")) == 3
+
+
+def test_gives_up_after_configured_retries():
+    flaky = _FlakyServer({"/page": [500] * 10})
+    with _serve(flaky) as base_URL, Fetcher(_config(retries = 2)) as fetcher:
+        with pytest.raises(requests.HTTPError):
+            fetcher.get(f"{base_URL}/page")
+
+    assert len(flaky.arrival_times("/page")) == 3
+
+
+def test_does_not_retry_client_errors():
+    flaky = _FlakyServer({"/missing": [404]})
+    with _serve(flaky) as base_URL, Fetcher(_config()) as fetcher:
+        with pytest.raises(requests.HTTPError):
+            fetcher.get(f"{base_URL}/missing")
+
+    assert len(flaky.arrival_times("/missing")) == 1
+
+
+def test_backoff_grows_and_honors_retry_after():
+    flaky = _FlakyServer({"/page": [503, 503]})
+    with _serve(flaky) as base_URL, Fetcher(_config(backoff_factor = 0.1)) as fetcher:
+        fetcher.get(f"{base_URL}/page")
+    first, second, third = flaky.arrival_times("/page")
+    assert second - first >= 0.1
+    assert third - second >= 0.2
+
+    flaky = _FlakyServer({"/page": [503]}, retry_after = "0.3")
+    with _serve(flaky) as base_URL, Fetcher(_config(backoff_factor = 0.01)) as fetcher:
+        fetcher.get(f"{base_URL}/page")
+    first, second = flaky.arrival_times("/page")
+    assert second - first >= 0.3
+
+
+def test_rate_limit_spaces_request_starts():
+    flaky = _FlakyServer()
+    with _serve(flaky) as base_URL, Fetcher(_config(max_workers = 6, per_host_concurrency = 6,
+                                                    requests_per_second = 20)) as fetcher:
+        list(fetcher.map(fetcher.get, [f"{base_URL}/page{i}" for i in range(6)]))
+
+    arrivals = sorted(flaky.arrival_times())
+    assert len(arrivals) == 6
+    assert _spread(arrivals) >= 5 * 0.05 * 0.9
+
+
+def test_retries_go_through_the_rate_limit():
+    flaky = _FlakyServer({f"/page{i}": [503, 503] for i in range(3)})
+    with _serve(flaky) as base_URL, Fetcher(_config(max_workers = 3, per_host_concurrency = 3,
+                                                    requests_per_second = 20, backoff_factor = 0.0)) as fetcher:
+        list(fetcher.map(fetcher.get, [f"{base_URL}/page{i}" for i in range(3)]))
+
+    arrivals = sorted(flaky.arrival_times())
+    assert len(arrivals) == 9
+    assert _spread(arrivals) >= 8 * 0.05 * 0.9
+
+
+def test_backoff_releases_the_host_slot():
+    flaky = _FlakyServer({"/failing": [503]})
+    with _serve(flaky) as base_URL, Fetcher(_config(per_host_concurrency = 1, backoff_factor = 0.5)) as fetcher:
+        failing = threading.Thread(target = fetcher.get, args = (f"{base_URL}/failing",))
+        failing.start()
+        while not flaky.arrival_times("/failing"):
+            time.sleep(0.01)
+        fetcher.get(f"{base_URL}/healthy")
+        failing.join()
+
+    # The healthy page was fetched during the failing page's backoff, not after its retry
+    assert flaky.arrival_times("/healthy")[0] < flaky.arrival_times("/failing")[1]
+
+
+def test_uncached_not_modified_is_fetched_in_full(tmp_path):
+    flaky = _FlakyServer({"/page": [304]})
+    cache = PageCache(str(tmp_path))
+    with _serve(flaky) as base_URL, Fetcher(_config()) as fetcher:
+        body, changed = fetcher.get_conditional(f"{base_URL}/page", cache)
+
+    assert (body, changed) == (b"/page 200", True)
+    assert cache.body(f"{base_URL}/page") == b"/page 200"
+    assert len(flaky.arrival_times("/page")) == 2
+
+
+def test_unconditional_not_modified_is_an_error(tmp_path):
+    flaky = _FlakyServer({"/page": [304, 304]})
+    cache = PageCache(str(tmp_path))
+    with _serve(flaky) as base_URL, Fetcher(_config()) as fetcher:
+        with pytest.raises(requests.HTTPError):
+            fetcher.get_conditional(f"{base_URL}/page", cache)
+
+    assert f"{base_URL}/page" not in cache
+
+
+def test_incremental_delta_merges_on_product_URL(tmp_path):
+    site = FixtureSite(n_products = 6, n_brands = 2)
+    with serve_fixture_site(site) as shop_all_URL:
+        previous_df = scrape_tw_rackets_incremental(shop_all_URL, str(tmp_path), fetch_config = _config()).full
+        kept_URL, changed_URL = (URL for URL in previous_df["racquet_url"] if URL.endswith(("/product0.html", "/product1.html")))
+
+        # Two listings share a racquet name and only one of them changes
+        name = site.records[0]["racquet_name"]
+        site.records[1]["racquet_name"] = name
+        site.records[1]["racquet_price"] += 10.0
+        previous_df.loc[previous_df["racquet_url"] == changed_URL, "racquet_name"] = name
+        delta = scrape_tw_rackets_incremental(shop_all_URL, str(tmp_path), fetch_config = _config())
+
+    assert list(delta.changed.index) == [changed_URL]
+    merged_df = merge_scrape_delta(previous_df, delta)
+    previous_prices = previous_df.set_index("racquet_url")["racquet_price"]
+    merged_prices = merged_df.set_index("racquet_url")["racquet_price"]
+    assert sorted(merged_prices.index) == sorted(previous_prices.index)
+    assert merged_prices[kept_URL] == previous_prices[kept_URL]
+    assert merged_prices[changed_URL] == previous_prices[changed_URL] + 10.0
+
+    with pytest.raises(ValueError):
+        merge_scrape_delta(previous_df.drop(columns = "racquet_url"), delta)
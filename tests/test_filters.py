@@ -0,0 +1,73 @@
+import pandas as pd
+
+from src.data.preprocess import preprocess_raw_data
+from src.search.filters import Constraint, FilterEngine, parse_query_filters
+
+# Scraped "Balance" specs of the listings, in the site's format
+_BALANCES = {
+    "Babolat Pure Drive 2025": "12.99in / 32.99cm / 4 pts HL",
+    "Head Speed MP 2024": "13.1in / 33.27cm / 4 pts HL",
+    "Wilson Clash 108 v3": "13.5in / 34.29cm / 1 pts HH",
+    "Yonex Ezone 100 Even": "13.5in / 34.29cm / 0 pts EB",
+}
+
+
+def _preprocessed_rows() -> pd.DataFrame:
+    raw_df = pd.DataFrame([
+        {
+            "racquet_img": f"https://img.tennis-warehouse.com/watermark/rs.php?path=R{i}-1.jpg&nw=455",
+            "racquet_name": name,
+            "racquet_rating": 4.5,
+            "racquet_price": 179.0 + 50 * i,
+            "racquet_desc": " A racquet. ",
+            "Head Size": "100 in² / 645.16 cm²",
+            "Length": "27in / 68.58cm",
+            "Strung Weight": "11.2oz / 318g",
+            "Balance": balance,
+            "Swingweight": 317.0,
+            "Stiffness": "66",
+            "Beam Width": "23mm / 26mm / 23mm",
+            "Composition": "Graphite",
+            "Power Level": "Medium",
+            "Stroke Style": "Medium-Full",
+            "Swing Speed": "Medium-Fast",
+            "Racquet Colors": "Blue",
+            "Grip Type": "Syntec Pro",
+            "String Pattern": "16 Mains / 19 Crosses",
+            "String Tension": "46-55 pounds",
+        }
+        for i, (name, balance) in enumerate(_BALANCES.items())
+    ])
+    return preprocess_raw_data(raw_df).reset_index(drop = True)
+
+
+def _matching_names(query: str) -> set[str]:
+    df = _preprocessed_rows()
+    constraints, _ = parse_query_filters(query)
+    return set(df["racquet_name"][FilterEngine.from_frame(df).mask(constraints)])
+
+
+def test_head_light_query_matches_head_light_rows():
+    assert _matching_names("head light racquet") == {"Babolat Pure Drive 2025", "Head Speed MP 2024"}
+
+
+def test_head_light_query_combines_with_price():
+    assert _matching_names("head light racquet under $200") == {"Babolat Pure Drive 2025"}
+
+
+def test_head_heavy_and_even_balance_queries():
+    assert _matching_names("head heavy frame") == {"Wilson Clash 108 v3"}
+    assert _matching_names("evenly balanced frame") == {"Yonex Ezone 100 Even"}
+
+
+def test_bare_comparator_before_a_counted_noun_is_not_a_price():
+    for query in ("racquet with at least 4 stars", "at least 2 racquets", "over 300 grams"):
+        constraints, text = parse_query_filters(query)
+        assert not [constraint for constraint in constraints if constraint.field == "price"]
+        assert text == query
+    assert parse_query_filters("racquets under 200 with spin") == ([Constraint("price", "<=", 200)], "racquets with spin")
+
+
+def test_price_keyword_consumes_a_trailing_currency_word():
+    assert parse_query_filters("price under 200 dollars") == ([Constraint("price", "<=", 200)], "")
+    assert parse_query_filters("cost at least 150 usd, spin racquet") == ([Constraint("price", ">=", 150)], "spin racquet")
@@ -0,0 +1,237 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.search.incremental as incremental_module
+from benchmarks.bench_ann import synthetic_vectors
+from benchmarks.encoder import HashingEncoder
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_data
+from src.features.combine_text import create_natural_combined_text_v2_batch
+from src.search.dense import DenseIndex
+from src.search.incremental import IncrementalIndex, SegmentedIndex, racquet_id
+from src.search.lexical import BM25Index
+from src.search.service import SearchService, ServingConfig
+
+DIM = 16
+QUERIES = ["lightweight control racquet", "powerful head heavy frame", "spin friendly racquet under $200",
+           "babolat pure drive", "arm friendly flexible frame"]
+_UNCACHED = ServingConfig(query_cache_size = 0, result_cache_size = 0, max_batch_size = 1)
+
+
+class _Catalog:
+    """Rows and vectors keyed by racquet_id(), updated alongside an IncrementalIndex so every step can
+    be compared with a service rebuilt from scratch."""
+
+    def __init__(self, n_rows: int):
+        df = preprocess_raw_data(synthetic_raw_catalog(n_rows)).reset_index(drop = True)
+        vectors = synthetic_vectors(len(df), DIM, n_topics = 8)
+        self.rows = {_row_id(row): (row, vector) for (_, row), vector in zip(df.iterrows(), vectors)}
+
+    def frame(self) -> tuple[pd.DataFrame, np.ndarray]:
+        rows, vectors = zip(*self.rows.values())
+        return pd.DataFrame(list(rows)).reset_index(drop = True), np.array(vectors)
+
+    def upsert(self, df: pd.DataFrame, vectors: np.ndarray):
+        for (_, row), vector in zip(df.iterrows(), vectors):
+            self.rows[_row_id(row)] = (row, vector)
+
+    def delete(self, ids: list[str]):
+        for racquet in ids:
+            self.rows.pop(racquet, None)
+
+    def service(self, config: ServingConfig = _UNCACHED) -> SearchService:
+        df, vectors = self.frame()
+        lexical = BM25Index.build(create_natural_combined_text_v2_batch(df).tolist())
+        return SearchService.from_frame(df, vectors, HashingEncoder(dim = DIM), lexical, config = config)
+
+
+def _row_id(row: pd.Series) -> str:
+    return racquet_id(row["racquet_name"], row["racquet_img"])
+
+
+def _result_ids(page: dict) -> list[str]:
+    return [racquet_id(result["name"], result["image"]) for result in page["results"]]
+
+
+def _lexical_matches(service: SearchService, query: str) -> set[str]:
+    scores = service.lexical.scores(query)
+    return {racquet_id(service.records[row]["name"], service.records[row]["image"]) for row in np.flatnonzero(scores > 0)}
+
+
+# Helper function to check that the incremental service answers like a service rebuilt over the same rows.
+# BM25 weights keep the last full build's statistics, so lexical results are compared as match sets
+def _assert_matches_rebuild(service: SearchService, catalog: _Catalog, k: int = 5):
+    rebuilt = catalog.service()
+    for query in QUERIES:
+        assert _result_ids(service.search(query, k, mode = "dense")) == _result_ids(rebuilt.search(query, k, mode = "dense"))
+        assert _lexical_matches(service, query) == _lexical_matches(rebuilt, query)
+    batch = service.search_batch(QUERIES, k, mode = "dense")
+    assert [_result_ids(page) for page in batch] == [_result_ids(rebuilt.search(query, k, mode = "dense")) for query in QUERIES]
+    rebuilt.close()
+
+
+# Helper function to make changed copies of existing rows and brand-new rows with their vectors
+def _changes(catalog: _Catalog, changed: int, added: int, seed: int) -> tuple[pd.DataFrame, np.ndarray]:
+    df, _ = catalog.frame()
+    rows = df.sample(changed + added, random_state = seed).reset_index(drop = True)
+    rows["racquet_price"] = rows["racquet_price"] * 0.9
+    rows.loc[changed:, "racquet_img"] = rows.loc[changed:, "racquet_img"].str.replace("SYN", f"NEW{seed}X")
+    return rows, synthetic_vectors(len(rows), DIM, n_topics = 8, seed = seed + 1)
+
+
+def _some_ids(catalog: _Catalog, n: int, seed: int) -> list[str]:
+    return list(np.random.default_rng(seed).choice(list(catalog.rows), n, replace = False))
+
+
+# Helper function to make IncrementalIndex's merge block on its first call until released
+def _block_first_merge(monkeypatch) -> tuple[threading.Event, threading.Event]:
+    merging, release = threading.Event(), threading.Event()
+    merge_vectors = incremental_module._merge_vectors
+    calls = []
+
+    def blocking_merge(*args):
+        calls.append(1)
+        if len(calls) == 1:
+            merging.set()
+            release.wait(10)
+        return merge_vectors(*args)
+
+    monkeypatch.setattr(incremental_module, "_merge_vectors", blocking_merge)
+    return merging, release
+
+
+def test_updates_and_compaction_match_a_full_rebuild():
+    catalog = _Catalog(300)
+    service = catalog.service()
+    index = IncrementalIndex(service, background = False)
+
+    rows, vectors = _changes(catalog, changed = 10, added = 5, seed = 1)
+    assert index.upsert(rows, vectors) == 10
+    catalog.upsert(rows, vectors)
+    # More tombstones than the capped search depth covers
+    gone = _some_ids(catalog, 40, seed = 2)
+    assert index.delete(gone) == 40
+    catalog.delete(gone)
+    assert index.stats()["tombstones"] == 50
+    _assert_matches_rebuild(service, catalog)
+
+    index.compact()
+    assert (index.stats()["delta_rows"], index.stats()["tombstones"], len(index)) == (0, 0, len(catalog.rows))
+    _assert_matches_rebuild(service, catalog)
+    service.close()
+
+
+def test_updates_during_compaction_are_carried_over(monkeypatch):
+    catalog = _Catalog(300)
+    service = catalog.service()
+    index = IncrementalIndex(service, background = False)
+    rows, vectors = _changes(catalog, changed = 5, added = 5, seed = 3)
+    index.upsert(rows, vectors)
+    catalog.upsert(rows, vectors)
+    index.delete(gone := _some_ids(catalog, 5, seed = 4))
+    catalog.delete(gone)
+
+    merging, release = _block_first_merge(monkeypatch)
+    compactor = threading.Thread(target = index.compact)
+    compactor.start()
+    assert merging.wait(10)
+    # Replace and delete rows of both the base and the delta being merged, and add new ones
+    late_rows, late_vectors = _changes(catalog, changed = 6, added = 3, seed = 5)
+    index.upsert(late_rows, late_vectors)
+    catalog.upsert(late_rows, late_vectors)
+    late_gone = _some_ids(catalog, 4, seed = 6) + [_row_id(rows.iloc[-1])]
+    index.delete(late_gone)
+    catalog.delete(late_gone)
+    release.set()
+    compactor.join(10)
+
+    assert index.compactions == 1
+    assert index.stats()["delta_rows"] == 9
+    assert sorted(index.ids()) == sorted(catalog.rows)
+    _assert_matches_rebuild(service, catalog)
+    index.compact()
+    _assert_matches_rebuild(service, catalog)
+    service.close()
+
+
+def test_compact_waits_for_a_running_background_compaction(monkeypatch):
+    catalog = _Catalog(300)
+    service = catalog.service()
+    index = IncrementalIndex(service, compact_rows = 10)
+    merging, release = _block_first_merge(monkeypatch)
+
+    rows, vectors = _changes(catalog, changed = 8, added = 4, seed = 7)
+    index.upsert(rows, vectors)
+    catalog.upsert(rows, vectors)
+    assert merging.wait(10)
+    late_rows, late_vectors = _changes(catalog, changed = 2, added = 1, seed = 8)
+    index.upsert(late_rows, late_vectors)
+    catalog.upsert(late_rows, late_vectors)
+
+    explicit = threading.Thread(target = index.compact)
+    explicit.start()
+    explicit.join(0.2)
+    assert explicit.is_alive()
+    release.set()
+    explicit.join(10)
+    index._compactor.join(10)
+
+    assert index.compactions == 2
+    assert (index.stats()["delta_rows"], index.stats()["tombstones"]) == (0, 0)
+    _assert_matches_rebuild(service, catalog)
+    service.close()
+
+
+def test_segmented_search_caps_depth_and_requeries_short_pages():
+    vectors = synthetic_vectors(400, DIM, n_topics = 8)
+    base, delta = DenseIndex(vectors[:300]), DenseIndex(vectors[300:])
+    query = vectors[0]
+    exact = DenseIndex(vectors)
+    depths = []
+    search = base.search
+    base.search = lambda query_vector, k = 10, candidates = None: depths.append(k) or search(query_vector, k, candidates)
+
+    # Tombstones far from the query: one capped search per segment
+    far = np.argsort(exact.matrix @ exact.matrix[0])[:100]
+    ids, _ = SegmentedIndex(base, delta, np.sort(far)).search(query, k = 5)
+    assert depths == [25]
+    assert list(ids) == [row for row in exact.search(query, 400)[0] if row not in far][:5]
+
+    # The query's 30 nearest rows are tombstoned: the capped page comes up short and is re-run in full
+    depths.clear()
+    near = exact.search(query, 30)[0]
+    ids, _ = SegmentedIndex(base, delta, np.sort(near)).search(query, k = 5)
+    assert depths == [25, 35]
+    assert list(ids) == list(exact.search(query, 35)[0][30:])
+
+
+def test_swap_never_serves_a_page_cached_from_the_previous_snapshot():
+    catalog = _Catalog(200)
+    service = catalog.service(ServingConfig(max_batch_size = 1))
+    index = IncrementalIndex(service, background = False)
+    page = service.search(QUERIES[0], 5, mode = "dense")
+    assert service.search(QUERIES[0], 5, mode = "dense")["cached"]
+
+    generation = service.snapshot.generation
+    index.delete([_result_ids(page)[0]])
+    assert service.snapshot.generation == service.generation == generation + 1
+    fresh = service.search(QUERIES[0], 5, mode = "dense")
+    assert not fresh["cached"]
+    assert _result_ids(fresh) == _result_ids(page)[1:] + _result_ids(fresh)[4:]
+    service.close()
+
+
+@pytest.mark.parametrize("k", [1, 5])
+def test_deleting_every_row_leaves_empty_results(k):
+    catalog = _Catalog(60)
+    service = catalog.service()
+    index = IncrementalIndex(service, background = False)
+    index.delete(list(catalog.rows))
+
+    assert service.search(QUERIES[0], k, mode = "dense")["results"] == []
+    index.compact()
+    assert len(index) == 0
+    service.close()
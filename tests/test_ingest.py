@@ -0,0 +1,131 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.encoder import HashingEncoder
+from benchmarks.fixture_site import FixtureSite, serve_fixture_site
+from src.data.fetch import FetchConfig
+from src.ingest import IngestConfig, IngestPipeline, IngestSnapshot, load_snapshot
+from src.instrumentation import REGISTRY
+from src.search.incremental import racquet_id
+
+DIM = 16
+_FETCH = FetchConfig(requests_per_second = 0, max_workers = 4, timeout = 5.0)
+
+
+class _FailingEncoder(HashingEncoder):
+    """Embeds the first calls, then raises."""
+
+    def __init__(self, fail_after: int, **kwargs):
+        super().__init__(dim = DIM, **kwargs)
+        self.fail_after = fail_after
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        if self.calls >= self.fail_after:
+            raise RuntimeError("encoder crashed")
+        return super().__call__(texts)
+
+
+def _config(**overrides) -> IngestConfig:
+    settings = {"queue_size": 4, "batch_size": 4, "embed_batch_size": 4, "max_batch_wait": 0.05, "compact_rows": 8}
+    return IngestConfig(**{**settings, **overrides})
+
+
+# Helper function to run a pipeline on a thread, failing the test instead of hanging if it never returns
+def _run(pipeline: IngestPipeline, shop_all_URL: str, **kwargs):
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = pipeline.run(shop_all_URL, **kwargs)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target = target, daemon = True)
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive(), "ingest pipeline did not shut down"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _ids(df) -> set[str]:
+    return {racquet_id(name, image) for name, image in df[["racquet_name", "racquet_img"]].values}
+
+
+def test_ingest_indexes_and_snapshots_the_catalog(tmp_path):
+    site = FixtureSite(n_products = 30, n_brands = 3)
+    with serve_fixture_site(site) as shop_all_URL:
+        pipeline = IngestPipeline(HashingEncoder(dim = DIM), snapshot_dir = str(tmp_path), config = _config(),
+                                  fetch_config = _FETCH)
+        result = _run(pipeline, shop_all_URL)
+
+    assert result.stats["product_pages"] == result.stats["pages_fetched"] == 30
+    assert result.stats["rows"] == len(result.df) == len(result.texts) == len(result.embeddings) > 0
+    # Compacted between batches and once more at the end, never in the background
+    assert pipeline.index.compactions >= 2
+    assert pipeline.index.stats()["delta_rows"] == pipeline.index.stats()["tombstones"] == 0
+    assert set(pipeline.index.ids()) == _ids(result.df)
+    assert len(pipeline.service.search("racquet", k = 5, mode = "dense")["results"]) == 5
+
+    df, embeddings, manifest = load_snapshot(str(tmp_path))
+    assert manifest["complete"] and manifest["rows"] == len(result.df)
+    assert list(df["racquet_name"]) == list(result.df["racquet_name"])
+    np.testing.assert_array_equal(embeddings, result.embeddings)
+
+
+def test_failing_stage_stops_the_pipeline_and_keeps_a_partial_snapshot(tmp_path):
+    site = FixtureSite(n_products = 60, n_brands = 3)
+    encoder = _FailingEncoder(fail_after = 2)
+    before = REGISTRY.counter("ingest_queue_full_total").value(stage = "fetch")
+    with serve_fixture_site(site) as shop_all_URL:
+        # One-item queues and a slow encoder: upstream stages are blocked on full queues when it fails
+        pipeline = IngestPipeline(encoder, snapshot_dir = str(tmp_path),
+                                  config = _config(queue_size = 1, batch_size = 2, embed_batch_size = 2),
+                                  fetch_config = _FETCH)
+        encoder.seconds_per_call = 0.2
+        with pytest.raises(RuntimeError, match = "encoder crashed"):
+            _run(pipeline, shop_all_URL)
+
+    assert REGISTRY.counter("ingest_queue_full_total").value(stage = "fetch") > before
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("ingest-")]
+    df, embeddings, manifest = load_snapshot(str(tmp_path))
+    assert not manifest["complete"]
+    assert 0 < manifest["rows"] == len(df) == len(embeddings) < len(site.records)
+    assert set(pipeline.index.ids()) == _ids(df)
+
+
+def test_reingest_prunes_racquets_no_longer_listed():
+    site = FixtureSite(n_products = 24, n_brands = 3)
+    with serve_fixture_site(site) as shop_all_URL:
+        first_pipeline = IngestPipeline(HashingEncoder(dim = DIM), config = _config(), fetch_config = _FETCH)
+        first = _run(first_pipeline, shop_all_URL)
+        del site.records[18:]
+        pipeline = IngestPipeline(HashingEncoder(dim = DIM), service = first_pipeline.service, config = _config(),
+                                  fetch_config = _FETCH)
+        second = _run(pipeline, shop_all_URL)
+
+    assert set(pipeline.index.ids()) == _ids(second.df)
+    assert second.stats["pruned"] == len(_ids(first.df) - _ids(second.df)) > 0
+    assert not pipeline.index.stats()["tombstones"]
+
+
+def test_snapshot_round_trip_and_empty_snapshot(tmp_path):
+    snapshot = IngestSnapshot(str(tmp_path), "model")
+    df, embeddings, manifest = load_snapshot(str(tmp_path))
+    assert len(df) == 0 and embeddings.shape == (0, 0) and not manifest["complete"]
+
+    rows = pd.DataFrame(FixtureSite(n_products = 3).records)[["racquet_name", "racquet_price"]]
+    vectors = np.arange(6 * DIM, dtype = np.float32).reshape(6, DIM)
+    snapshot.append(rows, vectors[:3])
+    snapshot.append(rows, vectors[3:])
+    snapshot.close()
+
+    df, embeddings, manifest = load_snapshot(str(tmp_path))
+    assert manifest == {"model": "model", "template_version": manifest["template_version"], "rows": 6, "dim": DIM,
+                        "complete": True}
+    assert list(df["racquet_name"]) == list(rows["racquet_name"]) * 2
+    np.testing.assert_array_equal(embeddings, vectors)
@@ -0,0 +1,82 @@
+import math
+import threading
+
+import pytest
+
+from src.instrumentation import REGISTRY, Registry, timed
+
+
+def test_timed_records_blocks_and_functions():
+    with timed("test_block", stage = "a") as timer:
+        pass
+
+    @timed("test_function", builder = "v2")
+    def work(value):
+        return value * 2
+
+    assert work(21) == 42
+    assert timer.seconds >= 0
+    assert REGISTRY.histogram("test_block_seconds").snapshot()["stage=a"]["count"] >= 1
+    assert REGISTRY.histogram("test_function_seconds").snapshot()["builder=v2"]["count"] >= 1
+
+    with pytest.raises(RuntimeError):
+        with timed("test_failing", stage = "b"):
+            raise RuntimeError("boom")
+    assert REGISTRY.histogram("test_failing_seconds").snapshot()["stage=b"]["count"] >= 1
+
+
+def test_histogram_quantiles_use_bucket_upper_bounds():
+    histogram = Registry().histogram("latency_seconds", buckets = (0.1, 0.5, 1.0))
+    assert histogram.quantile(0.5) is None
+
+    for value in [0.05] * 50 + [0.3] * 40 + [0.8] * 9 + [5.0]:
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.9) == 0.5
+    assert histogram.quantile(0.99) == 1.0
+    assert histogram.quantile(1.0) == math.inf
+    assert histogram.snapshot()[""] == {"count": 100, "sum": pytest.approx(26.7), "p50": 0.1, "p99": 1.0}
+
+
+def test_render_prometheus_exposition_format():
+    registry = Registry()
+    registry.counter("pages_total", "Pages fetched.").inc(3, status = 200)
+    registry.gauge("queue_depth").set(2.5, stage = 'say "hi"')
+    histogram = registry.histogram("encode_seconds", buckets = (0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(2.0)
+
+    assert registry.render_prometheus({"cache_hit_rate": 0.75}).splitlines() == [
+        "# TYPE encode_seconds histogram",
+        'encode_seconds_bucket{le="0.1"} 1',
+        'encode_seconds_bucket{le="1"} 1',
+        'encode_seconds_bucket{le="+Inf"} 2',
+        "encode_seconds_sum 2.05",
+        "encode_seconds_count 2",
+        "# HELP pages_total Pages fetched.",
+        "# TYPE pages_total counter",
+        'pages_total{status="200"} 3',
+        "# TYPE queue_depth gauge",
+        'queue_depth{stage="say \\"hi\\""} 2.5',
+        "# TYPE cache_hit_rate gauge",
+        "cache_hit_rate 0.75",
+    ]
+
+
+def test_render_while_metrics_are_registered():
+    registry = Registry()
+    registry.counter("first_total").inc()
+
+    def register():
+        for i in range(20_000):
+            registry.counter(f"metric_{i}_total").inc()
+
+    thread = threading.Thread(target = register)
+    thread.start()
+    # Rendering copies the metrics under the registry lock, so registrations never change the dict it iterates
+    while thread.is_alive():
+        registry.render_prometheus()
+        registry.snapshot()
+    thread.join()
+    assert len(registry.snapshot()) == 20_001
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from src.search.lexical import BM25Index
+
+TEXTS = [
+    "head light control racquet for advanced players",
+    "powerful oversize racquet for beginners",
+    "spin friendly racquet with an open string pattern",
+]
+
+
+@pytest.mark.parametrize("name", ["bm25.npz", "bm25"])
+def test_save_and_load_round_trip(tmp_path, name):
+    index = BM25Index.build(TEXTS)
+    path = str(tmp_path / name)
+    index.save(path)
+    loaded = BM25Index.load(path)
+
+    assert loaded.n_docs == index.n_docs
+    assert loaded.avg_length == pytest.approx(index.avg_length)
+    assert loaded.fingerprint == index.fingerprint
+    for query in ("control racquet", "spin", "oversize beginners"):
+        np.testing.assert_allclose(loaded.search(query, 3)[1], index.search(query, 3)[1])
+
+
+def test_reference_statistics_of_an_empty_reference():
+    index = BM25Index.build(TEXTS, reference = BM25Index.build([]))
+
+    assert np.isfinite(index.weights).all()
+    assert index.avg_length == pytest.approx(BM25Index.build(TEXTS).avg_length)
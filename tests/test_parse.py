@@ -0,0 +1,59 @@
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from src.data.parse import PARSER_BACKENDS, make_product_soup
+from src.data.scrape import _parse_racquet_features
+
+# Product pages in the site's markup, each with the record _parse_racquet_features must return for it
+# (missing values as null): a full page with nested spec values and a second table body after the
+# specs, a page without a rating, one without a spec table and one with an unlabeled spec cell
+FIXTURES = Path(__file__).parent / "fixtures" / "product_pages"
+PAGES = sorted(FIXTURES.glob("*.html"))
+
+
+def _expected_record(page: Path) -> dict:
+    with open(page.with_suffix(".json"), encoding = "utf-8") as f:
+        return json.load(f)
+
+
+def _normalized(record: dict) -> dict:
+    return {label: None if isinstance(value, float) and math.isnan(value) else value for label, value in record.items()}
+
+
+@pytest.fixture(params = list(PARSER_BACKENDS))
+def parser(request) -> str:
+    if PARSER_BACKENDS[request.param][0] == "lxml":
+        pytest.importorskip("lxml")
+    return request.param
+
+
+def test_fixture_pages_exist():
+    assert len(PAGES) >= 4
+    assert all(page.with_suffix(".json").exists() for page in PAGES)
+
+
+@pytest.mark.parametrize("page", PAGES, ids = [page.stem for page in PAGES])
+def test_parser_backends_match_golden_records(page: Path, parser: str):
+    record = _parse_racquet_features(page.read_bytes(), parser = parser)
+
+    expected = _expected_record(page)
+    assert list(record) == list(expected)
+    assert _normalized(record) == expected
+
+
+@pytest.mark.parametrize("page", PAGES, ids = [page.stem for page in PAGES])
+def test_strainer_keeps_only_parsed_elements(page: Path):
+    strained = make_product_soup(page.read_bytes(), parser = "strainer")
+
+    # Only the wanted elements and their contents are built: no page chrome, scripts or thumbnails
+    assert not strained.find_all(["head", "script", "nav", "header", "footer", "table", "section"])
+    assert [img.get("class") for img in strained.find_all("img")] == [["main_image", "is-zoomable"]]
+    assert (strained.find("tbody") is not None) == (_expected_record(page)["Head Size"] is not None)
+
+
+def test_unknown_parser_backend():
+    with pytest.raises(ValueError):
+        make_product_soup(b"<html></html>", parser = "html5lib")
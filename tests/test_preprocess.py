@@ -0,0 +1,29 @@
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_raw_catalog
+from src.data.preprocess import preprocess_raw_csv_in_chunks, preprocess_raw_data
+
+
+def _raw_catalog() -> pd.DataFrame:
+    raw_df = synthetic_raw_catalog(200)
+    raw_df.loc[[3, 50, 120], "racquet_name"] = raw_df.loc[[3, 50, 120], "racquet_name"] + " Junior"
+    return raw_df
+
+
+def test_junior_racquets_are_removed_and_row_order_is_kept():
+    raw_df = _raw_catalog()
+    df = preprocess_raw_data(raw_df)
+
+    expected = raw_df["racquet_name"][~raw_df["racquet_name"].str.contains("Junior")]
+    assert not df["racquet_name"].str.contains("Junior").any()
+    assert list(df["racquet_name"]) == list(expected)
+
+
+def test_low_memory_and_chunked_preprocessing_match(tmp_path):
+    raw_df = _raw_catalog()
+    raw_df.to_csv(tmp_path / "raw.csv", index = False)
+    preprocess_raw_csv_in_chunks(str(tmp_path / "raw.csv"), str(tmp_path / "clean.csv"), chunksize = 64)
+
+    df = preprocess_raw_data(raw_df).reset_index(drop = True)
+    pd.testing.assert_frame_equal(preprocess_raw_data(raw_df, low_memory = True).reset_index(drop = True), df)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "clean.csv"), df, check_dtype = False)
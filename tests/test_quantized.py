@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_ann import synthetic_vectors
+from src.search.dense import DenseIndex
+from src.search.quantized import PRECISIONS, RERANK_DEPTH, QuantizedIndex, quantize_int8
+
+K = 10
+
+
+@pytest.fixture(scope = "module")
+def data() -> tuple[np.ndarray, np.ndarray, DenseIndex]:
+    vectors = synthetic_vectors(3_000, 32, n_topics = 30)
+    queries = vectors[:50] + np.random.default_rng(1).standard_normal((50, 32)).astype(np.float32) * 0.3
+    return vectors, queries, DenseIndex(vectors)
+
+
+# Helper function to compute mean recall@K of an index's results against exact search
+def _recall(index, queries: np.ndarray, exact: DenseIndex) -> float:
+    return np.mean([
+        len(np.intersect1d(index.search(query, K)[0], exact.search(query, K)[0])) / K for query in queries
+    ])
+
+
+def test_int8_codes_reconstruct_the_vectors():
+    matrix = np.array([[0.5, -1.0, 0.25], [0.0, 0.0, 0.0]], dtype = np.float32)
+    codes, scales = quantize_int8(matrix)
+
+    assert codes.dtype == np.int8 and codes[0, 1] == -127
+    np.testing.assert_allclose(codes * scales[:, None], matrix, atol = 1 / 127)
+
+
+@pytest.mark.parametrize("precision", PRECISIONS)
+def test_recall_against_exact_search(data, precision):
+    vectors, queries, exact = data
+
+    coarse = QuantizedIndex.build(vectors, precision, rerank = 0)
+    reranked = QuantizedIndex.build(vectors, precision)
+
+    assert _recall(coarse, queries, exact) >= (0.99 if precision == "float16" else 0.9)
+    assert _recall(reranked, queries, exact) == 1.0
+    # Re-ranked scores are exact
+    ids, scores = reranked.search(queries[0], K)
+    np.testing.assert_allclose(scores, exact.search(queries[0], K)[1], rtol = 1e-5)
+
+
+@pytest.mark.parametrize("precision", PRECISIONS)
+def test_candidates_batches_and_round_trip(data, precision, tmp_path):
+    vectors, queries, exact = data
+    index = QuantizedIndex.build(vectors, precision)
+    candidates = np.arange(0, len(vectors), 3)
+
+    ids, _ = index.search(queries[0], K, candidates)
+    assert np.isin(ids, candidates).all()
+    assert list(ids) == list(exact.search(queries[0], K, candidates)[0])
+
+    batch = index.search_batch(queries[:5], K, max_scores_bytes = 4 * len(vectors) * 2)
+    for query, (ids, scores) in zip(queries[:5], batch):
+        np.testing.assert_array_equal(ids, index.search(query, K)[0])
+
+    index.save(str(tmp_path))
+    loaded = QuantizedIndex.load(str(tmp_path), full = exact.matrix)
+    assert (loaded.precision, loaded.rerank, len(loaded)) == (precision, RERANK_DEPTH, len(vectors))
+    np.testing.assert_array_equal(loaded.search(queries[0], K)[0], index.search(queries[0], K)[0])
+
+
+def test_unknown_precision():
+    with pytest.raises(ValueError):
+        QuantizedIndex.build(np.ones((2, 4), dtype = np.float32), "int4")
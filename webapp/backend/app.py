@@ -0,0 +1,371 @@
+"""Racquet search API and static frontend server.
+
+Run from the repository root:
+
+    python -m webapp.backend.app --data .datashelf/racquets/basic_preprocessed_data_cleaned.csv
+
+or, for fast startup, from a bundle built offline with run_build_index.py:
+
+    python -m webapp.backend.app --bundle search_bundle
+
+With --bundle, --workers N pre-forks N worker processes that share the listening socket and the
+bundle's memory-mapped arrays, and every worker swaps in a rebuilt bundle within --reload-interval
+seconds, without a restart.
+
+GET /search?q=<query>&k=<n>[&mode=hybrid|dense|lexical][&fusion=rrf|weighted] returns the k best
+racquets as JSON. Spec filters come from the query text ("under $200", "head light") and/or
+min_<field>/max_<field> params (e.g. max_price=200, min_head_size=98); parse_filters=0 turns off
+query parsing. POST /search/batch takes {"queries": [...], "k", "mode", "fusion", "parse_filters"},
+where each query is a string or {"q": ..., "max_price": ...}, and returns one result page per query.
+GET /metrics returns cache hit rates and query batching stats, and GET /metrics/prometheus the same plus
+request counts and search stage latency histograms in the Prometheus text format (per worker process).
+Everything else is served from webapp/frontend.
+"""
+import argparse
+import json
+import mimetypes
+import os
+import signal
+import time
+from contextlib import nullcontext
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.instrumentation import REGISTRY, Profiler, add_cli_args, count, enable_json_logs
+from src.search.bundle import BundleWatcher, load_bundle_service
+from src.search.filters import constraints_from_params
+from src.search.service import (
+    DEFAULT_MODEL,
+    INDEX_BACKENDS,
+    SearchService,
+    ServingConfig,
+    load_search_service,
+    parse_batch_item,
+)
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend")
+DEFAULT_K = 10
+MAX_K = 100
+# Limits for POST /search/batch; larger jobs belong in run_batch_search.py
+MAX_BATCH_QUERIES = 1_000
+MAX_BODY_BYTES = 2**20
+# Paths counted by name in http_requests_total; everything else is counted as "static"
+API_PATHS = ("/search", "/search/batch", "/metrics", "/metrics/prometheus", "/health")
+
+
+# Helper function to flatten numeric service metrics into Prometheus gauge names, e.g.
+# search_result_cache_hit_rate
+def _flatten_metrics(prefix: str, metrics: dict) -> dict[str, float]:
+    gauges = {}
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            gauges.update(_flatten_metrics(f"{prefix}_{name}", value))
+        elif isinstance(value, (int, float)):
+            gauges[f"{prefix}_{name}"] = float(value)
+    return gauges
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """Routes /search and /search/batch to the server's SearchService and serves the frontend files."""
+
+    server: "SearchServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/search":
+            with self.server.profile():
+                self._search(parse_qs(url.query))
+        elif url.path == "/metrics":
+            self._send_json(HTTPStatus.OK, self.server.service.metrics())
+        elif url.path == "/metrics/prometheus":
+            self._send_prometheus()
+        elif url.path == "/health":
+            service = self.server.service
+            self._send_json(HTTPStatus.OK, {
+                "status": "ok",
+                "worker": os.getpid(),
+                "racquets": len(service),
+                "model_loaded": getattr(service.encode, "loaded", True),
+            })
+        else:
+            self._send_static(url.path)
+
+    def _search(self, params: dict):
+        query = params.get("q", [""])[0].strip()
+        if not query:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Missing query parameter 'q'."})
+            return
+        try:
+            k = int(params.get("k", [DEFAULT_K])[0])
+        except ValueError:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "'k' must be an integer."})
+            return
+        k = max(1, min(k, MAX_K))
+        mode = params.get("mode", ["hybrid"])[0]
+        fusion = params.get("fusion", ["rrf"])[0]
+        parse_filters = params.get("parse_filters", ["1"])[0] not in ("0", "false")
+        try:
+            constraints = constraints_from_params({name: values[0] for name, values in params.items()})
+            payload = self.server.service.search(
+                query, k, mode = mode, fusion = fusion, constraints = constraints, parse_filters = parse_filters
+            )
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        self._send_json(HTTPStatus.OK, payload)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/search/batch":
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Not found: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"Send a JSON body of at most {MAX_BODY_BYTES} bytes."})
+            return
+        try:
+            body = json.loads(self.rfile.read(length))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "The body must be JSON."})
+            return
+        with self.server.profile():
+            self._search_batch(body)
+
+    def _search_batch(self, body: dict):
+        queries = body.get("queries") if isinstance(body, dict) else None
+        if not isinstance(queries, list) or not 0 < len(queries) <= MAX_BATCH_QUERIES:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"'queries' must be a list of 1 to {MAX_BATCH_QUERIES} queries."})
+            return
+        try:
+            k = max(1, min(int(body.get("k", DEFAULT_K)), MAX_K))
+        except (TypeError, ValueError):
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "'k' must be an integer."})
+            return
+        try:
+            items = [parse_batch_item(item) for item in queries]
+            start = time.perf_counter()
+            pages = self.server.service.search_batch(
+                [query for query, _ in items], k, mode = body.get("mode", "hybrid"), fusion = body.get("fusion", "rrf"),
+                constraints = [constraints for _, constraints in items], parse_filters = bool(body.get("parse_filters", True)),
+            )
+        except (TypeError, ValueError) as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        elapsed = time.perf_counter() - start
+        self._send_json(HTTPStatus.OK, {
+            "results": pages,
+            "timings_ms": {"total": round(elapsed * 1000, 3)},
+            "queries_per_second": round(len(pages) / elapsed, 1) if elapsed else None,
+        })
+
+    def send_response(self, code: int, message: str = None):
+        path = urlparse(self.path).path
+        count("http_requests", path = path if path in API_PATHS else "static", status = int(code))
+        super().send_response(code, message)
+
+    def _send_prometheus(self):
+        gauges = _flatten_metrics("search", self.server.service.metrics())
+        body = REGISTRY.render_prometheus(gauges).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_static(self, path: str):
+        relative = "index.html" if path in ("", "/") else path.lstrip("/")
+        file_path = os.path.normpath(os.path.join(FRONTEND_DIR, relative))
+        if not file_path.startswith(FRONTEND_DIR + os.sep) or not os.path.isfile(file_path):
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Not found: {path}"})
+            return
+
+        with open(file_path, "rb") as f:
+            body = f.read()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", mimetypes.guess_type(file_path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class SearchServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding one preloaded SearchService shared by all request threads.
+
+    The service can be replaced while serving (see BundleWatcher); each request reads it once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: SearchService):
+        super().__init__(address, SearchRequestHandler)
+        self.service = service
+        self.profiler = None
+
+    def profile(self):
+        """Context manager that profiles a request if --profile is on and the request is sampled."""
+        return self.profiler.sample() if self.profiler is not None else nullcontext()
+
+
+# Helper function to load the service into the server and serve until interrupted (the whole process, or
+# one pre-forked worker)
+def _serve(server: SearchServer, args: argparse.Namespace, config: ServingConfig):
+    if args.profile is not None:
+        output = args.profile_output or ("profile.prof" if args.profile == "cprofile" else "tracemalloc.txt")
+        if args.workers > 1:
+            stem, ext = os.path.splitext(output)
+            output = f"{stem}.{os.getpid()}{ext}"
+        server.profiler = Profiler(args.profile, output, sample_rate = args.profile_sample_rate)
+    if args.bundle is not None:
+        # The bundle's index type is fixed at build time, so --index only applies to --data
+        server.service = load_bundle_service(args.bundle, nprobe = args.nprobe, config = config)
+        if args.reload_interval > 0:
+            def swap(service: SearchService):
+                server.service = service
+
+            BundleWatcher(
+                args.bundle, server.service, swap, interval = args.reload_interval, nprobe = args.nprobe, config = config
+            ).start()
+    else:
+        server.service = load_search_service(
+            data_path = args.data,
+            store_dir = args.embeddings or os.path.join(".embedding_cache", args.model),
+            model_name = args.model,
+            index_backend = args.index,
+            nprobe = args.nprobe,
+            config = config,
+        )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+        if server.profiler is not None:
+            server.profiler.close()
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+# Helper function to fork workers that accept on the parent's listening socket, restarting any that die
+def _prefork(server: SearchServer, workers: int, serve):
+    children = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # Workers leave Ctrl+C to the parent, which stops them with SIGTERM; serve() then cleans up
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, _raise_interrupt)
+            code = 0
+            try:
+                serve()
+            except BaseException:
+                logger.exception(f"Worker {os.getpid()} failed.")
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Started {workers} workers: {sorted(children)}")
+    try:
+        while True:
+            pid, status = os.wait()
+            children.discard(pid)
+            logger.warning(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting it.")
+            time.sleep(1)
+            spawn()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Serve the racquet search API and frontend.")
+    parser.add_argument("--data", default = ".datashelf/racquets/basic_preprocessed_data_cleaned.csv",
+                        help = "Cleaned racquet dataset (.csv, .parquet or .arrow).")
+    parser.add_argument("--bundle", default = None,
+                        help = "Serve a prebuilt bundle from run_build_index.py instead of --data/--embeddings/--model.")
+    parser.add_argument("--workers", type = int, default = 1,
+                        help = "Worker processes sharing the socket and the bundle's memory-mapped arrays (needs --bundle).")
+    parser.add_argument("--reload-interval", type = float, default = 5.0,
+                        help = "Seconds between checks for a rebuilt --bundle (0 disables reloading).")
+    parser.add_argument("--embeddings", default = None,
+                        help = "EmbeddingStore directory. Defaults to .embedding_cache/<model>.")
+    parser.add_argument("--model", default = DEFAULT_MODEL)
+    parser.add_argument("--index", choices = INDEX_BACKENDS, default = "exact",
+                        help = "Vector index: exact cosine, approximate IVF for large catalogs, or int8/float16 "
+                               "quantized vectors re-ranked at full precision.")
+    parser.add_argument("--nprobe", type = int, default = 8, help = "IVF lists scored per query.")
+    parser.add_argument("--query-cache-size", type = int, default = ServingConfig.query_cache_size)
+    parser.add_argument("--result-cache-size", type = int, default = ServingConfig.result_cache_size)
+    parser.add_argument("--max-batch-size", type = int, default = ServingConfig.max_batch_size,
+                        help = "Max concurrent queries embedded in one model call (1 disables batching).")
+    parser.add_argument("--max-batch-wait-ms", type = float, default = ServingConfig.max_batch_wait_ms)
+    parser.add_argument("--host", default = "127.0.0.1")
+    parser.add_argument("--port", type = int, default = 8000)
+    add_cli_args(parser, sampling = True)
+    args = parser.parse_args()
+    if args.workers > 1 and args.bundle is None:
+        parser.error("--workers needs --bundle; workers loading --data would each hold their own copy.")
+    if args.workers > 1 and not hasattr(os, "fork"):
+        parser.error("--workers needs os.fork(), which this platform does not have.")
+    if args.log_json:
+        enable_json_logs()
+
+    config = ServingConfig(
+        query_cache_size = args.query_cache_size,
+        result_cache_size = args.result_cache_size,
+        max_batch_size = args.max_batch_size,
+        max_batch_wait_ms = args.max_batch_wait_ms,
+    )
+    # Bind before forking so every worker accepts on the same socket
+    server = SearchServer((args.host, args.port), None)
+    logger.info(f"Serving racquet search on http://{args.host}:{server.server_port}")
+    if args.workers > 1:
+        _prefork(server, args.workers, lambda: _serve(server, args, config))
+    else:
+        # Stop on SIGTERM as on Ctrl+C, so the service and profiler are closed cleanly
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+        _serve(server, args, config)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,41 @@
-const mockData = [
-      {
-        name: "Wilson Pro Staff 97",
-        brand: "Wilson",
-        price: "$249",
-        rating: "4.7",
-        image: "https://img.tennis-warehouse.com/watermark/rs.php?path=BARO98-1.jpg&nw=455"
-      },
-      {
-        name: "Babolat Pure Drive",
-        brand: "Babolat",
-        price: "$219",
-        rating: "4.6",
-        image: "https://img.tennis-warehouse.com/watermark/rs.php?path=BARO-1.jpg&nw=455"
-      },
-      {
-        name: "Head Radical MP",
-        brand: "Head",
-        price: "$199",
-        rating: "4.5",
-        image: "https://img.tennis-warehouse.com/watermark/rs.php?path=BABOOA-1.jpg&nw=455"
-      },
-      {
-        name: "Yonex EZONE 98",
-        brand: "Yonex",
-        price: "$239",
-        rating: "4.8",
-        image: "https://img.tennis-warehouse.com/watermark/rs.php?path=BABOAP-1.jpg&nw=455"
-      }
-    ];
+// Served by webapp/backend/app.py; point this at the backend when opening index.html directly
+const API_BASE = window.location.protocol === 'file:' ? 'http://127.0.0.1:8000' : '';
+const RESULT_COUNT = 12;
 
-function mockSearch() {
+function renderResults(racquets) {
     const results = document.getElementById('results');
     results.innerHTML = '';
-    mockData.forEach(r => {
+    racquets.forEach(r => {
     const card = document.createElement('div');
     card.className = 'card';
     card.innerHTML = `
-        <img src="${r.image}" alt="${r.name}">
+        <img src="${r.image ?? ''}" alt="${r.name}">
         <h3>${r.name}</h3>
-        <p>${r.brand} – Rating: ${r.rating} ⭐</p>
-        <p class="price">${r.price}</p>
+        <p>${r.brand} – Rating: ${r.rating ?? 'N/A'} ⭐</p>
+        <p class="price">${r.price == null ? '' : '$' + r.price}</p>
+        ${r.variants && r.variants.length ? `<p class="variants">Also in: ${r.variants.map(v => v.name).join(', ')}</p>` : ''}
     `;
     results.appendChild(card);
     });
-}
\ No newline at end of file
+}
+
+async function search() {
+    const query = document.getElementById('searchInput').value.trim();
+    if (!query) {
+        return;
+    }
+    const params = new URLSearchParams({ q: query, k: RESULT_COUNT });
+    const response = await fetch(`${API_BASE}/search?${params}`);
+    if (!response.ok) {
+        document.getElementById('results').textContent = 'Search failed. Is the backend running?';
+        return;
+    }
+    const body = await response.json();
+    renderResults(body.results);
+}
+
+document.getElementById('searchInput').addEventListener('keydown', event => {
+    if (event.key === 'Enter') {
+        search();
+    }
+});